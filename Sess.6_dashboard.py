@@ -1,18 +1,42 @@
+import functools
+import math
 import os
+import time
+from itertools import chain
 from dotenv import load_dotenv
-import streamlit as st
 import pandas as pd
-import altair as alt
-import groq  # Groq client
+import streamlit as st
+from dde_dashboard import charts as tab_charts
+from dde_dashboard.analytics import (company_profile, company_year_over_year, peer_group, sector_summary,
+                                     year_over_year)
+from dde_dashboard.columns import age_reference_date
+from dde_dashboard.cube import region_view, sector_view
+from dde_dashboard.dataset import LatestDataset
+from dde_dashboard.llm import (MAX_TOKENS, PROVIDERS, TEMPERATURE, client_config_from_env, make_provider,
+                               provider_from_env)
+from dde_dashboard.llm_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
+from dde_dashboard.payload import PROMPT_TOKEN_BUDGET as DEFAULT_PROMPT_TOKEN_BUDGET
+from dde_dashboard.peers import PEER_COUNT as DEFAULT_PEER_COUNT
+from dde_dashboard.prompts import (age_prompt, company_prompt, region_deep_dive_prompt, regions_prompt,
+                                   sector_overview_prompt, selected_sector_prompt)
+from dde_dashboard.scheduler import BATCH, INTERACTIVE, LLMScheduler
+from dde_dashboard.search import SEARCH_RESULTS
+from dde_dashboard.store import data_version
+from dde_dashboard.tracing import tracer_from_env
 
 # --- Load environment variables ---
 load_dotenv("API_KEY.env")
+# LLM_PROVIDER=mock answers from a local stand-in server instead of Groq (see dde_dashboard.mock_llm)
+LLM_PROVIDER = provider_from_env()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "").strip()
-if not GROQ_API_KEY:
+if not GROQ_API_KEY and LLM_PROVIDER == "groq":
     st.error("GROQ_API_KEY not found in environment. Please set it in API_KEY.env without extra spaces or comments.")
     st.stop()
 os.environ['GROQ_API_KEY'] = GROQ_API_KEY  # Provide to Groq client
 
+# Opt-in timing spans for this rerun (DDE_TRACE=1, see dde_dashboard.tracing); a no-op otherwise
+TRACER = tracer_from_env()
+
 # Page config must be the first Streamlit command
 st.set_page_config(page_title="Denmark Companies Dashboard", layout="wide")
 
@@ -56,71 +80,324 @@ st.markdown(
             unsafe_allow_html=True
         )
 
-# Define a muted color scale manually
-muted_colors = [
-    "#D3D7DD",  # very light gray-blue
-    "#5A6272",  # dark gray-blue
-    "#A6783D",  # muted brown-gold
-    "#A0ABB8",  # light gray-blue
-    "#7D8A9C",  # medium gray-blue
-    "#6A8E61",  # muted green (optional highlight)
-]
-
-# Load data
-@st.cache_data
-def load_data():
-    return pd.read_excel('V5_denmark_companies_with_merged_topics.xlsx')
-
-DF = load_data()
-
-# Calculate Company Age for ALL companies
-date_col = next((c for c in DF.columns if "date of incorporation" in c.lower()), None)
-
-if date_col and date_col in DF.columns:
-    today = pd.to_datetime("today")
-    DF['Company Age'] = (today - pd.to_datetime(DF[date_col])).dt.days // 365
-    age_col = 'Company Age'
-else:
-    age_col = None
+# Load data (through the on-disk Arrow cache next to the workbook)
+DATA_PATH = 'V5_denmark_companies_with_merged_topics.xlsx'
+
+# The workbook's mtime and size plus the last ingested delta (python -m dde_dashboard.delta) identify
+# the dataset version, so an edited workbook or new company rows are picked up without a restart
+DATA_VERSION = data_version(DATA_PATH)
+
+# The current dataset handle, shared by all sessions. It loads the compact table
+# (categoricals, downcast numerics, Company Age; descriptions stay in the memory-mapped Arrow cache)
+# and builds the company index, rank table and sector x region aggregate cube on first use.
+# When a delta arrives, the next handle updates those only where the changed rows feed them.
+# All computation lives in dde_dashboard (shared with the batch job); this script only renders.
+# DDE_QUERY_BACKEND=duckdb computes the aggregations in an in-process DuckDB database instead of pandas
+QUERY_BACKEND = os.getenv("DDE_QUERY_BACKEND", "pandas")
+
+@st.cache_resource
+def latest_dataset(path, backend):
+    return LatestDataset(path, backend)
+
+# The metrics are shown for one year at a time (python -m dde_dashboard.years adds years the workbook
+# lacks); each tab compares it with the year before when that year has data too
+YEARS = latest_dataset(DATA_PATH, QUERY_BACKEND).years(DATA_VERSION)
+YEAR = st.sidebar.selectbox("Year", YEARS[::-1]) if len(YEARS) > 1 else (YEARS[-1] if YEARS else None)
+PREVIOUS_YEAR = max((y for y in YEARS if YEAR is not None and y < YEAR), default=None)
+
+with TRACER.span("load", backend=QUERY_BACKEND, year=YEAR) as span:
+    DATASET = latest_dataset(DATA_PATH, QUERY_BACKEND).get(DATA_VERSION, YEAR)
+    DF, COLS, CUBE = DATASET.df, DATASET.cols, DATASET.cube
+    span.set(rows=len(DF), cube_rows=len(CUBE))
+    PREVIOUS = latest_dataset(DATA_PATH, QUERY_BACKEND).get(DATA_VERSION, PREVIOUS_YEAR) if PREVIOUS_YEAR else None
+
+tab_company_col = COLS.company
+topic_col = COLS.topic
+bvd_sector_col = COLS.sector
+emp_col = COLS.emp
+growth_col = COLS.growth
+aagr_col = COLS.aagr
+region_col = COLS.region
+age_col = COLS.age
+
+# --- Description search ---
+# BM25 full-text search over the company descriptions (dde_dashboard.fulltext). The index is built
+# once per workbook version and saved next to the Arrow cache; the matching companies filter the
+# Sectors and Regions charts.
+DESCRIPTION_MATCHES_SHOWN = 10
+
+@st.cache_resource(max_entries=32)
+def description_matches(_ds, query, data_version):
+    return _ds.fulltext.search(query)
+
+@st.cache_resource(max_entries=32)
+def description_subset(_ds, query, data_version, year):
+    positions, _ = description_matches(_ds, query, data_version)
+    return _ds.subset(positions)
+
+# Charts below are drawn from CHART_DATASET
+CHART_DATASET, DESCRIPTION_FILTER = DATASET, ""
+if DATASET.fulltext is not None:
+    description_query = st.sidebar.text_input("Search company descriptions", placeholder="e.g. offshore wind")
+    if description_query.strip():
+        with TRACER.span("fulltext.search", query=description_query) as span:
+            positions, scores = description_matches(DATASET, description_query, DATA_VERSION)
+            span.set(matches=len(positions))
+        if len(positions):
+            CHART_DATASET = description_subset(DATASET, description_query, DATA_VERSION, YEAR)
+            DESCRIPTION_FILTER = description_query
+            st.sidebar.caption(f"{len(positions)} companies match; the Sectors and Regions charts and their AI insights cover only these.")
+            st.sidebar.dataframe(
+                [{"Company": DF[tab_company_col].iat[pos], "Score": round(float(score), 2)}
+                 for pos, score in zip(positions[:DESCRIPTION_MATCHES_SHOWN], scores)],
+                hide_index=True,
+            )
+        else:
+            st.sidebar.info(f"No company description matches '{description_query}'.")
+
+def description_filter_note(subject="Charts show"):
+    if DESCRIPTION_FILTER:
+        st.caption(f"{subject} the {len(CHART_DATASET.df)} companies whose description matches "
+                   f"'{DESCRIPTION_FILTER}' (see the sidebar).")
 
 # Your tabs
 tabs = st.tabs(["Company description", "Sectors", "Regions", "Regions deep-dive", "Age"])
 
-# Identify key columns
-tab_company_col = "Company name Latin alphabet"
-desc_cols = [col for col in DF.columns if "description" in col.lower()]
-description_col = desc_cols[0] if desc_cols else None
-topic_col = "Topic - Umbrella (Merged)"
-bvd_cols = [col for col in DF.columns if "bvd" in col.lower() and "sector" in col.lower()]
-bvd_sector_col = bvd_cols[0] if bvd_cols else None
-emp_col = next((c for c in DF.columns if "employee" in c.lower() and "2023" in c), None)
-growth_col = next((c for c in DF.columns if "growth" in c.lower() and "2023" in c), None)
-aagr_col = next((c for c in DF.columns if "aagr" in c.lower() and "2023" in c), None)
+# --- AI insights ---
+LLM_MODEL = PROVIDERS[LLM_PROVIDER]
+LLM_TEMPERATURE = TEMPERATURE
+LLM_MAX_TOKENS = MAX_TOKENS
+LLM_CACHE_PATH = DEFAULT_CACHE_PATH
+# Estimated input tokens each insight prompt may use; larger listings are cut to their top and bottom rows
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", str(DEFAULT_PROMPT_TOKEN_BUDGET)))
+
+# Answers are cached on disk by (model, prompt, temperature, max_tokens), across sessions and restarts.
+# Insights pre-generated by `python -m dde_dashboard.batch` are read from the same file.
+@st.cache_resource
+def insight_cache():
+    return ResponseCache(LLM_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=2000)
+
+# One provider (and Groq client) per server process: the connection pool and TLS session survive across
+# clicks and sessions. Timeouts, retries and pool size come from the GROQ_* variables (see dde_dashboard.llm).
+@st.cache_resource
+def llm_provider():
+    return make_provider(GROQ_API_KEY, LLM_PROVIDER, **client_config_from_env())
+
+# Requests and tokens per minute all sessions together may send (0 = no limit); the defaults are Groq's
+# free-tier limits for the model
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))
+LLM_TPM = float(os.getenv("LLM_TPM", "12000"))
+# Maximum number of insight requests in flight at once, across all sessions
+INSIGHT_CONCURRENCY = int(os.getenv("INSIGHT_CONCURRENCY", "3"))
+
+# Every session's insight requests go through one scheduler (see dde_dashboard.scheduler): it queues them
+# under the rate limits, lets clicks overtake "Generate all insights" and sends identical pending prompts
+# upstream once.
+@st.cache_resource
+def llm_scheduler():
+    return LLMScheduler(llm_provider(), rpm=LLM_RPM, tpm=LLM_TPM, concurrency=INSIGHT_CONCURRENCY)
+
+regenerate_insights = st.sidebar.checkbox("Regenerate AI insights (ignore cached answers)")
+generate_all_insights = st.sidebar.button("Generate all insights")
+
+def queue_message(position, wait):
+    return f"Waiting for the LLM: position {position} in the queue, about {math.ceil(wait)}s"
+
+def prompt_token_counts(prompt):
+    """Span attributes with the prompt's estimated tokens, in total and per section (see dde_dashboard.payload)."""
+    return {"prompt_tokens": prompt.tokens, **{f"tokens.{name}": n for name, n in prompt.sections.items()}}
+
+def render_insight(prompt, spinner_text="Generating insights..."):
+    """Render the LLM answer to prompt, streaming tokens into the panel as they arrive."""
+    with TRACER.span("llm.insight", prompt_chars=len(prompt), **prompt_token_counts(prompt)) as span:
+        key = cache_key(LLM_MODEL, prompt, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+        if not regenerate_insights:
+            cached = insight_cache().get(key)
+            if cached is not None:
+                span.set(cached=True, response_chars=len(cached))
+                st.markdown(cached)
+                return cached
+        started = time.perf_counter()
+        ticket = llm_scheduler().submit(prompt, INTERACTIVE)
+        span.set(shared=ticket.subscribers > 1)
+        # A request that does not start right away shows its queue position and expected wait until it does
+        if not ticket.wait_started(timeout=0.2):
+            slot = st.empty()
+            with slot.status(spinner_text) as status:
+                while (queued := ticket.queue_status()) is not None:
+                    status.update(label=f"{spinner_text} {queue_message(*queued)}")
+                    ticket.wait_started(timeout=0.5)
+            slot.empty()
+            span.set(queued_ms=round((time.perf_counter() - started) * 1000, 1))
+        # The spinner only covers the wait for the first token
+        with st.spinner(spinner_text):
+            tokens = ticket.stream()
+            first = next(tokens, "")
+            span.set(first_token_ms=round((time.perf_counter() - started) * 1000, 1))
+        insight = st.write_stream(chain([first], tokens)).strip()
+        span.set(cached=False, response_chars=len(insight))
+        # Only a completed stream reaches this point, so partial answers are never cached
+        insight_cache().put(key, LLM_MODEL, insight)
+        return insight
+
+# button label -> (prompt builder, panel); filled by insight_section() as the tabs render
+insight_panels = {}
+
+def insight_section(button_label, build_prompt, spinner_text):
+    """Button plus output panel for one AI insight. The panel is also filled by "Generate all insights"."""
+    clicked = st.button(button_label)
+    panel = st.container()
+    insight_panels[button_label] = (build_prompt, panel)
+    if clicked:
+        with panel:
+            render_insight(build_prompt(), spinner_text)
+
+def generate_all(panels):
+    """Fill every panel at once; the requests queue as batch work behind any session's clicks."""
+    with TRACER.span("llm.generate_all", sections=len(panels)) as span:
+        pending = []
+        prompt_tokens = 0
+        for build_prompt, panel in panels:
+            placeholder = panel.empty()
+            try:
+                prompt = build_prompt()
+            except Exception as exc:
+                # One failed section must not take down the others
+                placeholder.error(f"Could not generate this insight: {exc}")
+                continue
+            prompt_tokens += prompt.tokens
+            key = cache_key(LLM_MODEL, prompt, LLM_TEMPERATURE, LLM_MAX_TOKENS)
+            cached = None if regenerate_insights else insight_cache().get(key)
+            if cached is not None:
+                placeholder.markdown(cached)
+                continue
+            pending.append([key, llm_scheduler().submit(prompt, BATCH), placeholder, None])
+        span.set(requests=len(pending), prompt_tokens=prompt_tokens)
+        failed = 0
+        while pending:
+            for item in list(pending):
+                key, ticket, placeholder, shown = item
+                if ticket.done:
+                    pending.remove(item)
+                    if ticket.error is not None:
+                        failed += 1
+                        placeholder.error(f"Could not generate this insight: {ticket.error}")
+                        continue
+                    insight = ticket.text.strip()
+                    placeholder.markdown(insight)
+                    insight_cache().put(key, LLM_MODEL, insight)
+                    continue
+                queued, text = ticket.queue_status(), ticket.text
+                if queued:
+                    view, draw = f"{queue_message(*queued)}...", placeholder.caption
+                elif not text:
+                    view, draw = "Generating...", placeholder.caption
+                else:
+                    view, draw = text, placeholder.markdown
+                if view != shown:
+                    draw(view)
+                    item[3] = view
+            # Redraw at most ~10 times a second; each redraw resends the whole text
+            time.sleep(0.1)
+        span.set(failed=failed)
+
+# --- Chart units ---
+# Each tab's chart data preparation and chart construction (dde_dashboard.charts), cached as
+# ready-to-send Vega-Lite specs per input digest and selection. Together with the tab fragments
+# below, a widget change only re-renders its own tab, and a rerun never touches Altair or
+# re-encodes chart data.
+
+# Donut charts fold all but their largest slices into "Other" above this many slices
+CHART_MAX_SLICES = int(os.getenv("CHART_MAX_SLICES", str(tab_charts.MAX_SLICES)))
+COMPANY_MATCHES = int(os.getenv("COMPANY_MATCHES", str(SEARCH_RESULTS)))
+PEER_COUNT = int(os.getenv("PEER_COUNT", str(DEFAULT_PEER_COUNT)))
+
+# The input digest covers the aggregates a tab draws (tab_charts.chart_inputs), so a delta or
+# description filter that leaves a tab's figures alone reuses its charts
+@st.cache_resource
+def sector_charts(_ds, inputs):
+    return tab_charts.chart_specs(tab_charts.sector_charts(_ds))
+
+@st.cache_resource
+def region_charts(_ds, inputs, max_slices):
+    return tab_charts.chart_specs(tab_charts.region_charts(_ds, max_slices))
+
+@st.cache_resource
+def region_deep_dive_charts(_ds, region, inputs, max_slices):
+    return tab_charts.chart_specs(tab_charts.region_deep_dive_charts(_ds, region, max_slices))
+
+@st.cache_resource
+def age_charts(_ds, inputs):
+    return tab_charts.chart_specs(tab_charts.age_charts(_ds))
+
+def show_chart(name, spec):
+    with TRACER.span(f"chart.{name}") as span:
+        st.vega_lite_chart(spec, use_container_width=True)
+    if span.recording:
+        span.set(payload_bytes=tab_charts.spec_nbytes(spec))
+
+def traced_fragment(tab):
+    """st.fragment whose runs are traced as one span; the spans are exported when it finishes."""
+    @functools.wraps(tab)
+    def run():
+        with TRACER.span(f"tab.{tab.__name__}"):
+            tab()
+        TRACER.flush()
+    return st.fragment(run)
+
+# --- Year-over-year ---
+# Each tab compares the selected year's aggregates with PREVIOUS_YEAR's (dde_dashboard.analytics);
+# growth and AAGR are shown in percent, their changes in percentage points
+PERCENT_STATS = ("growth", "aagr")
+
+def year_over_year_table(build, labels):
+    """Expander with ``build()``'s ``<stat>``/``_prev``/``_change`` columns under ``labels``; nothing without an earlier year."""
+    if PREVIOUS is None:
+        return
+    with st.expander(f"Compared with {PREVIOUS_YEAR}"):
+        table = build()
+        shown = {}
+        for stat, label in labels.items():
+            if stat not in table.columns:
+                continue
+            scale, unit = (100, ("%", "pp")) if stat.startswith(PERCENT_STATS) else (1, ("", ""))
+            for suffix, heading, u in (("", YEAR, unit[0]), ("_prev", PREVIOUS_YEAR, unit[0]), ("_change", "change", unit[1])):
+                shown[f"{label} {heading}" + (f" ({u})" if u else "")] = table[stat + suffix] * scale
+        st.dataframe(pd.DataFrame(shown, index=table.index))
 
 # Tab 1: Company description, topics, and metrics
-with tabs[0]:
+@traced_fragment
+def company_tab():
     st.header("Company Analysis")
     with st.container():
-        company = st.selectbox(
-        "Select a Company",
-        sorted(DF[tab_company_col].dropna().unique())
-    )
-    if description_col and description_col in DF.columns:
-        st.write(DF.loc[DF[tab_company_col] == company, description_col].iloc[0])
+        # Only the top matches for the typed query are sent to the browser, not every name
+        query = st.text_input("Search for a company", placeholder="Type part of a company name")
+        with TRACER.span("company.search", query=query) as span:
+            matches = DATASET.search_index.search(query, COMPANY_MATCHES)
+            span.set(matches=len(matches))
+        company = st.selectbox("Select a Company", matches)
+    if company is None:
+        st.info(f"No company matches '{query}'.")
+        return
+    # Everything shown below comes from one typed profile (dde_dashboard.analytics)
+    with TRACER.span("company.profile", company=company):
+        profile = company_profile(DATASET, company)
+    if profile.description is not None:
+        st.write(profile.description)
     else:
         st.write("No description available.")
 
     # Date of Incorporation and Company Age side by side
-    date_col = next((c for c in DF.columns if "date of incorporation" in c.lower()), None)
+    date_col = COLS.date
     if date_col and date_col in DF.columns:
-        doj = pd.to_datetime(DF.loc[DF[tab_company_col] == company, date_col].iloc[0])
-        today = pd.to_datetime("today")
-        age_years = (today - doj).days // 365
+        # Both already parsed/derived in the load step
+        doj = profile.incorporated
+        age_years = profile.age
         cd, ca = st.columns(2)
         with cd:
             st.subheader("Sectors")
             if topic_col in DF.columns:
-                st.write(DF.loc[DF[tab_company_col] == company, topic_col].iloc[0])
+                st.write(profile.topic)
             else:                
                 st.write("No topics available.")
         with ca:
@@ -128,66 +405,59 @@ with tabs[0]:
             st.markdown(f"<h6 style='margin:0; font-weight:normal'>{doj.date()}</h6>", unsafe_allow_html=True)
     else:
         st.write("No date of incorporation available.")
-        st.subheader("Key Metrics (2023)")    
+        st.subheader(f"Key Metrics ({YEAR})")    
     # Extract values
-    emp_val = DF.loc[DF[tab_company_col] == company, emp_col].iloc[0] if emp_col in DF.columns else None
-    growth_val = DF.loc[DF[tab_company_col] == company, growth_col].iloc[0] if growth_col in DF.columns else None
-    aagr_val = DF.loc[DF[tab_company_col] == company, aagr_col].iloc[0] if aagr_col in DF.columns else None
-    # Compute overall stats and percentiles
-    stats = {}
-    if emp_col in DF.columns:
-        stats['emp_avg'] = DF[emp_col].mean()
-        stats['emp_med'] = DF[emp_col].median()
-        stats['emp_pct'] = DF[emp_col].rank(pct=True).loc[DF[tab_company_col] == company].iloc[0] * 100
-
-    if growth_col in DF.columns: 
-        stats['growth_avg'] = DF[growth_col].mean()
-        stats['growth_med'] = DF[growth_col].median()
-        stats['growth_pct'] = DF[growth_col].rank(pct=True).loc[DF[tab_company_col] == company].iloc[0] * 100
-
-    if aagr_col in DF.columns:
-        stats['aagr_avg'] = DF[aagr_col].mean()
-        stats['aagr_med'] = DF[aagr_col].median()
-        stats['aagr_pct'] = DF[aagr_col].rank(pct=True).loc[DF[tab_company_col] == company].iloc[0] * 100
-
-    # Calculate Age Statistics
-    if 'Company Age' in DF.columns:
-        stats['age_avg'] = DF['Company Age'].mean()
-        stats['age_med'] = DF['Company Age'].median()
-        stats['age_pct'] = DF['Company Age'].rank(pct=True).loc[DF[tab_company_col] == company].iloc[0] * 100
-    
+    emp_val = profile.employees
+    growth_val = profile.growth
+    aagr_val = profile.aagr
+    # Compared against its nearest peers on size, growth, AAGR, age, sector and topic (dde_dashboard.peers)
+    with TRACER.span("company.peers", company=company, k=PEER_COUNT):
+        peers = peer_group(DATASET, company, PEER_COUNT)
+    stats = peers.stats
+
     with st.container():
-        st.subheader(f"Peer Analysis: *{company}* vs Sector Peers")
+        st.subheader(f"Peer Analysis: *{company}* vs its {len(peers.peers)} Nearest Peers")
+        with st.expander("Show peers"):
+            st.dataframe(peers.peers, hide_index=True)
 
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.subheader("Employees")
-        st.markdown(f"**Employees at Company in 2023:** {emp_val}")
-        st.markdown(f"**Sector Average:** {stats['emp_avg']:.1f}")  
-        st.markdown(f"**Sector Median:** {stats['emp_med']:.1f}")
-        st.markdown(f"**Percentile in Sector:** {stats['emp_pct']:.1f}th")
+        st.markdown(f"**Employees at Company in {YEAR}:** {emp_val}")
+        st.markdown(f"**Peer Average:** {stats['emp_avg']:.1f}")  
+        st.markdown(f"**Peer Median:** {stats['emp_med']:.1f}")
+        st.markdown(f"**Percentile among Peers:** {stats['emp_pct']:.1f}th")
 
     with col2:
         st.subheader("Growth")
-        st.markdown(f"**Company Growth in 2023:** {growth_val * 100:.2f}%")
-        st.markdown(f"**Sector Average:** {stats['growth_avg']:.1f}%")
-        st.markdown(f"**Sector Median:** {stats['growth_med']:.1f}%")
-        st.markdown(f"**Percentile in Sector:** {stats['growth_pct']:.1f}th")
+        st.markdown(f"**Company Growth in {YEAR}:** {growth_val * 100:.2f}%")
+        st.markdown(f"**Peer Average:** {stats['growth_avg']:.1f}%")
+        st.markdown(f"**Peer Median:** {stats['growth_med']:.1f}%")
+        st.markdown(f"**Percentile among Peers:** {stats['growth_pct']:.1f}th")
 
     with col3:
         st.subheader("AAGR")
-        st.markdown(f"**AAGR in 2023:** {aagr_val * 100:.2f}%")
-        st.markdown(f"**Sector Average:** {stats['aagr_avg']:.1f}%")
-        st.markdown(f"**Sector Median::** {stats['aagr_med']:.1f}%")
-        st.markdown(f"**Percentile in Sector:** {stats['aagr_pct']:.1f}th")
+        st.markdown(f"**AAGR in {YEAR}:** {aagr_val * 100:.2f}%")
+        st.markdown(f"**Peer Average:** {stats['aagr_avg']:.1f}%")
+        st.markdown(f"**Peer Median:** {stats['aagr_med']:.1f}%")
+        st.markdown(f"**Percentile among Peers:** {stats['aagr_pct']:.1f}th")
 
     with col4:
         st.subheader("Company Age")
-        st.markdown(f"**Company Age:** {age_years} years")
-        st.markdown(f"**Sector Average Age:** {stats['age_avg']:.1f} years")
-        st.markdown(f"**Sector Median Age:** {stats['age_med']:.1f} years")
-        st.markdown(f"**Percentile in Sector:** {stats['age_pct']:.1f}th")
+        st.markdown(f"**Company Age (on {age_reference_date(YEAR).date()}):** {age_years} years")
+        st.markdown(f"**Peer Average Age:** {stats['age_avg']:.1f} years")
+        st.markdown(f"**Peer Median Age:** {stats['age_med']:.1f} years")
+        st.markdown(f"**Percentile among Peers:** {stats['age_pct']:.1f}th")
+
+    if PREVIOUS is not None:
+        with st.expander(f"Compared with {PREVIOUS_YEAR}"):
+            change = company_year_over_year(DATASET, PREVIOUS, company)
+            labels = {"emp": "Employees", "growth": "Growth (%)", "aagr": "AAGR (%)", "age": "Company age (years)"}
+            change.loc[change.index.isin(PERCENT_STATS)] *= 100
+            change.index = [labels.get(key, key) for key in change.index]
+            change.columns = [str(YEAR), str(PREVIOUS_YEAR), "change"]
+            st.dataframe(change)
 
     # Add traffic light indicators
     with st.container():
@@ -254,36 +524,7 @@ with tabs[0]:
     st.markdown("---")
     with st.container():
         st.subheader("AI-generated Insights on Individual Company Performance")
-        if st.button("Generate Company Insights"):
-            with st.spinner("Generating company insights..."):
-                # Prepare company stats payload
-                comp_stats = {
-                    'Employees': emp_val,
-                    'Sector Average Employees': stats['emp_avg'],
-                    'Employees Percentile': stats['emp_pct'],
-                    'Growth Rate (%)': growth_val * 100 if growth_val is not None else None,
-                    'Sector Avg Growth (%)': stats['growth_avg'] * 100 if 'growth_avg' in stats else None,
-                    'Growth Percentile': stats['growth_pct'] if 'growth_pct' in stats else None,
-                    'AAGR (%)': aagr_val * 100 if aagr_val is not None else None,
-                    'Sector Avg AAGR (%)': stats['aagr_avg'] * 100 if 'aagr_avg' in stats else None,
-                    'AAGR Percentile': stats['aagr_pct'] if 'aagr_pct' in stats else None,
-                    'Company Age (years)': age_years,
-                    'Sector Avg Age': stats['age_avg'],
-                    'Age Percentile': stats['age_pct']
-                }
-                prompt1 = (
-                    f"You are an expert business analyst. Provide a concise summary of {company}'s performance in 2023 compared to its sector peers. "
-                    f"Here are the metrics: {comp_stats}."
-                )
-                client1 = groq.Groq(api_key=GROQ_API_KEY)
-                response1 = client1.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt1}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                company_insight = response1.choices[0].message.content.strip()
-                st.markdown(company_insight)
+        insight_section("Generate Company Insights", lambda: company_prompt(company, profile.row, profile.stats, COLS, PROMPT_TOKEN_BUDGET, YEAR), "Generating company insights...")
 
     st.markdown("""
         <div style='text-align: center; margin-top: 20px;'>
@@ -297,45 +538,29 @@ with tabs[0]:
         </div>
         """, unsafe_allow_html=True)
 
+with tabs[0]:
+    company_tab()
+
 
 # --- Tab 2: Sectors with LLM summary ---
-with tabs[1]:
+@traced_fragment
+def sectors_tab():
     st.header("Sectors")
-
-    # Prepare data sources for charts
-    if bvd_sector_col and bvd_sector_col in DF.columns:
-        bvd_df = DF[bvd_sector_col].value_counts().sort_values(ascending=False).reset_index()
-        bvd_df.columns = [bvd_sector_col, 'count']
-    else:
-        bvd_df = pd.DataFrame(columns=[bvd_sector_col, 'count'])
-
-    if topic_col in DF.columns:
-        topic_df = DF[topic_col].value_counts().sort_values(ascending=False).reset_index()
-        topic_df.columns = [topic_col, 'count']
-    else:
-        topic_df = pd.DataFrame(columns=[topic_col, 'count'])
+    with TRACER.span("sectors.charts"):
+        charts = sector_charts(CHART_DATASET, tab_charts.chart_inputs(CHART_DATASET, "sectors"))
+    description_filter_note()
 
     # Chart layout
     c1, c2 = st.columns(2)
     with c1:
         with st.container():
             st.subheader("Sector Distribution")
-            chart1 = alt.Chart(bvd_df).mark_bar(color='#5A6272').encode(
-                x=alt.X('count:Q', title='No. of Companies'),
-                y=alt.Y(f"{bvd_sector_col}:N", title="Sector", sort='-x')
-            ).properties(height=400)
-            st.altair_chart(chart1, use_container_width=True)
+            show_chart('sectors.sectors', charts['sectors'])
     with c2:
         with st.container():
             st.subheader("Average Growth Rate by Sector")
-            if growth_col and bvd_sector_col in DF.columns:
-                avg_growth = DF.groupby(bvd_sector_col)[growth_col].mean().reset_index()
-                avg_growth.columns = [bvd_sector_col, 'avg']
-                cg = alt.Chart(avg_growth).mark_bar(color='#A6783D').encode(
-                    x=alt.X('avg:Q', title='Avg. growth rate', axis=alt.Axis(format='.2%')),
-                    y=alt.Y(f"{bvd_sector_col}:N", title="Sector", sort='-x')
-                ).properties(height=400)
-                st.altair_chart(cg, use_container_width=True)
+            if charts['growth'] is not None:
+                show_chart('sectors.growth', charts['growth'])
             else:
                 st.write("No growth data available.")
 
@@ -343,77 +568,46 @@ with tabs[1]:
     with c3:
         with st.container():
             st.subheader("Topic Distribution")
-            chart2 = alt.Chart(topic_df).mark_bar(color='#7D8A9C').encode(
-                x=alt.X('count:Q', title='No. of Companies'),
-                y=alt.Y(f"{topic_col}:N", title="Topic", sort='-x')
-            ).properties(height=400)
-            st.altair_chart(chart2, use_container_width=True)
+            show_chart('sectors.topics', charts['topics'])
     with c4:
         with st.container():
             st.subheader("Average Company Size by Sector")
-            if emp_col and bvd_sector_col in DF.columns:
-                avg_emp = DF.groupby(bvd_sector_col)[emp_col].mean().reset_index()
-                avg_emp.columns = [bvd_sector_col, 'avg']
-                avg_emp['avg'] = avg_emp['avg'].round(2)
-                ce = alt.Chart(avg_emp).mark_bar(color='#6A8E61').encode(
-                    x=alt.X('avg:Q', title='Avg. no. of Employees'),
-                    y=alt.Y(f"{bvd_sector_col}:N", title="Sector", sort='-x')
-                ).properties(height=400)
-                st.altair_chart(ce, use_container_width=True)
+            if charts['employees'] is not None:
+                show_chart('sectors.employees', charts['employees'])
             else:
                 st.write("No employee data available.")
 
+    year_over_year_table(
+        lambda: year_over_year(DATASET, PREVIOUS, ["rows", "emp_mean", "growth_mean"]).sort_values("rows", ascending=False),
+        {"emp_mean": "Avg employees", "growth_mean": "Avg growth"})
+
     # Automated Insight via Groq
     st.markdown("---")
     with st.container():
         st.subheader("AI-generated Insights on Sector Graphs")
-        if st.button("Generate Sector Insights"):
-            with st.spinner("Generating insights..."):
-                # Construct LLM input
-                payload = {
-                    'top_sectors': bvd_df.head(5).to_dict(orient='records'),
-                    'avg_growth': avg_growth.to_dict(orient='records') if 'avg_growth' in locals() else [],
-                    'top_topics': topic_df.head(5).to_dict(orient='records'),
-                    'avg_employees': avg_emp.to_dict(orient='records') if 'avg_emp' in locals() else []
-                }
-                prompt_content = (
-                    "You are an expert data analyst. "
-                    "Given these summaries of Danish companies, write a concise paragraph highlighting key trends and noteworthy observations.\n"
-                    f"Top 5 sectors by company count: {payload['top_sectors']}\n"
-                    f"Average growth rate by sector: {payload['avg_growth']}\n"
-                    f"Top 5 topics by company count: {payload['top_topics']}\n"
-                    f"Average employees by sector: {payload['avg_employees']}"
-                )
-                client = groq.Groq(api_key=GROQ_API_KEY)
-                response = client.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt_content}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                insight = response.choices[0].message.content.strip()
-                st.markdown(insight)
+        # Describes the charts above, so it follows the description search too
+        description_filter_note("This insight describes")
+        insight_section("Generate Sector Insights", lambda: sector_overview_prompt(CHART_DATASET.cube, CHART_DATASET.topic_counts, COLS, PROMPT_TOKEN_BUDGET, YEAR, DESCRIPTION_FILTER), "Generating insights...")
     st.markdown("---")
     with st.container():
         st.subheader("Filter by Sector for Sector Metrics")
-        if bvd_sector_col and bvd_sector_col in DF.columns:
+        if bvd_sector_col:
             with st.container():
-                sel = st.selectbox("Select a Sector", sorted(DF[bvd_sector_col].dropna().unique()))
-            df_sel = DF[DF[bvd_sector_col] == sel]
+                sel = st.selectbox("Select a Sector", sorted(sector_view(CUBE).index))
+            with TRACER.span("sectors.summary", sector=sel):
+                sel_summary = sector_summary(DATASET, sel)
 
             sec_cols = ['Employees', 'Growth Rate', 'AAGR']
             sec_keys = [emp_col, growth_col, aagr_col]
+            sec_metrics = ['emp', 'growth', 'aagr']
             s1, s2, s3 = st.columns(3)
 
-            for mcol, label, key in zip([s1, s2, s3], sec_cols, sec_keys):
+            for mcol, label, key, metric in zip([s1, s2, s3], sec_cols, sec_keys, sec_metrics):
                 with mcol:
                     st.subheader(f"**{label}**")
-                    if key and key in df_sel:
-                        series = df_sel[key].dropna()
-                        avg = series.mean()
-                        med = series.median()
-                        p10 = series.quantile(0.1)
-                        p90 = series.quantile(0.9)
+                    if key and metric in sel_summary.metrics:
+                        summary = sel_summary.metrics[metric]
+                        avg, med, p10, p90 = summary.mean, summary.median, summary.p10, summary.p90
                         suffix = '%' if 'growth' in key.lower() or 'aagr' in key.lower() else ''
                         st.markdown(f"**Sector Average:** {avg:.2f}{suffix}")
                         st.markdown(f"**Sector Median:** {med:.2f}{suffix}")
@@ -426,70 +620,34 @@ with tabs[1]:
     st.markdown("---")
     with st.container():
         st.subheader("AI-generated Insights on different Sectors")
-        if st.button("Generate Selected Sector Insights"):
-            with st.spinner("Generating sector-specific insights..."):
-                # Prepare selected sector stats
-                sel_name = sel
-                stats_series = {}
-                for key, label in zip([emp_col, growth_col, aagr_col], ['Employees', 'Growth Rate', 'AAGR']):
-                    if key and key in df_sel:
-                        series = df_sel[key].dropna()
-                        stats_series[label] = {
-                            'average': series.mean(),
-                            'median': series.median(),
-                            '10th_percentile': series.quantile(0.1),
-                            '90th_percentile': series.quantile(0.9)
-                        }
-                # Build prompt for sector insight
-                prompt2 = (
-                    f"You are an expert industry analyst. Provide a concise paragraph summarizing the performance of the '{sel_name}' sector in Denmark in 2023. "
-                    "Include key metrics such as average, median, 10th and 90th percentiles for Employees, Growth Rate, and AAGR as provided below:"
-                    f"{stats_series}"
-                )
-                client2 = groq.Groq(api_key=GROQ_API_KEY)
-                response2 = client2.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt2}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                sector_insight = response2.choices[0].message.content.strip()
-                st.markdown(sector_insight)
+        insight_section("Generate Selected Sector Insights", lambda: selected_sector_prompt(sel, CUBE, COLS, PROMPT_TOKEN_BUDGET, YEAR), "Generating sector-specific insights...")
+
+with tabs[1]:
+    sectors_tab()
 
 # Tab 3: Regions
-with tabs[2]:
+@traced_fragment
+def regions_tab():
     st.header("Regions")
 
-    region_col = next((c for c in DF.columns if "region" in c.lower()), None)
-
     if region_col and region_col in DF.columns:
+        with TRACER.span("regions.charts"):
+            charts = region_charts(CHART_DATASET, tab_charts.chart_inputs(CHART_DATASET, "regions"), CHART_MAX_SLICES)
+        description_filter_note()
+
         # Create top two graphs
         r1, r2 = st.columns(2)
 
         with r1:
             with st.container():
                 st.subheader("Number of Businesses per Region")
-                region_count = DF[region_col].value_counts().reset_index()
-                region_count.columns = [region_col, 'count']
-                chart_r1 = alt.Chart(region_count).mark_bar(color='#5A6272').encode(
-                    x=alt.X('count:Q', title='No. of Companies in Region'),
-                    y=alt.Y(f'{region_col}:N', sort='-x')
-                ).properties(height=600)
-                st.altair_chart(chart_r1, use_container_width=True)
+                show_chart('regions.companies', charts['companies'])
 
         with r2:
             with st.container():
                 st.subheader("Average Growth Rate per Region")
-                if growth_col:
-                    avg_growth_region = DF.groupby(region_col)[growth_col].mean().reset_index()
-                    avg_growth_region.columns = [region_col, 'avg_growth']
-                    chart_r2 = alt.Chart(avg_growth_region).mark_bar(color='#A6783D').encode(
-                       x=alt.X('avg_growth:Q',
-                            title='Avg. Growth in Region',
-                            axis=alt.Axis(format='.2%')),
-                        y=alt.Y(f'{region_col}:N', sort='-x')
-                    ).properties(height=600)
-                    st.altair_chart(chart_r2, use_container_width=True)
+                if charts['growth'] is not None:
+                    show_chart('regions.growth', charts['growth'])
                 else:
                     st.write("No growth data available.")
 
@@ -498,118 +656,52 @@ with tabs[2]:
         with r3:
             with st.container():
                 st.subheader("Percentage of Businesses per Region")
-                region_count = DF[region_col].value_counts().reset_index()
-                region_count.columns = [region_col, 'count']
-                total_companies = region_count['count'].sum()
-                region_count['percentage'] = (region_count['count'] / total_companies) * 100
-
-                chart_r3 = alt.Chart(region_count).mark_arc(innerRadius=50).encode(
-                    theta=alt.Theta(field="percentage", type="quantitative"),
-                    color=alt.Color(
-                        f"{region_col}:N",
-                        scale=alt.Scale(range=muted_colors),  
-                        legend=alt.Legend(title="Region")
-                    ),
-                    tooltip=[
-                        f"{region_col}:N",
-                        alt.Tooltip("percentage:Q", format=".2f")
-                    ]
-                ).properties(width=600, height=600)
-
-                st.altair_chart(chart_r3, use_container_width=True)
+                show_chart('regions.company_share', charts['company_share'])
 
 
         with r4:
             with st.container():
                 st.subheader("Percentage of Employees per Region")
-                if emp_col:
-                    emp_region = DF.groupby(region_col)[emp_col].sum().reset_index()
-                    emp_region.columns = [region_col, 'total_employees']
-                    total_employees = emp_region['total_employees'].sum()
-                    emp_region['percentage'] = (emp_region['total_employees'] / total_employees) * 100
-
-                    chart_r4 = alt.Chart(emp_region).mark_arc(innerRadius=50).encode(
-                        theta=alt.Theta(field="percentage", type="quantitative"),
-                        color=alt.Color(
-                            f"{region_col}:N",
-                            scale=alt.Scale(range=muted_colors),  
-                            legend=alt.Legend(title="Region")
-                        ),
-                        tooltip=[
-                            f"{region_col}:N",
-                            alt.Tooltip("percentage:Q", format=".2f")
-                        ]
-                    ).properties(width=600, height=600)
-
-                    st.altair_chart(chart_r4, use_container_width=True)
+                if charts['employee_share'] is not None:
+                    show_chart('regions.employee_share', charts['employee_share'])
                 else:
                     st.write("No employee data available.")
 
-# Automated Insight for Regions Overview
+        year_over_year_table(
+            lambda: year_over_year(DATASET, PREVIOUS, ["emp_sum", "growth_mean"], by="region"),
+            {"emp_sum": "Employees", "growth_mean": "Avg growth"})
+
+    # Automated Insight for Regions Overview
     st.markdown("---")
     with st.container():
         st.subheader("AI-generated Insights on different Regions")
-        if st.button("Generate Regions Insights"):
-            with st.spinner("Generating regions overview insights..."):
-                # Compute summary data
-                # Count distinct regions and identify top region by company count
-                total_regions = region_count[region_col].nunique()
-                top_region = region_count.iloc[0][region_col] if not region_count.empty else None
-                top_count = region_count.iloc[0]['count'] if not region_count.empty else None
-                avg_growth_overall = DF[growth_col].mean() if growth_col in DF.columns else None
-                # Build prompt for regions insight
-                prompt3 = (
-                    "You are a data analyst. Provide a brief summary of the Danish regions overview for 2023. "
-                    f"There are {total_regions} regions. The region with the most companies is {top_region} ({top_count} companies). "
-                    f"The overall average growth across regions is {avg_growth_overall:.2%}."
-                )
-                client3 = groq.Groq(api_key=GROQ_API_KEY)
-                response3 = client3.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt3}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                insight3 = response3.choices[0].message.content.strip()
-                st.markdown(insight3)
+        description_filter_note("This insight describes")
+        insight_section("Generate Regions Insights", lambda: regions_prompt(CHART_DATASET.cube, COLS, PROMPT_TOKEN_BUDGET, YEAR, DESCRIPTION_FILTER), "Generating regions overview insights...")
+
+with tabs[2]:
+    regions_tab()
 
 # Tab 4: Sectors with charts and filters
-with tabs[3]:
+@traced_fragment
+def region_deep_dive_tab():
     st.header("Regions deep-dive")
 
-    region_col = next((c for c in DF.columns if "region" in c.lower()), None)
     if region_col and region_col in DF.columns:
 
         with st.container():
-            selected_region = st.selectbox("Select a Region", sorted(DF[region_col].dropna().unique()))
+            selected_region = st.selectbox("Select a Region", sorted(region_view(CUBE).index))
 
-        df_region = DF[DF[region_col] == selected_region]
+        with TRACER.span("region_deep_dive.charts", region=selected_region):
+            inputs = tab_charts.chart_inputs(DATASET, "region_deep_dive", selected_region)
+            charts = region_deep_dive_charts(DATASET, selected_region, inputs, CHART_MAX_SLICES)
 
         b1, b2 = st.columns(2)
 
         with b1:
             with st.container():
                 st.subheader(f"Businesses by Sector in {selected_region}")
-                if bvd_sector_col:
-                    sector_count = df_region[bvd_sector_col].value_counts().reset_index()
-                    sector_count.columns = [bvd_sector_col, 'count']
-                    total_companies = sector_count['count'].sum()
-                    sector_count['percentage'] = (sector_count['count'] / total_companies) * 100
-
-                    chart_b1 = alt.Chart(sector_count).mark_arc(innerRadius=50).encode(
-                        theta=alt.Theta(field="percentage", type="quantitative"),
-                        color=alt.Color(
-                            f"{bvd_sector_col}:N",
-                            scale=alt.Scale(range=muted_colors),  # << Here!
-                            legend=alt.Legend(title="Sector")
-                        ),
-                        tooltip=[
-                            alt.Tooltip(f"{bvd_sector_col}:N", title="Sector"),
-                            alt.Tooltip('percentage:Q', title="Percentage", format=".2f")
-                        ]
-                    ).properties(width=600, height=600)
-
-                    st.altair_chart(chart_b1, use_container_width=True)
+                if charts['companies'] is not None:
+                    show_chart('region_deep_dive.companies', charts['companies'])
                 else:
                     st.write("No sector data available.")
 
@@ -617,26 +709,8 @@ with tabs[3]:
         with b2:
             with st.container():
                 st.subheader(f"Employees by Sector in {selected_region}")
-                if emp_col and bvd_sector_col:
-                    emp_sector = df_region.groupby(bvd_sector_col)[emp_col].sum().reset_index()
-                    emp_sector.columns = [bvd_sector_col, 'total_employees']
-                    total_employees = emp_sector['total_employees'].sum()
-                    emp_sector['percentage'] = (emp_sector['total_employees'] / total_employees) * 100
-
-                    chart_b2 = alt.Chart(emp_sector).mark_arc(innerRadius=50).encode(
-                        theta=alt.Theta(field="percentage", type="quantitative"),
-                        color=alt.Color(
-                            f"{bvd_sector_col}:N",
-                            scale=alt.Scale(range=muted_colors),  # << Here too!
-                            legend=alt.Legend(title="Sector")
-                        ),
-                        tooltip=[
-                            alt.Tooltip(f"{bvd_sector_col}:N", title="Sector"),
-                            alt.Tooltip('percentage:Q', title="Percentage", format=".2f")
-                        ]
-                    ).properties(width=600, height=600)
-
-                    st.altair_chart(chart_b2, use_container_width=True)
+                if charts['employees'] is not None:
+                    show_chart('region_deep_dive.employees', charts['employees'])
                 else:
                     st.write("No employee data available.")
         
@@ -645,31 +719,24 @@ with tabs[3]:
         with b3:
             with st.container():
                 st.subheader(f"Growth Rates by Sector in {selected_region}")
-                if growth_col and bvd_sector_col:
-                    growth_sector = df_region.groupby(bvd_sector_col)[growth_col].mean().reset_index()
-                    growth_sector.columns = [bvd_sector_col, 'avg_growth']
-                    chart_b3 = alt.Chart(growth_sector).mark_bar(color='#A6783D').encode(
-                        x=alt.X('avg_growth:Q', title=f'Average Growth Rate in Sector in {selected_region}', axis=alt.Axis(format='.2%')),
-                        y=alt.Y(f'{bvd_sector_col}:N', title = "Sector", sort='-x')
-                    ).properties(height=600)
-                    st.altair_chart(chart_b3, use_container_width=True)
+                if charts['growth'] is not None:
+                    show_chart('region_deep_dive.growth', charts['growth'])
                 else:
                     st.write("No growth data available.")
 
         with b4:
             with st.container():
                 st.subheader(f"AAGR by Sector in {selected_region}")
-                if 'aagr 2023' in df_region.columns and bvd_sector_col:
-                    aagr_sector = df_region.groupby(bvd_sector_col)['aagr 2023'].mean().reset_index()
-                    aagr_sector.columns = [bvd_sector_col, 'avg_aagr']
-                    chart_b4 = alt.Chart(aagr_sector).mark_bar(color='#6A8E61').encode(
-                        x=alt.X('avg_aagr:Q', title=f'Average AAGR in Sector in {selected_region}', axis=alt.Axis(format='.2%')),
-                        y=alt.Y(f'{bvd_sector_col}:N', title="Sector", sort='-x')
-                    ).properties(height=600)
-                    st.altair_chart(chart_b4, use_container_width=True)
+                if charts['aagr'] is not None:
+                    show_chart('region_deep_dive.aagr', charts['aagr'])
                 else:
                     st.write("No AAGR data available.")
 
+        year_over_year_table(
+            lambda: year_over_year(DATASET, PREVIOUS, ["rows", "emp_sum", "growth_mean", "aagr_mean"],
+                                   region=selected_region).sort_values("rows", ascending=False),
+            {"emp_sum": "Employees", "growth_mean": "Avg growth", "aagr_mean": "Avg AAGR"})
+
     else:
         st.write("No region data available.")
 
@@ -677,79 +744,34 @@ with tabs[3]:
     st.markdown("---")
     with st.container():
         st.subheader(f"AI-generated Insights for {selected_region}")
-        if st.button(f"Generate Deep-Dive Insights for {selected_region}"):
-            with st.spinner("Generating deep-dive insights..."):
-                # Summarize region deep-dive metrics
-                # Top sector by number of businesses
-                top_sector = sector_count.iloc[0][bvd_sector_col] if not sector_count.empty else None
-                top_sector_count = sector_count.iloc[0]['count'] if not sector_count.empty else None
-                # Sector employing most employees
-                top_emp_sector = emp_sector.sort_values('total_employees', ascending=False).iloc[0][bvd_sector_col] if not emp_sector.empty else None
-                top_emp_count = emp_sector.sort_values('total_employees', ascending=False).iloc[0]['total_employees'] if not emp_sector.empty else None
-                # Sector with highest average growth
-                top_growth_sector = growth_sector.sort_values('avg_growth', ascending=False).iloc[0][bvd_sector_col] if not growth_sector.empty else None
-                top_growth_rate = growth_sector.sort_values('avg_growth', ascending=False).iloc[0]['avg_growth'] if not growth_sector.empty else None
-                # Sector with highest AAGR
-                top_aagr_sector = aagr_sector.sort_values('avg_aagr', ascending=False).iloc[0][bvd_sector_col] if not 'aagr_sector' in locals() or not aagr_sector.empty else None
-                top_aagr_rate = aagr_sector.sort_values('avg_aagr', ascending=False).iloc[0]['avg_aagr'] if not 'aagr_sector' in locals() or not aagr_sector.empty else None
-                # Build prompt
-                prompt4 = (
-                    f"You are an expert data analyst. Provide a concise summary of the business landscape in {selected_region} based on the deep-dive analysis. "
-                    f"The top sector by company count is {top_sector} ({top_sector_count} companies). "
-                    f"The sector employing the most employees is {top_emp_sector} ({top_emp_count} employees). "
-                    f"The sector with the highest average growth is {top_growth_sector} ({top_growth_rate:.2%}). "
-                    f"The sector with the highest average AAGR is {top_aagr_sector} ({top_aagr_rate:.2%})."
-                )
-                client4 = groq.Groq(api_key=GROQ_API_KEY)
-                response4 = client4.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt4}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                deep_insight = response4.choices[0].message.content.strip()
-                st.markdown(deep_insight)
+        insight_section(f"Generate Deep-Dive Insights for {selected_region}", lambda: region_deep_dive_prompt(selected_region, CUBE, COLS, PROMPT_TOKEN_BUDGET, YEAR), "Generating deep-dive insights...")
+
+with tabs[3]:
+    region_deep_dive_tab()
 
 # Tab 5: Company Age
-with tabs[4]:
+@traced_fragment
+def age_tab():
     st.header("Company Age")
 
     if age_col:
+        with TRACER.span("age.charts"):
+            charts = age_charts(DATASET, tab_charts.chart_inputs(DATASET, "age"))
         b5, b6 = st.columns(2)
 
         with b5:
             with st.container():
                 st.subheader("Average Company Age by Region")
-                avg_age_region = DF.groupby(region_col)[age_col].mean().reset_index()
-                avg_age_region.columns = [region_col, 'avg_age']
-
-                chart_age_region = alt.Chart(avg_age_region).mark_bar(color='#3E5C76').encode(
-                    x=alt.X('avg_age:Q', title='Average Age (years)'),
-                    y=alt.Y(f'{region_col}:N', title='Region', sort='-x'),
-                    tooltip=[
-                        alt.Tooltip(f'{region_col}:N', title='Region'),
-                        alt.Tooltip('avg_age:Q', title='Average Age', format='.2f')
-                    ]
-                ).properties(height=600)
-
-                st.altair_chart(chart_age_region, use_container_width=True)
+                show_chart('age.region', charts['region'])
 
         with b6:
             with st.container():
                 st.subheader("Average Company Age by Sector")
-                avg_age_sector = DF.groupby(bvd_sector_col)[age_col].mean().reset_index()
-                avg_age_sector.columns = [bvd_sector_col, 'avg_age']
-
-                chart_age_sector = alt.Chart(avg_age_sector).mark_bar(color='#665D1E').encode(
-                    x=alt.X('avg_age:Q', title='Average Age (years)'),
-                    y=alt.Y(f'{bvd_sector_col}:N', title='Sector', sort='-x'),
-                    tooltip=[
-                        alt.Tooltip(f'{bvd_sector_col}:N', title='Sector'),
-                        alt.Tooltip('avg_age:Q', title='Average Age', format='.2f')
-                    ]
-                ).properties(height=600)
+                show_chart('age.sector', charts['sector'])
 
-                st.altair_chart(chart_age_sector, use_container_width=True)
+        year_over_year_table(
+            lambda: year_over_year(DATASET, PREVIOUS, ["age_mean", "emp_mean", "growth_mean"], by="region"),
+            {"age_mean": "Avg age", "emp_mean": "Avg employees", "growth_mean": "Avg growth"})
 
     else:
         st.write("No age data available.")
@@ -758,23 +780,19 @@ with tabs[4]:
     st.markdown("---")
     with st.container():
         st.subheader("AI-generated Insights on Company Ages")
-        if st.button("Generate Company Age Insights"):
-            with st.spinner("Generating company age insights..."):
-                # Summarize age metrics
-                overall_avg_age = DF['Company Age'].mean() if 'Company Age' in DF else None
-                min_age = DF['Company Age'].min() if 'Company Age' in DF else None
-                max_age = DF['Company Age'].max() if 'Company Age' in DF else None
-                # Build prompt
-                prompt5 = (
-                    "You are an experienced business analyst. Provide a brief summary of company age statistics in Denmark. "
-                    f"In 2023, the average company age is {overall_avg_age:.1f} years, with the youngest company at {min_age} years and the oldest at {max_age} years."
-                )
-                client5 = groq.Groq(api_key=GROQ_API_KEY)
-                response5 = client5.chat.completions.create(
-                    model="llama-3.3-70b-versatile",
-                    messages=[{"role": "user", "content": prompt5}],
-                    temperature=0.5,
-                    max_tokens=600
-                )
-                age_insight = response5.choices[0].message.content.strip()
-                st.markdown(age_insight)
+        insight_section("Generate Company Age Insights", lambda: age_prompt(CUBE, COLS, PROMPT_TOKEN_BUDGET, YEAR), "Generating company age insights...")
+
+with tabs[4]:
+    age_tab()
+
+# "Generate all insights": every section's prompt is queued once all panels exist
+if generate_all_insights:
+    generate_all(insight_panels.values())
+
+# Debug panel: the spans of this rerun (fragment reruns are only exported to the trace file)
+if TRACER.enabled:
+    with st.sidebar.expander("Performance trace"):
+        st.dataframe(TRACER.rows(), hide_index=True)
+        if TRACER.export_path:
+            st.caption(f"Spans are appended to {TRACER.export_path}")
+TRACER.flush()
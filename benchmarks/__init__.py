@@ -0,0 +1 @@
+"""Benchmarks for the dashboard's hot paths on synthetic datasets (``python -m benchmarks.run``)."""
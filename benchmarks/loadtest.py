@@ -0,0 +1,201 @@
+"""Load-test the AI insight path with simulated dashboard sessions.
+
+::
+
+    python -m benchmarks.loadtest --sessions 20 --clicks 10
+    python -m benchmarks.loadtest --rate-limit-rate 0.05 --error-rate 0.01 --max-retries 2
+    python -m benchmarks.loadtest --base-url http://127.0.0.1:8765   # a standalone mock_llm server
+    python -m benchmarks.loadtest --rpm 30 --tpm 12000 --concurrency 3   # the dashboard's scheduler limits
+
+Every session is a thread, like a Streamlit script run, and all sessions
+share one provider and scheduler, like ``llm_scheduler()``. A click goes
+through the same steps as ``render_insight``: response-cache lookup, then
+a streamed completion through the scheduler (queued under its rate limits,
+shared with identical pending prompts) that is cached once complete. Prompts are the dashboard's real
+prompts (built by ``dde_dashboard.batch.build_jobs``), picked with a Zipf
+skew so popular insights are clicked more often. Unless ``--base-url`` is
+given, the completions come from an in-process ``dde_dashboard.mock_llm``
+server, through the real Groq client with its retries.
+
+Reports p50/p95/p99 click latency (overall and for cache misses), time to
+first token, throughput, cache hit rate and how many clicks shared a call.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from dde_dashboard.batch import build_jobs
+from dde_dashboard.dataset import DEFAULT_WORKBOOK, Dataset
+from dde_dashboard.llm import PROVIDERS, ChatProvider, make_client
+from dde_dashboard.llm_cache import ResponseCache, cache_key
+from dde_dashboard.mock_llm import MockConfig, MockServer
+from dde_dashboard.scheduler import LLMScheduler
+
+PERCENTILES = (50, 95, 99)
+
+
+def sample_prompts(ds, distinct, seed=0):
+    """``distinct`` prompts drawn from every insight the dashboard can show."""
+    jobs = list(build_jobs(ds))
+    random.Random(seed).shuffle(jobs)
+    prompts = []
+    for _, _, build_prompt in jobs:
+        try:
+            prompts.append(build_prompt())
+        except (KeyError, TypeError, ValueError, IndexError):
+            continue
+        if len(prompts) == distinct:
+            break
+    return prompts
+
+
+def click(scheduler, cache, prompt):
+    """One insight button click; return its record."""
+    import groq
+
+    provider = scheduler.provider
+    started = time.perf_counter()
+    record = {"hit": False, "error": None, "first_token_s": None}
+    key = cache_key(provider.model, prompt, provider.temperature, provider.max_tokens)
+    cached = cache.get(key)
+    if cached is not None:
+        record["hit"] = True
+    else:
+        try:
+            tokens = scheduler.submit(prompt).stream()
+            first = next(tokens, "")
+            record["first_token_s"] = time.perf_counter() - started
+            cache.put(key, provider.model, (first + "".join(tokens)).strip())
+        except groq.APIError as exc:
+            record["error"] = type(exc).__name__
+    record["latency_s"] = time.perf_counter() - started
+    return record
+
+
+def run_sessions(scheduler, cache, prompts, sessions, clicks, think=0.0, zipf=1.1, seed=0):
+    """Run ``sessions`` concurrent sessions of ``clicks`` clicks each; return (records, wall seconds)."""
+    weights = [1.0 / (rank + 1) ** zipf for rank in range(len(prompts))]
+    records = []
+    lock = threading.Lock()
+
+    def session(i):
+        rng = random.Random(seed + i)
+        for _ in range(clicks):
+            if think:
+                time.sleep(rng.expovariate(1.0 / think))
+            record = click(scheduler, cache, rng.choices(prompts, weights)[0])
+            with lock:
+                records.append(record)
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, time.perf_counter() - started
+
+
+def percentiles(values):
+    if not values:
+        return {f"p{p}": None for p in PERCENTILES}
+    return {f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def summarize(records, wall_s, stats):
+    errors = {}
+    for record in records:
+        if record["error"]:
+            errors[record["error"]] = errors.get(record["error"], 0) + 1
+    answered = [r for r in records if not r["error"]]
+    hits = sum(r["hit"] for r in records)
+    return {
+        "clicks": len(records),
+        "wall_s": wall_s,
+        "throughput_per_s": len(records) / wall_s if wall_s else None,
+        "cache_hit_rate": hits / len(records) if records else None,
+        "errors": errors,
+        "upstream_calls": stats["started"],
+        "shared_calls": stats["coalesced"],
+        "latency_s": percentiles([r["latency_s"] for r in answered]),
+        "miss_latency_s": percentiles([r["latency_s"] for r in answered if not r["hit"]]),
+        "first_token_s": percentiles([r["first_token_s"] for r in answered if r["first_token_s"] is not None]),
+    }
+
+
+def print_summary(summary):
+    print(f"{summary['clicks']} clicks in {summary['wall_s']:.1f}s -> {summary['throughput_per_s']:.1f} clicks/s")
+    errors = ", ".join(f"{name} {count}" for name, count in sorted(summary["errors"].items())) or "none"
+    print(f"cache hit rate {summary['cache_hit_rate']:.1%}, errors: {errors}")
+    print(f"{summary['upstream_calls']} upstream calls, {summary['shared_calls']} clicks shared a pending call")
+    print(f"  {'':<16}" + "".join(f"{f'p{p}':>10}" for p in PERCENTILES))
+    for label, key in (("latency", "latency_s"), ("miss latency", "miss_latency_s"), ("first token", "first_token_s")):
+        values = summary[key]
+        cells = "".join(f"{values[f'p{p}']:9.3f}s" if values[f"p{p}"] is not None else f"{'-':>10}"
+                        for p in PERCENTILES)
+        print(f"  {label:<16}{cells}")
+
+
+def main(argv=None):
+    defaults = MockConfig()
+    parser = argparse.ArgumentParser(description="Load-test the AI insight path with simulated sessions.")
+    parser.add_argument("--sessions", type=int, default=20, help="concurrent dashboard sessions")
+    parser.add_argument("--clicks", type=int, default=10, help="insight clicks per session")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds between a session's clicks")
+    parser.add_argument("--distinct", type=int, default=40, help="distinct insights clicked")
+    parser.add_argument("--zipf", type=float, default=1.1, help="popularity skew of the insights")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--base-url", help="OpenAI/Groq-compatible server to test instead of the in-process mock")
+    parser.add_argument("--max-retries", type=int, default=4, help="client retries (as GROQ_MAX_RETRIES)")
+    parser.add_argument("--max-connections", type=int, default=20, help="client pool size (as GROQ_MAX_CONNECTIONS)")
+    parser.add_argument("--rpm", type=float, default=0, help="scheduler requests per minute (as LLM_RPM; 0 = no limit)")
+    parser.add_argument("--tpm", type=float, default=0, help="scheduler tokens per minute (as LLM_TPM; 0 = no limit)")
+    parser.add_argument("--concurrency", type=int, default=20, help="calls in flight (as INSIGHT_CONCURRENCY)")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="mock: seconds to the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="mock: share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="mock: share of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--output", help="also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url
+    if base_url is None:
+        config = MockConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                            response_tokens=args.response_tokens, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, seed=args.seed)
+        base_url = MockServer(config).start().url
+    client = make_client(os.getenv("GROQ_API_KEY") or "loadtest", base_url=base_url,
+                         max_retries=args.max_retries, max_connections=args.max_connections)
+    scheduler = LLMScheduler(ChatProvider(client, model=PROVIDERS["mock"]), args.rpm, args.tpm, args.concurrency)
+
+    prompts = sample_prompts(Dataset.load(args.workbook), args.distinct, args.seed)
+    print(f"{args.sessions} sessions x {args.clicks} clicks over {len(prompts)} insights against {base_url}")
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = ResponseCache(os.path.join(workdir, "cache.sqlite3"))
+        records, wall_s = run_sessions(scheduler, cache, prompts, args.sessions, args.clicks,
+                                       args.think, args.zipf, args.seed)
+    scheduler.close()
+    scheduler.provider.close()
+
+    summary = summarize(records, wall_s, scheduler.stats)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"arguments": vars(args), **summary}, fh, indent=2)
+        print(f"summary written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
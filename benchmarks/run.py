@@ -0,0 +1,276 @@
+"""Time the dashboard's hot paths on synthetic datasets and write the results as JSON.
+
+::
+
+    python -m benchmarks.run                        # 10k, 100k, 1M and 10M rows
+    python -m benchmarks.run --sizes 10000 100000 --compare benchmarks/results/<earlier>.json
+
+Each step is timed ``--repeat`` times (best and mean are reported) and
+then run once more under tracemalloc for its peak Python-heap allocation.
+Arrow buffers are allocated outside the Python heap, so the load step's
+peak understates it; the process-wide maximum RSS is recorded as well.
+The cube update is timed as the dashboard runs it and with the merge
+forced; the size from which the merge wins is recorded as
+``cube_crossover`` next to the thresholds of
+:func:`~dde_dashboard.cube.update_aggregate_cube`.
+``--compare`` prints each step's slowdown against an earlier result file
+and exits with status 1 when any step got slower than ``--threshold``.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from dde_dashboard import charts
+from dde_dashboard.analytics import age_summary, company_profile, peer_group, region_summary, sector_summary
+from dde_dashboard.cube import (INCREMENTAL_MAX_CHANGED, INCREMENTAL_MIN_ROWS, build_aggregate_cube, region_view,
+                                sector_view, update_aggregate_cube, value_counts_desc)
+from dde_dashboard.dataset import Dataset, frame_from_table
+from dde_dashboard.fulltext import FullTextIndex
+from dde_dashboard.indexes import build_company_index, build_rank_table, update_rank_table
+from dde_dashboard.peers import PeerIndex
+from dde_dashboard.search import CompanySearchIndex
+from dde_dashboard.sql import SqlBackend
+from dde_dashboard.store import LazyTextColumn, read_arrow
+from dde_dashboard.years import read_year, to_long, write_year
+
+from .synthetic import YEAR, synthetic_companies
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+# Description searches: a rare term, a common one and a two-term query
+FULLTEXT_QUERIES = ["software", "danish company", "retail greenland"]
+
+
+def write_arrow(df, path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def measure(fn, repeat, memory):
+    """Run ``fn`` ``repeat`` times; return (result of the last run, timing dict)."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    timing = {"best_s": min(times), "mean_s": sum(times) / len(times)}
+    if memory:
+        tracemalloc.start()
+        fn()
+        timing["peak_mb"] = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return result, timing
+
+
+def bench_size(n, workdir, repeat=3, lookups=1000, seed=0, memory=True):
+    """Time every step on an ``n``-row synthetic dataset; return {step: timing}."""
+    path = os.path.join(workdir, f"synthetic-{n}.arrow")
+    write_arrow(synthetic_companies(n, seed, descriptions=True), path)
+    steps = {}
+
+    def step(name, fn, per_call=1):
+        result, timing = measure(fn, repeat, memory)
+        if per_call != 1:
+            timing["calls"] = per_call
+            timing["per_call_us"] = timing["best_s"] / per_call * 1e6
+        steps[name] = timing
+        return result
+
+    # Memory-mapped read of the Arrow cache plus compaction and Company Age, as Dataset.load does
+    df, cols = step("load", lambda: frame_from_table(read_arrow(path)))
+    ds = Dataset(df, cols, LazyTextColumn(read_arrow(path), cols.description))
+
+    ds.company_index = step("company_index", lambda: build_company_index(df, cols.company))
+    ds.search_index = step("search_index", lambda: CompanySearchIndex(ds.company_index))
+    ds.fulltext = step("fulltext_index", lambda: FullTextIndex.build(ds.descriptions[i] for i in range(n)))
+    ds.peer_index = step("peer_index", lambda: PeerIndex.from_frame(df, cols))
+    ds.ranks = step("rank_table", lambda: build_rank_table(df, cols.metrics, cols.sector))
+    ds.cube = step("aggregate_cube", lambda: build_aggregate_cube(df, cols.sector, cols.region, cols.metrics,
+                                                                  reported=list(cols.reported.values())))
+    ds.topic_counts = step("topic_counts", lambda: value_counts_desc(df, cols.topic))
+    # A delta changing the growth of a few companies: only their cells and marginals are updated
+    changed = np.random.default_rng(seed).choice(n, size=min(n, 10), replace=False)
+    updated = df.copy()
+    updated.iloc[changed, updated.columns.get_loc(cols.growth)] = 0.5
+    sectors = set(df[cols.sector].iloc[changed])
+    step("rank_table_update", lambda: update_rank_table(ds.ranks, updated, cols.metrics, cols.sector,
+                                                        {cols.growth}, sectors))
+    def update_cube(**thresholds):
+        return update_aggregate_cube(ds.cube, updated, df.iloc[changed], updated.iloc[changed], cols.sector,
+                                     cols.region, cols.metrics, reported=list(cols.reported.values()), **thresholds)
+
+    # As the dashboard runs it (rebuilding below the thresholds), and always merging
+    step("aggregate_cube_update", update_cube)
+    step("aggregate_cube_merge", lambda: update_cube(min_rows=0, max_changed=1))
+    # Year partitions: the table's own year, read back in row order, and an added year written in
+    # another order, which is lined up by key
+    table = read_arrow(path)
+    years_dir = os.path.join(workdir, f"synthetic-{n}.years")
+    step("year_write", lambda: write_year(years_dir, YEAR, to_long(table, [YEAR])))
+    shuffled = to_long(table, [YEAR]).take(np.random.default_rng(seed).permutation(n))
+    write_year(years_dir, YEAR - 1, shuffled)
+    step("year_read", lambda: read_year(years_dir, table, YEAR))
+    step("year_read_keyed", lambda: read_year(years_dir, table, YEAR - 1))
+    shutil.rmtree(years_dir)
+    if importlib.util.find_spec("duckdb"):
+        # The optional DuckDB backend (DDE_QUERY_BACKEND=duckdb) on the same frame
+        sql = step("sql_connect", lambda: SqlBackend(df, cols))
+        step("aggregate_cube_duckdb", sql.cube)
+        step("sql_slice", lambda: sql.aggregate(["topic"], where={"age_band": "0-4", "region": "Hovedstaden"}))
+
+    rng = np.random.default_rng(seed)
+    names = list(ds.company_index)
+    sample = [names[i] for i in rng.integers(len(names), size=lookups)]
+    step("company_lookup", lambda: [company_profile(ds, name) for name in sample], per_call=lookups)
+    # What a user types into the company search box: the first few letters of a name
+    queries = [name[:4] for name in sample]
+    step("company_search", lambda: [ds.search_index.search(query) for query in queries], per_call=lookups)
+    peer_sample = sample[:max(1, lookups // 10)]
+    step("peer_lookup", lambda: [peer_group(ds, name) for name in peer_sample], per_call=len(peer_sample))
+    step("fulltext_search", lambda: [ds.fulltext.search(query) for query in FULLTEXT_QUERIES],
+         per_call=len(FULLTEXT_QUERIES))
+
+    sectors = list(sector_view(ds.cube).index)
+    regions = list(region_view(ds.cube).index)
+    step("tab_sectors", lambda: [sector_summary(ds, sector) for sector in sectors], per_call=len(sectors))
+    step("tab_regions", lambda: region_view(ds.cube)["rows"].sort_values(ascending=False))
+    step("tab_region_deep_dive", lambda: [region_summary(ds, region) for region in regions], per_call=len(regions))
+    step("tab_age", lambda: age_summary(ds))
+
+    step("charts_sectors", lambda: charts.chart_specs(charts.sector_charts(ds)))
+    step("charts_regions", lambda: charts.chart_specs(charts.region_charts(ds)))
+    step("charts_region_deep_dive", lambda: charts.chart_specs(charts.region_deep_dive_charts(ds, regions[0])))
+    step("charts_age", lambda: charts.chart_specs(charts.age_charts(ds)))
+    os.remove(path)
+    return steps
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2**20 if sys.platform == "darwin" else rss / 2**10
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    import altair
+
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "numpy": np.__version__,
+        "altair": altair.__version__,
+    }
+
+
+def compare(results, baseline, threshold, min_seconds=0.001):
+    """Print each step's slowdown against ``baseline``; return the (size, step) pairs over ``threshold``."""
+    regressions = []
+    for size, current in results["sizes"].items():
+        before = baseline.get("sizes", {}).get(size)
+        if before is None:
+            continue
+        for name, timing in current["steps"].items():
+            old = before["steps"].get(name)
+            if old is None:
+                continue
+            ratio = timing["best_s"] / old["best_s"] if old["best_s"] else float("inf")
+            flag = ""
+            if ratio > threshold and max(timing["best_s"], old["best_s"]) >= min_seconds:
+                regressions.append((size, name))
+                flag = "  <-- slower"
+            print(f"{size:>10} {name:<24} {old['best_s']:10.4f}s -> {timing['best_s']:10.4f}s  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def cube_crossover(results):
+    """Where merging a small delta into the cube starts beating a rebuild, next to the thresholds in use.
+
+    ``merge_faster_from`` is the smallest size from which ``aggregate_cube_merge`` beat
+    ``aggregate_cube`` at every larger size too (None if it never did).
+    """
+    faster = {int(size): entry["steps"]["aggregate_cube_merge"]["best_s"] < entry["steps"]["aggregate_cube"]["best_s"]
+              for size, entry in results["sizes"].items()}
+    crossover = None
+    for size in sorted(faster, reverse=True):
+        if not faster[size]:
+            break
+        crossover = size
+    return {"merge_faster_from": crossover, "min_rows": INCREMENTAL_MIN_ROWS, "max_changed": INCREMENTAL_MAX_CHANGED}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's hot paths on synthetic data.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="rows per dataset")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per step")
+    parser.add_argument("--lookups", type=int, default=1000, help="company lookups per timed run")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown ratio that counts as a regression")
+    args = parser.parse_args(argv)
+
+    results = {"environment": environment(), "sizes": {}}
+    with tempfile.TemporaryDirectory() as workdir:
+        for n in args.sizes:
+            print(f"{n} rows...", flush=True)
+            steps = bench_size(n, workdir, args.repeat, args.lookups, args.seed, not args.no_memory)
+            results["sizes"][str(n)] = {"rows": n, "steps": steps}
+            for name, timing in steps.items():
+                peak = f"{timing['peak_mb']:9.1f} MB" if "peak_mb" in timing else ""
+                print(f"  {name:<24} {timing['best_s']:10.4f}s {peak}")
+    results["max_rss_mb"] = max_rss_mb()
+    results["cube_crossover"] = crossover = cube_crossover(results)
+    measured = (f"beats a rebuild from {crossover['merge_faster_from']} rows" if crossover["merge_faster_from"]
+                else "did not beat a rebuild at these sizes")
+    print(f"cube: merging a delta {measured}; update_aggregate_cube merges from {crossover['min_rows']} rows "
+          f"with up to {crossover['max_changed']:.0%} of them changed")
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}.json")
+    with open(output, "w") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            regressions = compare(results, json.load(fh), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} step(s) slower than x{args.threshold}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
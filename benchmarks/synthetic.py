@@ -0,0 +1,101 @@
+"""Synthetic Danish-company datasets with the workbook's schema.
+
+Sector, topic and region frequencies follow the real workbook, so group
+sizes (and therefore groupby and chart costs) scale the way they would
+with more real data. Company names are unique and use Danish letters.
+"""
+
+import numpy as np
+import pandas as pd
+
+from dde_dashboard.columns import COMPANY_COL, TOPIC_COL
+
+# Year of the synthetic metric columns, like the workbook's
+YEAR = 2023
+
+SECTOR_COL = "BvD sectors"
+REGION_COL = "Region in country"
+DATE_COL = "Date of incorporation"
+EMP_COL = f"Number of employees {YEAR}"
+GROWTH_COL = f"Growth {YEAR}"
+AAGR_COL = f"aagr {YEAR}"
+DESCRIPTION_COL = "Final Description"
+
+# (value, companies in the real workbook)
+SECTORS = [
+    ("Business Services", 265), ("Computer Software", 112), ("Construction", 86), ("Wholesale", 78),
+    ("Travel, Personal & Leisure", 68), ("Transport, Freight & Storage", 55),
+    ("Industrial, Electric & Electronic Machinery", 45),
+    ("Public Administration, Education, Health Social Services", 42),
+    ("Banking, Insurance & Financial Services", 23), ("Retail", 18), ("Metals & Metal Products", 15),
+    ("Utilities", 15), ("Biotechnology and Life Sciences", 14), ("Property Services", 13),
+    ("Media & Broadcasting", 9), ("Agriculture, Horticulture & Livestock", 8),
+    ("Chemicals, Petroleum, Rubber & Plastic", 7), ("Mining & Extraction", 6),
+    ("Wood, Furniture & Paper Manufacturing", 6), ("Food & Tobacco Manufacturing", 5), ("Communications", 3),
+    ("Textiles & Clothing Manufacturing", 3), ("Waste Management & Treatment", 3), ("Printing & Publishing", 2),
+    ("Transport Manufacturing", 2), ("Computer Hardware", 1), ("Leather, Stone, Clay & Glass products", 1),
+    ("Miscellaneous Manufacturing", 1),
+]
+TOPICS = [
+    ("Construction & Real Estate", 116), ("Software & IT", 86), ("Retail & E-Commerce", 67),
+    ("Banking & Financial Services", 65), ("Healthcare & Life Sciences", 63), ("Manufacturing & Industrial", 58),
+    ("Consulting & Professional Services", 40), ("Food & Beverage", 40), ("Transportation & Logistics", 39),
+    ("Energy, Utilities & Infrastructure", 37), ("Hospitality & Tourism", 28), ("Media & Entertainment", 23),
+    ("Marketing & Advertising", 20), ("Environmental & Sustainability", 16), ("Insurance & Risk Management", 16),
+    ("Facilities & Cleaning", 15), ("Agriculture & Agribusiness", 14), ("HR & Recruitment", 13),
+    ("Administrative & Support Services", 12), ("Fintech & Payment Services", 12), ("Fashion & Apparel", 11),
+    ("Engineering & Design", 10), ("Marine & Maritime", 9), ("Robotics & Industrial Automation", 9),
+    ("Automotive & Mobility", 8), ("Education & E-Learning", 7), ("Sports & Recreation", 7),
+    ("AI & Machine Learning", 6), ("Investments & Venture Capital", 6), ("Legal Services & Law Tech", 6),
+    ("Personal Services", 6), ("Procurement & Supply Chain", 5), ("Security & Defense", 5),
+    ("Telecom & Networking", 5), ("Accounting & Financial Consulting", 4), ("Aviation & Aerospace", 4),
+    ("Electronics & Hardware", 4), ("Events & Exhibitions", 4), ("Beauty & Cosmetics", 3),
+    ("Blockchain & Web3", 3), ("Cybersecurity & Data Privacy", 3), ("Repair & Maintenance", 3),
+]
+REGIONS = [
+    ("Hovedstaden", 412), ("Midtjylland", 182), ("Syddanmark", 149), ("Nordjylland", 79), ("Sjaelland", 66),
+    ("Greenland", 7),
+]
+
+NAME_WORDS = [
+    "NORDISK", "DANSK", "JYSK", "FYNS", "ØRESUND", "ÅRHUS", "AALBORG", "SKÆRBÆK", "KØGE", "GRØN",
+    "VESTKYST", "HAVNENS", "BØRSEN", "SØNDERBORG", "LÆSØ", "BORNHOLMS", "VIKING", "NORLYS", "CADELER", "ERRIA",
+]
+NAME_SUFFIXES = ["A/S", "APS", "HOLDING A/S", "& CO. A/S", "I/S", "P/S"]
+
+
+def _categorical(rng, values, n):
+    names = [name for name, _ in values]
+    weights = np.array([count for _, count in values], dtype="float64")
+    codes = rng.choice(len(names), size=n, p=weights / weights.sum())
+    return pd.Categorical.from_codes(codes, categories=names).astype(str)
+
+
+def synthetic_companies(n, seed=0, descriptions=False):
+    """A DataFrame of ``n`` synthetic companies with the workbook's column names.
+
+    With ``descriptions`` a short free-text description column is added too.
+    """
+    rng = np.random.default_rng(seed)
+    words = np.array(NAME_WORDS, dtype=object)[rng.integers(len(NAME_WORDS), size=n)]
+    suffixes = np.array(NAME_SUFFIXES, dtype=object)[rng.integers(len(NAME_SUFFIXES), size=n)]
+    names = pd.Series(words) + " " + pd.Series(np.arange(n)).astype(str) + " " + pd.Series(suffixes)
+
+    # Mostly young companies with a long tail back to the early 1900s
+    age_days = np.minimum(rng.gamma(1.6, 3400.0, size=n), 118 * 365).astype("int64") + 3 * 365
+    incorporated = pd.Timestamp(year=YEAR, month=1, day=1) - pd.to_timedelta(age_days, unit="D")
+
+    df = pd.DataFrame({
+        COMPANY_COL: names,
+        SECTOR_COL: _categorical(rng, SECTORS, n),
+        TOPIC_COL: _categorical(rng, TOPICS, n),
+        REGION_COL: _categorical(rng, REGIONS, n),
+        DATE_COL: incorporated,
+        EMP_COL: np.maximum(18, rng.lognormal(4.0, 1.1, size=n)).astype("int64"),
+        GROWTH_COL: rng.normal(0.25, 0.35, size=n).clip(-0.95, 14.0),
+        AAGR_COL: 20.0 + rng.lognormal(2.4, 0.9, size=n),
+    })
+    if descriptions:
+        df[DESCRIPTION_COL] = (df[COMPANY_COL] + " is a Danish company in " + df[SECTOR_COL]
+                               + " based in " + df[REGION_COL] + ".")
+    return df
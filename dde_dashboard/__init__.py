@@ -0,0 +1,11 @@
+"""Data and analytics helpers behind the Denmark Companies Dashboard.
+
+``dataset.Dataset`` loads one version of the company table and
+``analytics`` answers each tab's questions with typed results
+(``CompanyProfile``, ``SectorSummary``, ``RegionSummary``, ``AgeSummary``).
+
+Nothing here imports streamlit, altair is only imported by ``charts``,
+groq only when an LLM client is built and duckdb only when the optional
+``sql`` backend is used, so the package can be used from batch jobs and
+benchmarks as well as from ``Sess.6_dashboard.py``.
+"""
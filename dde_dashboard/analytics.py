@@ -0,0 +1,204 @@
+"""Typed answers to the questions each dashboard tab asks.
+
+Every function takes a :class:`~dde_dashboard.dataset.Dataset` and reads
+the precomputed structures on it, so the results can be used from the
+dashboard, the batch job or a benchmark alike.
+"""
+
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .cube import ALL, QUANTILES, cube_cell, quantile_label, region_view, sector_view
+from .metrics import company_stats, peer_stats
+from .peers import PEER_COUNT
+
+
+@dataclass(frozen=True)
+class MetricSummary:
+    """Distribution of one metric over a group of companies."""
+    count: int
+    total: float
+    mean: float
+    median: float
+    min: float
+    max: float
+    p10: float
+    p90: float
+
+
+def metric_summaries(cell, cols):
+    """Metric key -> :class:`MetricSummary` for one cube cell."""
+    low, high = (quantile_label(q) for q in QUANTILES)
+    return {
+        key: MetricSummary(
+            count=int(cell[f"{key}_count"]),
+            total=cell[f"{key}_sum"],
+            mean=cell[f"{key}_mean"],
+            median=cell[f"{key}_median"],
+            min=cell[f"{key}_min"],
+            max=cell[f"{key}_max"],
+            p10=cell[f"{key}_{low}"],
+            p90=cell[f"{key}_{high}"],
+        )
+        for key in cols.metrics
+        if f"{key}_mean" in cell
+    }
+
+
+@dataclass(frozen=True)
+class CompanyProfile:
+    """One company's own figures and how it compares with the dataset.
+
+    ``stats`` holds the ``<metric>_avg`` / ``_med`` / ``_pct`` values of
+    :func:`~dde_dashboard.metrics.company_stats`; ``row`` is the company's
+    full row of the table.
+    """
+    name: str
+    position: int
+    row: pd.Series
+    description: str
+    sector: str
+    topic: str
+    incorporated: pd.Timestamp
+    age: int
+    employees: int
+    growth: float
+    aagr: float
+    stats: dict
+
+
+def company_profile(ds, name):
+    """Profile of the company called ``name``; raises KeyError for an unknown name."""
+    cols = ds.cols
+    pos = ds.company_index[name]
+    row = ds.df.iloc[pos]
+
+    def value(col):
+        return row[col] if col and col in row.index else None
+
+    return CompanyProfile(
+        name=name,
+        position=pos,
+        row=row,
+        description=ds.descriptions[pos] if ds.descriptions is not None else None,
+        sector=value(cols.sector),
+        topic=value(cols.topic),
+        incorporated=value(cols.date),
+        age=value(cols.age),
+        employees=value(cols.emp),
+        growth=value(cols.growth),
+        aagr=value(cols.aagr),
+        stats=company_stats(ds.ranks.iloc[pos], cube_cell(ds.cube), cols),
+    )
+
+
+@dataclass(frozen=True)
+class PeerGroup:
+    """A company's nearest neighbours on its metrics, sector and topic.
+
+    ``peers`` has one row per peer, nearest first: the company name, sector,
+    topic, metric columns and a ``distance`` column. ``stats`` compares the
+    company with them, in the shape of :attr:`CompanyProfile.stats`.
+    """
+    name: str
+    peers: pd.DataFrame
+    stats: dict
+
+
+def peer_group(ds, name, k=PEER_COUNT):
+    """The ``k`` companies most similar to ``name``; raises KeyError for an unknown name."""
+    cols = ds.cols
+    pos = ds.company_index[name]
+    positions, distances = ds.peer_index.neighbours(pos, k)
+    columns = [c for c in (cols.company, cols.sector, cols.topic, *cols.metrics.values()) if c and c in ds.df.columns]
+    peers = ds.df.iloc[positions][columns].reset_index(drop=True)
+    peers["distance"] = distances
+    return PeerGroup(name, peers, peer_stats(ds.df, pos, positions, cols))
+
+
+@dataclass(frozen=True)
+class SectorSummary:
+    """Aggregates of one sector, within one region or (``region == ALL``) nationwide."""
+    sector: str
+    region: str
+    companies: int
+    metrics: dict
+
+
+def sector_summary(ds, sector, region=ALL):
+    cell = cube_cell(ds.cube, sector=sector, region=region)
+    return SectorSummary(sector, region, int(cell["rows"]), metric_summaries(cell, ds.cols))
+
+
+@dataclass(frozen=True)
+class RegionSummary:
+    """Aggregates of one region plus its per-sector breakdown (a slice of the cube)."""
+    region: str
+    companies: int
+    metrics: dict
+    sectors: pd.DataFrame
+
+
+def region_summary(ds, region):
+    cell = cube_cell(ds.cube, region=region)
+    return RegionSummary(region, int(cell["rows"]), metric_summaries(cell, ds.cols),
+                         sector_view(ds.cube, region=region))
+
+
+@dataclass(frozen=True)
+class AgeSummary:
+    """Company age statistics nationwide and average age per region and per sector."""
+    overall: MetricSummary
+    by_region: pd.Series
+    by_sector: pd.Series
+
+
+def age_summary(ds):
+    """Age statistics, or None when the dataset has no date of incorporation."""
+    if not ds.cols.age:
+        return None
+    overall = metric_summaries(cube_cell(ds.cube), ds.cols)["age"]
+    by_region = region_view(ds.cube)["age_mean"] if ds.cols.region else pd.Series(dtype="float64")
+    by_sector = sector_view(ds.cube)["age_mean"] if ds.cols.sector else pd.Series(dtype="float64")
+    return AgeSummary(overall, by_region, by_sector)
+
+
+def _side_by_side(now, before, stats):
+    """``now`` and ``before`` joined on their index with ``<stat>``, ``<stat>_prev`` and ``<stat>_change`` columns."""
+    stats = [s for s in stats if s in now.columns and s in before.columns]
+    table = now[stats].join(before[stats], how="outer", rsuffix="_prev")
+    for stat in stats:
+        table[f"{stat}_change"] = table[stat] - table[f"{stat}_prev"]
+    return table[[c for stat in stats for c in (stat, f"{stat}_prev", f"{stat}_change")]]
+
+
+def year_over_year(ds, previous, stats, by="sector", region=ALL):
+    """Cube ``stats`` (e.g. ``"growth_mean"``) of ``ds``'s year next to those of the ``previous`` year's handle.
+
+    One row per sector (within ``region``), per region (``by="region"``)
+    or, with ``by=None``, a single row for all companies. A group only one
+    year has gets NaN for the other.
+    """
+    if by == "sector":
+        def view(cube):
+            return sector_view(cube, region=region)
+    elif by == "region":
+        view = region_view
+    else:
+        def view(cube):
+            return cube_cell(cube).to_frame(ALL).T
+    return _side_by_side(view(ds.cube), view(previous.cube), stats)
+
+
+def company_year_over_year(ds, previous, name):
+    """One company's metrics in ``ds``'s year and the ``previous`` year's; one row per metric key.
+
+    Columns are ``value``, ``value_prev`` and ``value_change``; raises
+    KeyError for an unknown name.
+    """
+    def values(handle):
+        row = handle.df.iloc[handle.company_index[name]]
+        return pd.DataFrame({"value": [row[col] for col in handle.cols.metrics.values()]},
+                            index=list(handle.cols.metrics), dtype="float64")
+    return _side_by_side(values(ds), values(previous), ["value"]).reindex(list(ds.cols.metrics))
@@ -0,0 +1,184 @@
+"""Offline pre-generation of the dashboard's AI insights.
+
+Walks every company, every sector and every region (plus the overview
+sections), builds exactly the prompts the dashboard builds and stores the
+answers in the dashboard's response cache, where ``render_insight`` finds
+them before calling the LLM::
+
+    python -m dde_dashboard.batch --concurrency 4 --rpm 30
+
+The job is resumable: each answer is committed as soon as it arrives,
+and a (section, subject) whose prompt -- and therefore whose input
+metrics -- has not changed since its last answer is skipped.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+from .analytics import company_profile
+from .cube import region_view, sector_view
+from .dataset import BACKENDS, DEFAULT_WORKBOOK, Dataset
+from .llm import PROVIDERS, client_config_from_env, make_async_provider, provider_from_env, retry_after
+from .llm_cache import DEFAULT_CACHE_PATH, ResponseCache, cache_key
+from .payload import PROMPT_TOKEN_BUDGET
+from .prompts import (age_prompt, company_prompt, region_deep_dive_prompt, regions_prompt,
+                      sector_overview_prompt, selected_sector_prompt)
+
+SECTIONS = ["company", "sector_overview", "sector", "regions_overview", "region", "age"]
+
+
+def build_jobs(ds, sections=SECTIONS, budget=PROMPT_TOKEN_BUDGET):
+    """Yield ``(section, subject, builder)`` for every insight the dashboard can show.
+
+    Builders are zero-argument callables returning the prompt, so a prompt
+    that cannot be built for some subject only skips that subject. Prompts
+    are fitted to the input-token ``budget``, which must match the
+    dashboard's ``PROMPT_TOKEN_BUDGET`` for its lookups to find the answers.
+    """
+    cols, cube, year = ds.cols, ds.cube, ds.year
+
+    if "company" in sections:
+        for name in ds.company_index:
+            profile = company_profile(ds, name)
+            yield "company", name, lambda p=profile: company_prompt(p.name, p.row, p.stats, cols, budget, year)
+    if "sector_overview" in sections and cols.sector:
+        yield "sector_overview", "", lambda: sector_overview_prompt(cube, ds.topic_counts, cols, budget, year)
+    if "sector" in sections and cols.sector:
+        for sector in sector_view(cube).index:
+            yield "sector", sector, lambda sector=sector: selected_sector_prompt(sector, cube, cols, budget, year)
+    if "regions_overview" in sections and cols.region:
+        yield "regions_overview", "", lambda: regions_prompt(cube, cols, budget, year)
+    if "region" in sections and cols.region:
+        for region in region_view(cube).index:
+            yield "region", region, lambda region=region: region_deep_dive_prompt(region, cube, cols, budget, year)
+    if "age" in sections and cols.age:
+        yield "age", "", lambda: age_prompt(cube, cols, budget, year)
+
+
+class RequestPacer:
+    """Spaces request starts to stay under ``rpm`` requests per minute.
+
+    ``pause`` pushes every waiting request back, e.g. after a 429 that
+    outlived the client's own retries.
+    """
+
+    def __init__(self, rpm):
+        self.interval = 60.0 / rpm if rpm else 0.0
+        self.next_slot = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        self.next_slot = max(self.next_slot, time.monotonic() + seconds)
+
+
+async def run(jobs, cache, provider, concurrency=4, rpm=30, limit=None, max_attempts=3):
+    """Generate and store every job whose prompt has no stored answer yet; return (done, failed).
+
+    ``limit`` caps how many pending insights this run generates.
+    """
+    import groq
+
+    semaphore = asyncio.Semaphore(concurrency)
+    pacer = RequestPacer(rpm)
+    done = failed = 0
+
+    async def generate(section, subject, prompt, key):
+        nonlocal done, failed
+        async with semaphore:
+            for attempt in range(1, max_attempts + 1):
+                await pacer.wait()
+                try:
+                    answer = await provider.complete(prompt)
+                except groq.RateLimitError as exc:
+                    pacer.pause(retry_after(exc))
+                    if attempt == max_attempts:
+                        failed += 1
+                        print(f"rate limited, giving up on {section} {subject!r}", file=sys.stderr)
+                    continue
+                except groq.APIError as exc:
+                    failed += 1
+                    print(f"failed {section} {subject!r}: {exc}", file=sys.stderr)
+                    return
+                cache.put_pregenerated(section, subject, key, provider.model, answer.strip())
+                done += 1
+                print(f"[{done}/{total}] {section} {subject}")
+                return
+
+    tasks = []
+    prompt_tokens = Counter()
+    for section, subject, build_prompt in jobs:
+        try:
+            prompt = build_prompt()
+        except (KeyError, TypeError, ValueError, IndexError) as exc:
+            print(f"skipping {section} {subject!r}: cannot build prompt ({exc})", file=sys.stderr)
+            continue
+        key = cache_key(provider.model, prompt, provider.temperature, provider.max_tokens)
+        if cache.pregenerated_key(section, subject) == key:
+            continue
+        tasks.append(generate(section, subject, prompt, key))
+        prompt_tokens[section] += prompt.tokens
+        if limit is not None and len(tasks) >= limit:
+            break
+    total = len(tasks)
+    print(f"{total} insights to generate")
+    if prompt_tokens:
+        print("estimated prompt tokens: " + ", ".join(f"{section} {n}" for section, n in prompt_tokens.items()))
+    await asyncio.gather(*tasks)
+    return done, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate the dashboard's AI insights.")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="response cache the dashboard reads")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=SECTIONS)
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--rpm", type=float, default=30, help="requests per minute (0 = unlimited)")
+    parser.add_argument("--limit", type=int, help="stop after this many pending insights")
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default=None,
+                        help="LLM provider (default: LLM_PROVIDER, else groq)")
+    parser.add_argument("--year", type=int, help="year of the metrics (default: the latest)")
+    parser.add_argument("--backend", choices=BACKENDS, default="pandas", help="engine for the aggregations")
+    parser.add_argument("--prompt-budget", type=int, default=None,
+                        help=f"input-token budget per prompt (default: PROMPT_TOKEN_BUDGET, else {PROMPT_TOKEN_BUDGET})")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv("API_KEY.env")
+    args.provider = args.provider or provider_from_env()
+    args.prompt_budget = args.prompt_budget or int(os.getenv("PROMPT_TOKEN_BUDGET", str(PROMPT_TOKEN_BUDGET)))
+    api_key = os.getenv("GROQ_API_KEY", "").strip()
+    if not api_key and args.provider == "groq":
+        parser.error("GROQ_API_KEY not found in environment or API_KEY.env")
+
+    try:
+        ds = Dataset.load(args.workbook, backend=args.backend, year=args.year)
+    except ValueError as exc:
+        parser.error(str(exc))
+    jobs = build_jobs(ds, args.sections, args.prompt_budget)
+    cache = ResponseCache(args.cache)
+
+    async def _main():
+        async with make_async_provider(api_key, args.provider, **client_config_from_env()) as provider:
+            return await run(jobs, cache, provider, args.concurrency, args.rpm, args.limit)
+
+    done, failed = asyncio.run(_main())
+    print(f"generated {done}, failed {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Altair charts of the dashboard tabs, built from a :class:`~dde_dashboard.dataset.Dataset`.
+
+This is the only module of the package that imports altair; the rest of
+the package does not import it, so headless users never pay for it. Each
+tab function returns a dict of charts, with None for a chart whose
+columns the dataset lacks. Chart data carries only the columns the
+encodings use, and donuts fold their smallest slices into "Other".
+:func:`chart_specs` turns the charts into ready-to-send Vega-Lite specs,
+which the dashboard caches per chart, selection and :func:`chart_inputs`
+digest, so charts whose aggregates a data update left alone stay cached.
+"""
+
+import hashlib
+import json
+
+import altair as alt
+import pandas as pd
+import pyarrow as pa
+
+from .analytics import age_summary, region_summary
+from .cube import region_view, sector_view
+
+# Muted colour scale of the donut charts
+MUTED_COLORS = [
+    "#D3D7DD",  # very light gray-blue
+    "#5A6272",  # dark gray-blue
+    "#A6783D",  # muted brown-gold
+    "#A0ABB8",  # light gray-blue
+    "#7D8A9C",  # medium gray-blue
+    "#6A8E61",  # muted green (optional highlight)
+]
+
+# Donut charts show at most this many slices; the smallest are merged into OTHER
+MAX_SLICES = 10
+OTHER = "Other"
+
+
+def top_slices(data, category_col, max_slices=MAX_SLICES):
+    """``data`` (one row per slice) with all but the largest ``max_slices - 1`` percentages summed into OTHER.
+
+    Left unchanged when it has no more than ``max_slices`` rows.
+    """
+    if len(data) <= max_slices:
+        return data
+    ranked = data.sort_values("percentage", ascending=False)
+    head, rest = ranked.iloc[:max_slices - 1], ranked.iloc[max_slices - 1:]
+    other = pd.DataFrame({category_col: [OTHER], "percentage": [rest["percentage"].sum()]})
+    return pd.concat([head, other], ignore_index=True)
+
+
+def sector_charts(ds):
+    """Charts of the Sectors tab: sector and topic counts, average growth and size by sector."""
+    cols = ds.cols
+    sector_aggs = sector_view(ds.cube)
+    if cols.sector:
+        bvd_df = sector_aggs['rows'].sort_values(ascending=False).reset_index()
+        bvd_df.columns = [cols.sector, 'count']
+    else:
+        bvd_df = pd.DataFrame(columns=[cols.sector, 'count'])
+
+    if cols.topic in ds.df.columns:
+        topic_df = ds.topic_counts.reset_index()
+        topic_df.columns = [cols.topic, 'count']
+    else:
+        topic_df = pd.DataFrame(columns=[cols.topic, 'count'])
+
+    charts = {'growth': None, 'employees': None}
+    charts['sectors'] = alt.Chart(bvd_df).mark_bar(color='#5A6272').encode(
+        x=alt.X('count:Q', title='No. of Companies'),
+        y=alt.Y(f"{cols.sector}:N", title="Sector", sort='-x')
+    ).properties(height=400)
+    if cols.growth and cols.sector:
+        avg_growth = sector_aggs['growth_mean'].reset_index()
+        avg_growth.columns = [cols.sector, 'avg']
+        charts['growth'] = alt.Chart(avg_growth).mark_bar(color='#A6783D').encode(
+            x=alt.X('avg:Q', title='Avg. growth rate', axis=alt.Axis(format='.2%')),
+            y=alt.Y(f"{cols.sector}:N", title="Sector", sort='-x')
+        ).properties(height=400)
+    charts['topics'] = alt.Chart(topic_df).mark_bar(color='#7D8A9C').encode(
+        x=alt.X('count:Q', title='No. of Companies'),
+        y=alt.Y(f"{cols.topic}:N", title="Topic", sort='-x')
+    ).properties(height=400)
+    if cols.emp and cols.sector:
+        avg_emp = sector_aggs['emp_mean'].reset_index()
+        avg_emp.columns = [cols.sector, 'avg']
+        avg_emp['avg'] = avg_emp['avg'].round(2)
+        charts['employees'] = alt.Chart(avg_emp).mark_bar(color='#6A8E61').encode(
+            x=alt.X('avg:Q', title='Avg. no. of Employees'),
+            y=alt.Y(f"{cols.sector}:N", title="Sector", sort='-x')
+        ).properties(height=400)
+    return charts
+
+
+def share_donut(data, category_col, legend_title, tooltip, max_slices=MAX_SLICES):
+    """Donut chart of the ``percentage`` column of ``data``, one slice per ``category_col`` value."""
+    data = top_slices(data[[category_col, "percentage"]], category_col, max_slices)
+    return alt.Chart(data).mark_arc(innerRadius=50).encode(
+        theta=alt.Theta(field="percentage", type="quantitative"),
+        color=alt.Color(
+            f"{category_col}:N",
+            scale=alt.Scale(range=MUTED_COLORS),
+            legend=alt.Legend(title=legend_title)
+        ),
+        tooltip=tooltip
+    ).properties(width=600, height=600)
+
+
+def region_charts(ds, max_slices=MAX_SLICES):
+    """Charts of the Regions tab: companies, average growth and company/employee shares per region."""
+    cols = ds.cols
+    region_aggs = region_view(ds.cube)
+    region_count = region_aggs['rows'].sort_values(ascending=False).reset_index()
+    region_count.columns = [cols.region, 'count']
+    total_companies = region_count['count'].sum()
+    region_share = region_count.assign(percentage=region_count['count'] / total_companies * 100)
+
+    charts = {'growth': None, 'employee_share': None}
+    charts['companies'] = alt.Chart(region_count).mark_bar(color='#5A6272').encode(
+        x=alt.X('count:Q', title='No. of Companies in Region'),
+        y=alt.Y(f'{cols.region}:N', sort='-x')
+    ).properties(height=600)
+    if cols.growth:
+        avg_growth_region = region_aggs['growth_mean'].reset_index()
+        avg_growth_region.columns = [cols.region, 'avg_growth']
+        charts['growth'] = alt.Chart(avg_growth_region).mark_bar(color='#A6783D').encode(
+            x=alt.X('avg_growth:Q',
+                title='Avg. Growth in Region',
+                axis=alt.Axis(format='.2%')),
+            y=alt.Y(f'{cols.region}:N', sort='-x')
+        ).properties(height=600)
+    tooltip = [f"{cols.region}:N", alt.Tooltip("percentage:Q", format=".2f")]
+    charts['company_share'] = share_donut(region_share, cols.region, "Region", tooltip, max_slices)
+    if cols.emp:
+        emp_region = region_aggs['emp_sum'].reset_index()
+        emp_region.columns = [cols.region, 'total_employees']
+        total_employees = emp_region['total_employees'].sum()
+        emp_region['percentage'] = (emp_region['total_employees'] / total_employees) * 100
+        charts['employee_share'] = share_donut(emp_region, cols.region, "Region", tooltip, max_slices)
+    return charts
+
+
+def region_deep_dive_charts(ds, region, max_slices=MAX_SLICES):
+    """Charts of the Regions deep-dive tab: the sector landscape within ``region``."""
+    cols = ds.cols
+    region_sectors = region_summary(ds, region).sectors
+    charts = {'companies': None, 'employees': None, 'growth': None, 'aagr': None}
+    if not cols.sector:
+        return charts
+    tooltip = [
+        alt.Tooltip(f"{cols.sector}:N", title="Sector"),
+        alt.Tooltip('percentage:Q', title="Percentage", format=".2f")
+    ]
+
+    sector_count = region_sectors['rows'].sort_values(ascending=False).reset_index()
+    sector_count.columns = [cols.sector, 'count']
+    total_companies = sector_count['count'].sum()
+    sector_count['percentage'] = (sector_count['count'] / total_companies) * 100
+    charts['companies'] = share_donut(sector_count, cols.sector, "Sector", tooltip, max_slices)
+
+    if cols.emp:
+        emp_sector = region_sectors['emp_sum'].reset_index()
+        emp_sector.columns = [cols.sector, 'total_employees']
+        total_employees = emp_sector['total_employees'].sum()
+        emp_sector['percentage'] = (emp_sector['total_employees'] / total_employees) * 100
+        charts['employees'] = share_donut(emp_sector, cols.sector, "Sector", tooltip, max_slices)
+
+    if cols.growth:
+        growth_sector = region_sectors['growth_mean'].reset_index()
+        growth_sector.columns = [cols.sector, 'avg_growth']
+        charts['growth'] = alt.Chart(growth_sector).mark_bar(color='#A6783D').encode(
+            x=alt.X('avg_growth:Q', title=f'Average Growth Rate in Sector in {region}', axis=alt.Axis(format='.2%')),
+            y=alt.Y(f'{cols.sector}:N', title = "Sector", sort='-x')
+        ).properties(height=600)
+
+    if cols.aagr:
+        aagr_sector = region_sectors['aagr_mean'].reset_index()
+        aagr_sector.columns = [cols.sector, 'avg_aagr']
+        charts['aagr'] = alt.Chart(aagr_sector).mark_bar(color='#6A8E61').encode(
+            x=alt.X('avg_aagr:Q', title=f'Average AAGR in Sector in {region}', axis=alt.Axis(format='.2%')),
+            y=alt.Y(f'{cols.sector}:N', title="Sector", sort='-x')
+        ).properties(height=600)
+    return charts
+
+
+def age_charts(ds):
+    """Charts of the Company Age tab: average age per region and per sector."""
+    cols = ds.cols
+    ages = age_summary(ds)
+    avg_age_region = ages.by_region.reset_index()
+    avg_age_region.columns = [cols.region, 'avg_age']
+    avg_age_sector = ages.by_sector.reset_index()
+    avg_age_sector.columns = [cols.sector, 'avg_age']
+    return {
+        'region': alt.Chart(avg_age_region).mark_bar(color='#3E5C76').encode(
+            x=alt.X('avg_age:Q', title='Average Age (years)'),
+            y=alt.Y(f'{cols.region}:N', title='Region', sort='-x'),
+            tooltip=[
+                alt.Tooltip(f'{cols.region}:N', title='Region'),
+                alt.Tooltip('avg_age:Q', title='Average Age', format='.2f')
+            ]
+        ).properties(height=600),
+        'sector': alt.Chart(avg_age_sector).mark_bar(color='#665D1E').encode(
+            x=alt.X('avg_age:Q', title='Average Age (years)'),
+            y=alt.Y(f'{cols.sector}:N', title='Sector', sort='-x'),
+            tooltip=[
+                alt.Tooltip(f'{cols.sector}:N', title='Sector'),
+                alt.Tooltip('avg_age:Q', title='Average Age', format='.2f')
+            ]
+        ).properties(height=600),
+    }
+
+
+def chart_inputs(ds, tab, region=None):
+    """Digest of the aggregates the charts of ``tab`` are drawn from, for their cache key.
+
+    ``tab`` is ``"sectors"``, ``"regions"``, ``"region_deep_dive"`` (of
+    ``region``) or ``"age"``. Equal digests draw equal charts.
+    """
+    cols = ds.cols
+    if tab == "sectors":
+        parts = [sector_view(ds.cube).filter(["rows", "growth_mean", "emp_mean"])]
+        if cols.topic in ds.df.columns:
+            parts.append(ds.topic_counts.to_frame())
+    elif tab == "regions":
+        parts = [region_view(ds.cube).filter(["rows", "growth_mean", "emp_sum"])]
+    elif tab == "region_deep_dive":
+        parts = [sector_view(ds.cube, region).filter(["rows", "emp_sum", "growth_mean", "aagr_mean"])]
+    elif tab == "age":
+        parts = [region_view(ds.cube).filter(["age_mean"]), sector_view(ds.cube).filter(["age_mean"])]
+    else:
+        raise ValueError(f"unknown tab {tab!r}")
+    digest = hashlib.sha256(tab.encode())
+    for part in parts:
+        digest.update("\x1f".join(map(str, part.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(part).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _arrow_ipc(table):
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def chart_spec(chart):
+    """Vega-Lite spec of ``chart`` with its datasets pre-encoded as Arrow IPC streams.
+
+    That is the form Streamlit sends to the browser, so a cached spec can be
+    passed straight to ``st.vega_lite_chart`` on every rerun without going
+    through Altair or re-encoding the data. Theme defaults (``config``) are
+    left out, as ``st.altair_chart`` does.
+    """
+    spec = chart.to_dict()
+    spec.pop("config", None)
+    spec["datasets"] = {
+        name: _arrow_ipc(pa.Table.from_pylist(rows)) for name, rows in spec.get("datasets", {}).items()
+    }
+    return spec
+
+
+def chart_specs(charts):
+    """:func:`chart_spec` of every chart in a tab's dict (None stays None)."""
+    return {name: chart_spec(chart) if chart is not None else None for name, chart in charts.items()}
+
+
+def spec_nbytes(spec):
+    """Approximate payload size of a spec from :func:`chart_spec`: the JSON plus the Arrow datasets."""
+    datasets = spec.get("datasets", {})
+    rest = {k: v for k, v in spec.items() if k != "datasets"}
+    return len(json.dumps(rest)) + sum(len(data) for data in datasets.values())
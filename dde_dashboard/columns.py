@@ -0,0 +1,103 @@
+"""Locating the dashboard's key columns in the company workbook."""
+
+import re
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Metric columns end in the year they describe ("Number of employees 2023", "Growth 2023", ...)
+_YEAR_SUFFIX = re.compile(r"^(?P<name>.*?)\s*(?P<year>(?:19|20)\d{2})$")
+
+COMPANY_COL = "Company name Latin alphabet"
+TOPIC_COL = "Topic - Umbrella (Merged)"
+AGE_COL = "Company Age"
+
+
+@dataclass(frozen=True)
+class DatasetColumns:
+    company: str
+    topic: str
+    description: str = None
+    sector: str = None
+    date: str = None
+    emp: str = None
+    growth: str = None
+    aagr: str = None
+    region: str = None
+    age: str = None
+    bvd_id: str = None
+
+    @property
+    def metrics(self):
+        """Short metric key -> column, for the metrics present in the dataset."""
+        metrics = {"emp": self.emp, "growth": self.growth, "aagr": self.aagr, "age": self.age}
+        return {k: c for k, c in metrics.items() if c}
+
+    @property
+    def reported(self):
+        """The metrics companies report per year (all but Company Age, which is derived), as in ``metrics``."""
+        return {k: c for k, c in self.metrics.items() if k != "age"}
+
+
+def split_year(column):
+    """``(name, year)`` of a per-year column such as ``"Growth 2023"``, else None."""
+    match = _YEAR_SUFFIX.match(column)
+    return (match["name"], int(match["year"])) if match else None
+
+
+def _metric_column(columns, word, year):
+    """The per-year column containing ``word`` for ``year`` (default: the latest year it has)."""
+    candidates = []
+    for column in columns:
+        parsed = split_year(column)
+        if parsed and word in column.lower() and (year is None or parsed[1] == year):
+            candidates.append((parsed[1], column))
+    return max(candidates, key=lambda candidate: candidate[0])[1] if candidates else None
+
+
+def detect_columns(columns, year=None):
+    """Find the key columns among the column names ``columns``.
+
+    The metric columns are those of ``year``, or of the latest year when it
+    is None. ``age`` is set when a date of incorporation exists (see
+    ``add_company_age``).
+    """
+    columns = list(columns)
+    desc_cols = [col for col in columns if "description" in col.lower()]
+    bvd_cols = [col for col in columns if "bvd" in col.lower() and "sector" in col.lower()]
+    date_col = next((c for c in columns if "date of incorporation" in c.lower()), None)
+    return DatasetColumns(
+        company=COMPANY_COL,
+        topic=TOPIC_COL,
+        description=desc_cols[0] if desc_cols else None,
+        sector=bvd_cols[0] if bvd_cols else None,
+        date=date_col,
+        emp=_metric_column(columns, "employee", year),
+        growth=_metric_column(columns, "growth", year),
+        aagr=_metric_column(columns, "aagr", year),
+        region=next((c for c in columns if "region" in c.lower()), None),
+        age=AGE_COL if date_col else None,
+        bvd_id=next((c for c in columns if "bvd id" in c.lower()), None),
+    )
+
+
+def age_reference_date(year=None):
+    """The date Company Age is measured at: the last day of ``year`` (default: the current year).
+
+    Pinning it to the year on view (instead of using today) keeps ages -- and
+    every cache key and prompt derived from them -- stable for a given
+    dataset, and matches the "In <year>" framing of the insights.
+    """
+    return pd.Timestamp(year=year or pd.Timestamp.today().year, month=12, day=31)
+
+
+def add_company_age(df, cols, year=None):
+    """Parse the date of incorporation once and add Company Age as a compact integer column.
+
+    Meant to run in the cached load step so reruns never touch datetimes.
+    """
+    if cols.age:
+        df[cols.date] = pd.to_datetime(df[cols.date])
+        age = (age_reference_date(year) - df[cols.date]).dt.days // 365
+        df[cols.age] = age.astype("Int16")
+    return df
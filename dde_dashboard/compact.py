@@ -0,0 +1,68 @@
+"""Compact in-memory representation of the company table.
+
+Low-cardinality text columns (sector, topic, region, city, legal form, ...)
+become pandas Categoricals and numeric columns are downcast when that is
+lossless. ``python -m dde_dashboard.compact`` prints a per-column memory
+report for the workbook.
+"""
+
+import sys
+
+import pandas as pd
+from pandas.api.types import is_float_dtype, is_integer_dtype, is_object_dtype, is_string_dtype
+
+
+def compact_frame(df, keep=(), max_unique_ratio=0.5):
+    """Return a copy of ``df`` with categorical text columns and downcast numerics.
+
+    Text columns with at most ``max_unique_ratio`` distinct values per row
+    become categoricals; columns in ``keep`` are left untouched. Integers
+    are downcast to the smallest integer type that holds them, floats to
+    float32 only if every value survives the round trip exactly.
+    """
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if col in keep or isinstance(series.dtype, pd.CategoricalDtype):
+            pass
+        elif is_string_dtype(series.dtype) or is_object_dtype(series.dtype):
+            if series.nunique() <= max_unique_ratio * len(series):
+                series = series.astype("category")
+        elif is_integer_dtype(series.dtype) and not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            series = pd.to_numeric(series, downcast="integer")
+        elif is_float_dtype(series.dtype) and series.dtype != "float32":
+            as_float32 = series.astype("float32")
+            if (as_float32.astype(series.dtype) == series).where(series.notna(), True).all():
+                series = as_float32
+        out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+
+def memory_report(before, after):
+    """Per-column dtype and deep memory usage of ``before`` and ``after``, plus a total row."""
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "bytes_before": before.memory_usage(deep=True, index=False),
+        "dtype_after": after.dtypes.reindex(before.columns).astype(str),
+        "bytes_after": after.memory_usage(deep=True, index=False).reindex(before.columns),
+    })
+    report.loc["(total)"] = ["", report["bytes_before"].sum(), "", report["bytes_after"].sum()]
+    return report
+
+
+def main(argv=None):
+    from .dataset import DEFAULT_WORKBOOK, load_frame
+    from .store import load_dataset
+
+    path = (argv if argv is not None else sys.argv[1:]) or [DEFAULT_WORKBOOK]
+    before = load_dataset(path[0])
+    after, _ = load_frame(path[0])
+    report = memory_report(before, after)
+    report["bytes_after"] = report["bytes_after"].fillna(0).astype("int64")
+    print(report.to_string())
+    saved = 1 - report.at["(total)", "bytes_after"] / report.at["(total)", "bytes_before"]
+    print(f"\n{saved:.0%} less memory; columns with no dtype after are read lazily from the Arrow cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+"""Pre-aggregated sector x region summaries shared by every tab.
+
+The cube holds one row per (sector, region) cell plus the sector-only,
+region-only and overall marginals. Marginals are aggregated from the raw
+rows, not from the cells, so medians and quantiles stay exact. ``ALL``
+marks the dimension a marginal row is aggregated over. Given the
+``reported`` metrics, the cube covers only the companies with a figure
+for at least one of them -- a year's roster also lists companies that
+reported nothing that year.
+
+When rows change, :func:`update_aggregate_cube` merges counts, sums,
+minima and maxima from the changed rows and recomputes medians and
+quantiles only where a metric's values changed. On small tables, or when
+a large share of the rows changed, it rebuilds the cube instead, which is
+faster there.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_integer_dtype
+
+ALL = "(all)"
+
+STATS = ["count", "sum", "mean", "median", "min", "max"]
+# The stats update_aggregate_cube merges from changed rows instead of recomputing
+MERGEABLE = ["count", "sum", "min", "max"]
+QUANTILES = (0.1, 0.9)
+# Below this many rows, or above this share of them changed, rebuilding beats merging; the merge
+# passes break even at 30k-200k rows with 1% changed (aggregate_cube vs aggregate_cube_merge in
+# benchmarks.run)
+INCREMENTAL_MIN_ROWS = 100_000
+INCREMENTAL_MAX_CHANGED = 0.05
+
+
+def quantile_label(q):
+    return f"p{round(q * 100)}"
+
+
+def _aggregate(df, keys, metric_cols, quantiles):
+    grouped = df.groupby(keys, observed=True, sort=True)
+    parts = [grouped.size().rename("rows")]
+    for key, col in metric_cols.items():
+        stats = grouped[col].agg(STATS)
+        stats.columns = [f"{key}_{stat}" for stat in STATS]
+        parts.append(stats)
+        for q in quantiles:
+            parts.append(grouped[col].quantile(q).rename(f"{key}_{quantile_label(q)}"))
+    return pd.concat(parts, axis=1)
+
+
+def reporting(df, columns):
+    """Boolean mask of the rows of ``df`` with a value in at least one of ``columns``; all rows if there are none."""
+    columns = [col for col in columns or () if col in df.columns]
+    if not columns:
+        return np.ones(len(df), dtype=bool)
+    return df[columns].notna().any(axis=1).to_numpy()
+
+
+def build_aggregate_cube(df, sector_col, region_col, metric_cols, quantiles=QUANTILES, reported=None):
+    """Aggregate ``metric_cols`` ({key: column}) over every grouping set of sector and region.
+
+    The result is indexed by ``(sector, region)`` and has a ``rows`` column
+    (number of companies) plus ``<key>_<stat>`` columns for the stats in
+    ``STATS`` and ``<key>_p<q>`` columns for each quantile. Missing
+    dimension or metric columns are skipped. With ``reported`` (a list of
+    columns), companies without a value in any of them are left out.
+    """
+    metric_cols = {k: c for k, c in metric_cols.items() if c in df.columns}
+    in_view = reporting(df, reported)
+    if not in_view.all():
+        df = df[in_view]
+    frames = [_aggregate(df, _keys(df, sector_col, region_col, use_sector, use_region), metric_cols, quantiles)
+              for use_sector, use_region in _grouping_sets(df, sector_col, region_col)]
+    cube = pd.concat(frames)
+    cube.index = cube.index.set_names(["sector", "region"])
+    return cube
+
+
+def _grouping_sets(df, sector_col, region_col):
+    """``(use_sector, use_region)`` of each grouping set ``df`` has the columns for, in cube order."""
+    for use_sector in (True, False):
+        for use_region in (True, False):
+            if (use_sector and sector_col not in df.columns) or (use_region and region_col not in df.columns):
+                continue
+            yield use_sector, use_region
+
+
+def _keys(df, sector_col, region_col, use_sector, use_region, plain=False):
+    """Group keys of one grouping set; ``plain`` casts them to object, for frames of two table versions."""
+    all_key = pd.Series(ALL, index=df.index, dtype=object)
+    sector = df[sector_col].astype(object) if plain and use_sector else df.get(sector_col)
+    region = df[region_col].astype(object) if plain and use_region else df.get(region_col)
+    return [
+        sector.rename("sector") if use_sector else all_key.rename("sector"),
+        region.rename("region") if use_region else all_key.rename("region"),
+    ]
+
+
+def _differs(before, after):
+    """Positions where two equally long columns hold different values; missing equals missing."""
+    before, after = before.astype(object).to_numpy(), after.astype(object).to_numpy()
+    # NaN and pd.NA do not compare equal to themselves; None does
+    before, after = np.where(pd.isna(before), None, before), np.where(pd.isna(after), None, after)
+    return before != after
+
+
+def _in_rows(column, value):
+    """Boolean mask of the rows of ``column`` equal to ``value`` (compared on the codes of a categorical)."""
+    if value == ALL:
+        return np.ones(len(column), dtype=bool)
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        categories = column.cat.categories
+        if value not in categories:
+            return np.zeros(len(column), dtype=bool)
+        return column.cat.codes.to_numpy() == categories.get_loc(value)
+    return (column == value).to_numpy()
+
+
+def _assign(cube, positions, col, values):
+    """Set ``cube[col]`` at row ``positions`` to the float ``values``, keeping integer columns integral.
+
+    A compact integer column the values outgrew is widened to 64 bits, and
+    a plain one that gets a missing value becomes float, as a full
+    aggregation would have returned them.
+    """
+    dtype = cube[col].dtype
+    if is_integer_dtype(dtype):
+        masked = isinstance(dtype, pd.api.extensions.ExtensionDtype)
+        values = np.asarray(values, dtype="float64")
+        missing = np.isnan(values)
+        if missing.any() and not masked:
+            # e.g. the min of a cell whose last value went missing
+            cube[col] = cube[col].astype("float64")
+        else:
+            limits = np.iinfo(dtype.numpy_dtype if masked else dtype)
+            present = values[~missing]
+            if len(present) and (present.max() > limits.max or present.min() < limits.min):
+                # e.g. employee sums past int16
+                cube[col] = cube[col].astype("Int64" if masked else "int64")
+            dtype = cube[col].dtype
+            values = np.where(missing, 0, values).astype(dtype.numpy_dtype if masked else dtype)
+            if masked:
+                values = pd.arrays.IntegerArray(values, missing)
+    cube.iloc[positions, cube.columns.get_loc(col)] = values
+
+
+def update_aggregate_cube(cube, df, before, after, sector_col, region_col, metric_cols, quantiles=QUANTILES,
+                          reported=None, min_rows=INCREMENTAL_MIN_ROWS, max_changed=INCREMENTAL_MAX_CHANGED):
+    """``cube`` brought up to date with ``df`` after some rows changed.
+
+    ``before`` holds the changed rows as they were and ``after`` the same
+    rows as they are now, followed by the appended rows. Row counts and
+    each metric's count, sum, min and max are merged from those rows
+    alone; min and max are recomputed only where a changed row held the
+    old extreme. Medians and quantiles cannot be merged: they are
+    recomputed for the cells and marginals in which that metric's values
+    changed, from the metric's values in the cell -- for the overall row,
+    one pass over the column. Other metrics and untouched cells are not
+    read. A row that stops or starts reporting (see ``reported``) leaves
+    or joins its cells. Equals :func:`build_aggregate_cube` on ``df`` up
+    to float rounding in the sums and means.
+
+    ``df`` is aggregated afresh when it has fewer than ``min_rows`` rows or
+    ``after`` is more than ``max_changed`` of them.
+    """
+    if len(df) < min_rows or len(after) > max_changed * len(df):
+        return build_aggregate_cube(df, sector_col, region_col, metric_cols, quantiles, reported)
+    metric_cols = {k: c for k, c in metric_cols.items() if c in df.columns}
+    if any(c not in before.columns or f"{k}_count" not in cube.columns for k, c in metric_cols.items()):
+        # A metric the cube was built without: nothing to merge into
+        return build_aggregate_cube(df, sector_col, region_col, metric_cols, quantiles, reported)
+    n = len(before)
+    was_in, is_in = reporting(before, reported), reporting(after, reported)
+    moved = np.ones(len(after), dtype=bool)
+    moved[:n] = was_in != is_in[:n]
+    for col in (sector_col, region_col):
+        if col in df.columns:
+            moved[:n] |= _differs(before[col], after[col].iloc[:n])
+    # Rows whose contribution to a metric changed: moved, appended, or a different value
+    changed = {}
+    for key, col in metric_cols.items():
+        rows = moved.copy()
+        rows[:n] |= _differs(before[col], after[col].iloc[:n])
+        changed[key] = rows
+
+    cube = cube.copy()
+    fresh, exact = [], {}  # aggregates of new cells; cube row -> {metric key: rescan min/max}
+    for use_sector, use_region in _grouping_sets(df, sector_col, region_col):
+        def grouped(frame):
+            return frame.groupby(_keys(frame, sector_col, region_col, use_sector, use_region, plain=True),
+                                 observed=True, sort=False)
+
+        gained, lost = grouped(after[moved & is_in]).size(), grouped(before[moved[:n] & was_in]).size()
+        new_cells = gained.index.difference(cube.index)
+        if len(new_cells):
+            # All rows of a cell the cube does not have yet moved in or were appended
+            rows = after[moved & is_in]
+            keys = _keys(rows, sector_col, region_col, use_sector, use_region, plain=True)
+            rows = rows[pd.MultiIndex.from_arrays(keys).isin(new_cells)]
+            fresh.append(_aggregate(rows, _keys(rows, sector_col, region_col, use_sector, use_region, plain=True),
+                                    metric_cols, quantiles))
+        delta = gained.sub(lost, fill_value=0)
+        delta = delta[delta.index.isin(cube.index)]
+        if len(delta):
+            positions = cube.index.get_indexer(delta.index)
+            _assign(cube, positions, "rows", cube["rows"].to_numpy()[positions] + delta.to_numpy("int64"))
+
+        for key, col in metric_cols.items():
+            add = grouped(after[changed[key] & is_in])[col].agg(MERGEABLE)
+            sub = grouped(before[changed[key][:n] & was_in])[col].agg(MERGEABLE)
+            cells = add.index.union(sub.index).intersection(cube.index)
+            if not len(cells):
+                continue
+            positions = cube.index.get_indexer(cells)
+            add = add.reindex(cells).astype("float64")
+            sub = sub.reindex(cells).astype("float64")
+            old = {stat: cube[f"{key}_{stat}"].to_numpy(dtype="float64", na_value=np.nan)[positions]
+                   for stat in MERGEABLE}
+            count = old["count"] + add["count"].fillna(0).to_numpy() - sub["count"].fillna(0).to_numpy()
+            total = old["sum"] + add["sum"].fillna(0).to_numpy() - sub["sum"].fillna(0).to_numpy()
+            _assign(cube, positions, f"{key}_count", count)
+            _assign(cube, positions, f"{key}_sum", total)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                _assign(cube, positions, f"{key}_mean", np.where(count > 0, total / count, np.nan))
+            _assign(cube, positions, f"{key}_min", np.fmin(old["min"], add["min"].to_numpy()))
+            _assign(cube, positions, f"{key}_max", np.fmax(old["max"], add["max"].to_numpy()))
+            # A changed row that held the old extreme leaves the new one unknown without a rescan
+            lost_extreme = (sub["min"].to_numpy() <= old["min"]) | (sub["max"].to_numpy() >= old["max"])
+            for position, rescan in zip(positions, lost_extreme):
+                exact.setdefault(int(position), {})
+                exact[int(position)][key] = exact[int(position)].get(key, False) or bool(rescan)
+
+    if exact:
+        labels = [quantile_label(q) for q in quantiles]
+        masks, values, updates = {}, {}, {}
+        in_view = reporting(df, reported)
+        for position, keys in exact.items():
+            sector, region = cube.index[position]
+            for col, value in ((sector_col, sector), (region_col, region)):
+                if value != ALL and (col, value) not in masks:
+                    masks[col, value] = _in_rows(df[col], value)
+            in_cell = [masks[col, value] for col, value in ((sector_col, sector), (region_col, region))
+                       if value != ALL]
+            in_cell = np.logical_and.reduce([in_view, *in_cell])
+            for key, rescan in keys.items():
+                if key not in values:
+                    values[key] = df[metric_cols[key]].to_numpy(dtype="float64", na_value=np.nan)
+                cell_values = values[key][in_cell]
+                cell_values = cell_values[~np.isnan(cell_values)]
+                stats = dict.fromkeys([f"{key}_{stat}" for stat in ("median", *labels)], np.nan)
+                if len(cell_values):
+                    stats = dict(zip(stats, np.quantile(cell_values, [0.5, *quantiles])))
+                if rescan:
+                    stats[f"{key}_min"] = cell_values.min() if len(cell_values) else np.nan
+                    stats[f"{key}_max"] = cell_values.max() if len(cell_values) else np.nan
+                for col, value in stats.items():
+                    updates.setdefault(col, ([], []))
+                    updates[col][0].append(position)
+                    updates[col][1].append(value)
+        for col, (positions, column_values) in updates.items():
+            _assign(cube, positions, col, column_values)
+
+    # Cells whose last row moved away disappear, as in a full aggregation
+    updated = pd.concat([cube[cube["rows"] > 0], *fresh])
+    updated.index = updated.index.set_names(["sector", "region"])
+    # Back into cube order: grouping set (cells, sector, region, overall marginals), then keys
+    sector_keys = updated.index.get_level_values("sector")
+    region_keys = updated.index.get_level_values("region")
+    grouping_set = 2 * (sector_keys == ALL) + (region_keys == ALL)
+    order = np.lexsort([region_keys.astype(str), sector_keys.astype(str), grouping_set])
+    return updated.iloc[order]
+
+
+def cube_cell(cube, sector=ALL, region=ALL):
+    """Return the aggregates of one cell (or marginal) as a Series."""
+    return cube.loc[(sector, region)]
+
+
+def sector_view(cube, region=ALL):
+    """Per-sector aggregates, within ``region`` or over all regions."""
+    view = cube.xs(region, level="region")
+    return view[view.index != ALL]
+
+
+def region_view(cube, sector=ALL):
+    """Per-region aggregates, within ``sector`` or over all sectors."""
+    view = cube.xs(sector, level="sector")
+    return view[view.index != ALL]
+
+
+def value_counts_desc(df, col):
+    """Number of rows per value of ``col``, most frequent first."""
+    return df[col].value_counts().sort_values(ascending=False)
@@ -0,0 +1,303 @@
+"""The load pipeline shared by the dashboard and the batch job, and the dataset handle."""
+
+import threading
+from functools import cached_property
+
+import numpy as np
+
+from .columns import add_company_age, detect_columns
+from .compact import compact_frame
+from .cube import build_aggregate_cube, reporting, update_aggregate_cube, value_counts_desc
+from .delta import diff_tables
+from .fulltext import FullTextIndex, load_fulltext_index
+from .indexes import build_company_index, build_rank_table, update_rank_table
+from .peers import PeerIndex
+from .search import CompanySearchIndex
+from .sql import SqlBackend
+from .store import LazyTextColumn, applied_deltas, data_version, load_table, source_sha256, years_path_for
+from .years import read_year, sync_years, table_years, year_table
+
+DEFAULT_WORKBOOK = "V5_denmark_companies_with_merged_topics.xlsx"
+
+# Engines the aggregations can run on; "duckdb" needs the optional duckdb package (see .sql)
+BACKENDS = ("pandas", "duckdb")
+
+
+def load_frame(xlsx_path):
+    """Load the workbook's latest year as a compact DataFrame; return ``(df, cols)``.
+
+    The long description text is left out of the frame: it stays in the
+    memory-mapped Arrow cache and is read one row at a time through
+    :func:`description_store`. Company Age is added against the pinned
+    reference date.
+    """
+    return frame_from_table(load_table(xlsx_path))
+
+
+def frame_from_table(table, year=None, metrics=None):
+    """The in-memory part of :func:`load_frame`, for an Arrow table of the workbook.
+
+    The frame is the snapshot of ``year`` (default: the latest the table
+    has), with its metrics taken from ``metrics`` when given (see
+    :func:`~dde_dashboard.years.year_table`).
+    """
+    if year is None:
+        years = table_years(table)
+        year = years[-1] if years else None
+    table = year_table(table, year, metrics)
+    cols = detect_columns(table.column_names, year)
+    if cols.description:
+        table = table.drop_columns([cols.description])
+    # Names are looked up and displayed as text; a categorical of ~unique values would only add codes
+    df = compact_frame(table.to_pandas(split_blocks=True), keep=[cols.company])
+    return add_company_age(df, cols, year), cols
+
+
+def description_store(table, cols):
+    """Lazy access to the description column of ``table``, aligned with its rows, or None if there is none.
+
+    ``table`` is the Arrow table the frame was built from, so positions in
+    the frame are positions here.
+    """
+    if not cols.description:
+        return None
+    return LazyTextColumn(table, cols.description)
+
+
+def _check_year(year, years):
+    """Raise ValueError unless ``year`` is None or one of the ``years`` with data."""
+    if year is not None and year not in years:
+        raise ValueError(f"no metrics for {year}; the dataset has {', '.join(map(str, years)) or 'no years'}")
+
+
+class Dataset:
+    """One loaded version of the company table plus the structures derived from it.
+
+    The company index, search and peer indexes, rank table, aggregate cube and topic counts are built
+    on first use and then kept, so a handle should live as long as its data
+    (the dashboard keeps one per workbook version). Treat everything it
+    returns as read-only. With ``backend="duckdb"`` the cube and topic
+    counts are computed in SQL over the same frame (see :mod:`.sql`).
+    After a delta is ingested, :meth:`refresh` returns the next version's
+    handle with what this one built carried over or updated in place.
+
+    A handle shows one ``year``: its metric columns are that year's, read
+    from the year partitions (see :mod:`.years`) into ``year_metrics``.
+    """
+
+    def __init__(self, df, cols, descriptions=None, source=None, backend="pandas", table=None, year=None,
+                 year_metrics=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown query backend {backend!r}; expected one of {BACKENDS}")
+        self.df = df
+        self.cols = cols
+        self.descriptions = descriptions
+        self.source = source
+        self.backend = backend
+        self.table = table
+        self.year = year
+        self.year_metrics = year_metrics
+
+    @classmethod
+    def load(cls, xlsx_path, backend="pandas", year=None):
+        """Load ``year`` of the stored dataset (default: the latest year with data)."""
+        table = load_table(xlsx_path)
+        years = sync_years(xlsx_path, table)
+        if year is None and years:
+            year = years[-1]
+        _check_year(year, years)
+        metrics = read_year(years_path_for(xlsx_path), table, year) if year is not None else None
+        df, cols = frame_from_table(table, year, metrics)
+        return cls(df, cols, description_store(table, cols), source=xlsx_path, backend=backend, table=table, year=year,
+                   year_metrics=metrics)
+
+    def refresh(self):
+        """The handle for the stored dataset as it is now; ``self`` if nothing changed.
+
+        If the stored table is this one plus ingested deltas, only what the
+        changed rows feed is rebuilt: the rank table and the cube are
+        updated within the touched sectors and regions, and indexes whose
+        inputs did not change are shared. Changes to this handle's year
+        partition are handled the same way. Anything else is a full load.
+        Raises ValueError if this handle's year no longer has data.
+        """
+        table = load_table(self.source)
+        _check_year(self.year, sync_years(self.source, table))
+        metrics = read_year(years_path_for(self.source), table, self.year) if self.year is not None else None
+        old_deltas = applied_deltas(self.table)
+        change = None
+        if source_sha256(table) == source_sha256(self.table) and applied_deltas(table)[:len(old_deltas)] == old_deltas:
+            # Compared as this year's snapshots, so the changed columns are named as in the frame
+            change = diff_tables(year_table(self.table, self.year, self.year_metrics),
+                                 year_table(table, self.year, metrics))
+        if change is None:
+            return Dataset.load(self.source, self.backend, self.year)
+        if not change:
+            return self
+        df, cols = frame_from_table(table, self.year, metrics)
+        if cols != self.cols:
+            return Dataset.load(self.source, self.backend, self.year)
+        refreshed = Dataset(df, cols, description_store(table, cols), source=self.source, backend=self.backend, table=table,
+                            year=self.year, year_metrics=metrics)
+        refreshed._carry_over(self, change)
+        return refreshed
+
+    def _carry_over(self, old, change):
+        """Seed this handle's cached properties from ``old``'s, given the rows ``change`` touched."""
+        cols, built = self.cols, old.__dict__
+        appended = len(change.appended) > 0
+        columns = set(change.columns)
+        if cols.date in columns:
+            columns.add(cols.age)
+
+        def unchanged(*inputs):
+            return not appended and not columns.intersection(filter(None, inputs))
+
+        # A cached_property is looked up in the instance __dict__ first, so storing a value there seeds it
+        seed = self.__dict__
+        if "company_index" in built and cols.company not in columns:
+            index = dict(built["company_index"])
+            for pos, name in zip(change.appended, self.df[cols.company].iloc[change.appended]):
+                if isinstance(name, str) and name not in index:
+                    index[name] = int(pos)
+            seed["company_index"] = index
+        if "search_index" in built and unchanged(cols.company):
+            seed["search_index"] = built["search_index"]
+        if "fulltext" in built and unchanged(cols.description):
+            seed["fulltext"] = built["fulltext"]
+        if "peer_index" in built and unchanged(cols.sector, cols.topic, *cols.metrics.values()):
+            seed["peer_index"] = built["peer_index"]
+        if self.backend != "pandas":
+            # The SQL backend recomputes the cube and counts over the new frame on first use
+            return
+        if "topic_counts" in built and unchanged(cols.topic, *cols.reported.values()):
+            seed["topic_counts"] = built["topic_counts"]
+
+        before = old.df.iloc[change.updated]
+        after = self.df.iloc[np.concatenate([change.updated, change.appended])]
+
+        def keys(frame, *key_cols):
+            return list(zip(*(frame[c] if c in frame.columns else [None] * len(frame) for c in key_cols)))
+
+        if "ranks" in built:
+            sectors = {s for (s,) in keys(before, cols.sector) + keys(after, cols.sector)}
+            seed["ranks"] = update_rank_table(built["ranks"], self.df, cols.metrics, cols.sector, columns, sectors)
+        if "cube" in built:
+            if unchanged(cols.sector, cols.region, *cols.metrics.values()):
+                seed["cube"] = built["cube"]
+            else:
+                seed["cube"] = update_aggregate_cube(built["cube"], self.df, before, after, cols.sector,
+                                                     cols.region, cols.metrics,
+                                                     reported=list(cols.reported.values()))
+
+    def subset(self, positions):
+        """A handle over the rows at ``positions`` (e.g. full-text matches), in table order.
+
+        Its derived structures are built from those rows alone; descriptions
+        are not carried over.
+        """
+        return Dataset(self.df.iloc[np.sort(positions)], self.cols, backend=self.backend, year=self.year)
+
+    @cached_property
+    def company_index(self):
+        """Company name -> row position."""
+        return build_company_index(self.df, self.cols.company)
+
+    @cached_property
+    def search_index(self):
+        """Folded type-ahead index over the company names."""
+        return CompanySearchIndex(self.company_index)
+
+    @cached_property
+    def fulltext(self):
+        """BM25 index over the descriptions, or None if there are none.
+
+        Loaded from (or saved to) the index file next to the workbook when the
+        handle came from :meth:`load`. Built from this handle's own table,
+        so its positions are rows of ``df`` even once a delta has been
+        ingested since.
+        """
+        if self.descriptions is None:
+            return None
+        if self.source is not None and self.table is not None:
+            return load_fulltext_index(self.source, self.table, self.cols.description)
+        return FullTextIndex.build(self.descriptions[i] for i in range(len(self.descriptions)))
+
+    @cached_property
+    def peer_index(self):
+        """Nearest-neighbour index over the scaled metrics, sector and topic."""
+        return PeerIndex.from_frame(self.df, self.cols)
+
+    @cached_property
+    def ranks(self):
+        """Global and within-sector percentiles, positionally aligned with ``df``."""
+        return build_rank_table(self.df, self.cols.metrics, self.cols.sector)
+
+    @cached_property
+    def sql(self):
+        """DuckDB backend over this handle's table, for ad-hoc slices (needs the duckdb package)."""
+        return SqlBackend(self.df, self.cols)
+
+    @cached_property
+    def cube(self):
+        """Sector x region aggregates and their marginals, over the companies with figures for the year."""
+        if self.backend == "duckdb":
+            return self.sql.cube(reported=list(self.cols.reported))
+        return build_aggregate_cube(self.df, self.cols.sector, self.cols.region, self.cols.metrics,
+                                    reported=list(self.cols.reported.values()))
+
+    @cached_property
+    def topic_counts(self):
+        """Companies with figures for the year per topic, most frequent first."""
+        if self.backend == "duckdb":
+            return self.sql.value_counts("topic", reported=list(self.cols.reported))
+        in_view = reporting(self.df, list(self.cols.reported.values()))
+        return value_counts_desc(self.df if in_view.all() else self.df[in_view], self.cols.topic)
+
+
+class LatestDataset:
+    """The newest :class:`Dataset` of each year of one workbook, moved forward with :meth:`Dataset.refresh`.
+
+    Shared by every dashboard session; handles already given out stay
+    valid, so a rerun in progress keeps the version it started with.
+    """
+
+    def __init__(self, xlsx_path, backend="pandas"):
+        self.xlsx_path = xlsx_path
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._datasets = {}  # year -> (version, Dataset)
+        self._years = None  # (version, years)
+
+    def years(self, version=None):
+        """Years with data in ``version`` (default: the current one), oldest first."""
+        version = version or data_version(self.xlsx_path)
+        with self._lock:
+            if self._years is None or self._years[0] != version:
+                self._years = (version, sync_years(self.xlsx_path))
+            return self._years[1]
+
+    def get(self, version=None, year=None):
+        """The handle of ``year`` (default: the latest) for ``version`` (default: the current
+        :func:`~dde_dashboard.store.data_version`).
+
+        Raises ValueError for a year without data; a handle kept for a year
+        that has since been removed is dropped.
+        """
+        version = version or data_version(self.xlsx_path)
+        if year is None:
+            years = self.years(version)
+            year = years[-1] if years else None
+        with self._lock:
+            try:
+                if year not in self._datasets:
+                    dataset = Dataset.load(self.xlsx_path, self.backend, year)
+                else:
+                    loaded_version, dataset = self._datasets[year]
+                    if loaded_version != version:
+                        dataset = dataset.refresh()
+            except ValueError:
+                self._datasets.pop(year, None)
+                raise
+            self._datasets[year] = (version, dataset)
+            return dataset
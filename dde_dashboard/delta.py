@@ -0,0 +1,167 @@
+"""Delta files: changed or appended company rows for the stored workbook.
+
+A delta is a table (CSV, Excel, Parquet or Arrow IPC) with a key column --
+the BvD ID when the workbook has one, else the company name -- and any
+subset of the workbook's other columns. Delta rows whose key is in the
+workbook overwrite those columns of the matching rows; the others are
+appended, with the columns the delta lacks left empty. Rows are never
+deleted or reordered, so two versions of the table line up by position
+and :func:`diff_tables` can tell exactly which rows and columns changed.
+
+::
+
+    python -m dde_dashboard.delta updates.csv
+
+merges a delta into the stored dataset (see
+:func:`dde_dashboard.store.ingest_delta`); running dashboards pick it up
+on their next rerun without a full reload.
+"""
+
+import argparse
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv
+import pyarrow.feather
+import pyarrow.parquet
+
+from .columns import detect_columns
+
+DELTA_FORMATS = (".csv", ".xlsx", ".parquet", ".arrow", ".feather")
+
+
+@dataclass(frozen=True)
+class TableChange:
+    """What differs between two versions of the table (see :func:`diff_tables`)."""
+
+    updated: np.ndarray  # positions of existing rows with at least one changed value
+    appended: np.ndarray  # positions of the rows that are new
+    columns: frozenset  # columns with a changed value in an existing row
+
+    def __bool__(self):
+        return bool(len(self.updated) or len(self.appended))
+
+
+def read_delta(path):
+    """Read a delta file as an Arrow table; the format follows the extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".csv":
+        return pyarrow.csv.read_csv(path)
+    if ext == ".xlsx":
+        return pa.Table.from_pandas(pd.read_excel(path), preserve_index=False)
+    if ext == ".parquet":
+        return pyarrow.parquet.read_table(path)
+    if ext in (".arrow", ".feather"):
+        return pyarrow.feather.read_table(path)
+    raise ValueError(f"unsupported delta file {path!r}; expected one of {DELTA_FORMATS}")
+
+
+def delta_key(table, delta):
+    """The column ``delta`` rows are matched on: the BvD ID if both tables have it, else the company name."""
+    cols = detect_columns(table.column_names)
+    if cols.bvd_id and cols.bvd_id in delta.column_names:
+        return cols.bvd_id
+    return cols.company
+
+
+def normalize_delta(table, delta, key):
+    """``delta`` cast to ``table``'s column types, with one row per key (the last one wins)."""
+    unknown = [name for name in delta.column_names if name not in table.column_names]
+    if unknown:
+        raise ValueError(f"delta columns not in the dataset: {unknown}")
+    if key not in delta.column_names:
+        raise ValueError(f"delta has no key column {key!r}")
+    try:
+        delta = delta.cast(pa.schema([table.schema.field(name) for name in delta.column_names]))
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as exc:
+        raise ValueError(f"delta values do not fit the dataset's column types: {exc}") from exc
+    keys = delta.column(key)
+    if keys.null_count:
+        raise ValueError(f"{keys.null_count} delta rows have no {key!r}")
+    last = {value: pos for pos, value in enumerate(keys.to_pylist())}
+    if len(last) < delta.num_rows:
+        delta = delta.take(sorted(last.values()))
+    return delta
+
+
+def merge_delta(table, delta, key):
+    """``table`` with ``delta`` applied: matching rows updated in place, new keys appended."""
+    delta = normalize_delta(table, delta, key)
+    keys = table.column(key)
+    delta_keys = delta.column(key).combine_chunks()
+    hit = pc.is_in(keys, value_set=delta_keys).combine_chunks()
+    # The delta row for each matching table row, in table order
+    source = pc.index_in(keys.filter(hit), value_set=delta_keys)
+    new = delta.filter(pc.invert(pc.is_in(delta_keys, value_set=keys.combine_chunks())))
+
+    columns = []
+    for field in table.schema:
+        column = table.column(field.name)
+        if field.name in delta.column_names and len(source):
+            replacements = delta.column(field.name).take(source).combine_chunks()
+            column = pa.chunked_array([pc.replace_with_mask(column.combine_chunks(), hit, replacements)])
+        if new.num_rows:
+            extra = new.column(field.name) if field.name in new.column_names else pa.nulls(new.num_rows, field.type)
+            column = pa.chunked_array([*column.chunks, *pa.chunked_array([extra]).chunks], field.type)
+        columns.append(column)
+    return pa.Table.from_arrays(columns, schema=table.schema)
+
+
+def _changed(old, new):
+    """Boolean mask of the positions where two equally long columns differ; missing equals missing."""
+    same = pc.fill_null(pc.equal(old, new), False)
+    same = pc.or_(same, pc.and_(pc.is_null(old), pc.is_null(new)))
+    if pa.types.is_floating(old.type):
+        same = pc.or_(same, pc.fill_null(pc.and_(pc.is_nan(old), pc.is_nan(new)), False))
+    return pc.invert(same).to_numpy(zero_copy_only=False)
+
+
+def diff_tables(old, new):
+    """The :class:`TableChange` from ``old`` to ``new``, or None if ``new`` is not ``old`` plus deltas.
+
+    Compares the rows ``old`` has position by position, column by column;
+    rows past its end are appended.
+    """
+    if new.num_rows < old.num_rows or new.schema.names != old.schema.names:
+        return None
+    n = old.num_rows
+    updated = np.zeros(n, dtype=bool)
+    columns = set()
+    for name in old.column_names:
+        mask = _changed(old.column(name), new.column(name).slice(0, n))
+        if mask.any():
+            columns.add(name)
+            updated |= mask
+    return TableChange(np.flatnonzero(updated), np.arange(n, new.num_rows), frozenset(columns))
+
+
+def main(argv=None):
+    from .dataset import DEFAULT_WORKBOOK
+    from .store import ingest_delta
+
+    parser = argparse.ArgumentParser(description="Merge changed or appended company rows into the stored dataset.")
+    parser.add_argument("delta", help=f"file of company rows ({', '.join(DELTA_FORMATS)})")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    parser.add_argument("--key", help="column to match rows on (default: the BvD ID if present, else the company name)")
+    args = parser.parse_args(argv)
+
+    try:
+        _, change = ingest_delta(args.workbook, read_delta(args.delta), args.key)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if not change:
+        print("nothing changed")
+        return 0
+    print(f"{len(change.updated)} rows updated, {len(change.appended)} rows appended")
+    if change.columns:
+        print(f"changed columns: {', '.join(sorted(change.columns))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""BM25 full-text search over the company descriptions.
+
+The descriptions are a mix of English and Danish, so one tokenizer serves
+both: text is folded like company names (``search.fold``), stop words of
+either language are dropped and a light suffix stemmer maps inflections
+onto a shared stem ("virksomheder"/"virksomheden" -> "virksomhed",
+"developing"/"developed" -> "develop", "energies" -> "energy").
+
+The index is a set of CSR-style arrays -- term offsets into per-term
+postings of (row position, term frequency) -- so scoring a query is a few
+numpy operations over the postings of its terms. It is saved as an
+``.npz`` file next to the Arrow cache and stamped with the SHA-256 of the
+description column, so it is only rebuilt when the descriptions change.
+"""
+
+import os
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from .search import fold
+from .store import column_sha256, set_default_mode
+
+FULLTEXT_SUFFIX = ".bm25.npz"
+
+# Bump when tokenization or the file layout changes, to invalidate saved indexes
+_FORMAT = "2"
+
+K1 = 1.2
+B = 0.75
+
+STOP_WORDS = frozenset("""
+    a an and are as at be been by for from has have in into is it its of on or our that the their
+    this to was were which while with within
+    af al alle at da de dem den denne der det dets efter eller en er et for fra har hun hvor i
+    ikke ind jeg kan med men mod naar ned og om op paa saa sig sin sine sit skal som til ud under var
+    ved vi
+""".split())
+
+# Tried longest first; a suffix is only stripped when at least MIN_STEM characters remain
+SUFFIXES = sorted("""
+    ations ation ments ment ness ings ing ies ers ed es ly s
+    erne ende ene ere ede er en et e
+""".split(), key=len, reverse=True)
+MIN_STEM = 3
+
+
+def stem(word):
+    """Strip one English or Danish inflectional suffix from a folded word."""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            word = word[:-len(suffix)] + ("y" if suffix == "ies" else "")
+            break
+    # "shipping" -> "shipp" -> "ship", "vindmoelle" -> "vindmoell" -> "vindmoel"
+    if len(word) > MIN_STEM and word[-1] == word[-2] and word[-1] not in "aeiouy":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text):
+    """The stemmed index terms of ``text`` (empty for missing text)."""
+    if not isinstance(text, str):
+        return []
+    return [stem(word) for word in fold(text).split() if len(word) > 1 and word not in STOP_WORDS]
+
+
+class FullTextIndex:
+    """BM25 index over a sequence of documents, addressed by position."""
+
+    def __init__(self, terms, offsets, doc_ids, freqs, doc_lengths):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self._term_ids = {term: i for i, term in enumerate(terms.tolist())}
+        self._avg_length = doc_lengths.mean() if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts):
+        postings = {}
+        lengths = []
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths.append(len(tokens))
+            for term, count in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc, count))
+
+        terms = sorted(postings)
+        sizes = [len(postings[term]) for term in terms]
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        pairs = np.array([pair for term in terms for pair in postings[term]], dtype=np.int64).reshape(-1, 2)
+        return cls(
+            np.array(terms, dtype=str),
+            offsets,
+            pairs[:, 0].astype(np.int32),
+            np.minimum(pairs[:, 1], np.iinfo(np.uint16).max).astype(np.uint16),
+            np.array(lengths, dtype=np.int32),
+        )
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def search(self, query, k=None):
+        """Rank documents against ``query``; return ``(positions, scores)``, best first.
+
+        Only documents containing at least one query term are returned,
+        at most ``k`` of them when ``k`` is given.
+        """
+        n = len(self.doc_lengths)
+        ids, weights = [], []
+        for term in set(tokenize(query)):
+            i = self._term_ids.get(term)
+            if i is None:
+                continue
+            start, stop = self.offsets[i], self.offsets[i + 1]
+            docs = self.doc_ids[start:stop]
+            tf = self.freqs[start:stop].astype(np.float64)
+            idf = np.log(1.0 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = K1 * (1.0 - B + B * self.doc_lengths[docs] / self._avg_length)
+            ids.append(docs)
+            weights.append(idf * tf * (K1 + 1.0) / (tf + norm))
+        if not ids:
+            return np.empty(0, dtype=np.int32), np.empty(0)
+
+        # Sum the per-term contributions over the matching documents only
+        positions, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(weights))
+        order = np.argsort(-scores, kind="stable")
+        if k is not None:
+            order = order[:k]
+        return positions[order], scores[order]
+
+    def save(self, path, stamp):
+        # Write to a temp file and rename so concurrent readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as sink:
+                np.savez(sink, stamp=np.array(stamp), terms=self.terms, offsets=self.offsets,
+                         doc_ids=self.doc_ids, freqs=self.freqs, doc_lengths=self.doc_lengths)
+            set_default_mode(tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, stamp):
+        """The index saved at ``path``, or None if it is missing, unreadable or has another stamp."""
+        try:
+            with np.load(path, allow_pickle=False) as saved:
+                if str(saved["stamp"]) != stamp:
+                    return None
+                return cls(saved["terms"], saved["offsets"], saved["doc_ids"], saved["freqs"], saved["doc_lengths"])
+        except (OSError, KeyError, ValueError):
+            return None
+
+
+def fulltext_cache_path(xlsx_path):
+    """Return the path of the saved index that belongs to ``xlsx_path``."""
+    return os.fspath(xlsx_path) + FULLTEXT_SUFFIX
+
+
+def load_fulltext_index(xlsx_path, table, column):
+    """BM25 index over ``column`` of ``table``, going through the workbook's on-disk index file.
+
+    ``table`` is the version of the workbook the caller's rows come from;
+    the saved index is only used if it was built from that same column.
+    """
+    stamp = f"{_FORMAT}:{column}:{column_sha256(table, column)}"
+    path = fulltext_cache_path(xlsx_path)
+    index = FullTextIndex.load(path, stamp)
+    if index is None:
+        index = FullTextIndex.build(table.column(column).to_pylist())
+        index.save(path, stamp)
+    return index
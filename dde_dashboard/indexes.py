@@ -0,0 +1,74 @@
+"""Lookup structures built once per dataset version, and updated when rows change."""
+
+import numpy as np
+import pandas as pd
+
+
+def build_company_index(df, company_col):
+    """Map each company name to the position of its first row in ``df``.
+
+    Tab 1 reads the selected company's row through this dict instead of
+    scanning ``df[company_col] == company`` for every field.
+    """
+    names = df[company_col].tolist()
+    index = {}
+    for pos, name in enumerate(names):
+        if isinstance(name, str) and name not in index:
+            index[name] = pos
+    return index
+
+
+def build_rank_table(df, metric_cols, sector_col=None):
+    """Percentile ranks (0-100) of every row for each metric, globally and within its sector.
+
+    ``metric_cols`` maps a short key (e.g. ``"emp"``) to a column of ``df``;
+    missing columns are skipped. The result is positionally aligned with
+    ``df`` and has ``<key>_pct`` and ``<key>_sector_pct`` columns, so a
+    company's percentiles are a single ``iloc`` away.
+    """
+    ranks = {}
+    grouped = df.groupby(sector_col, sort=False, dropna=False) if sector_col in df.columns else None
+    for key, col in metric_cols.items():
+        if col not in df.columns:
+            continue
+        ranks[f"{key}_pct"] = df[col].rank(pct=True).to_numpy() * 100
+        if grouped is not None:
+            ranks[f"{key}_sector_pct"] = grouped[col].rank(pct=True).to_numpy() * 100
+        else:
+            ranks[f"{key}_sector_pct"] = ranks[f"{key}_pct"]
+    return pd.DataFrame(ranks)
+
+
+def update_rank_table(ranks, df, metric_cols, sector_col=None, columns=(), touched_sectors=()):
+    """``ranks`` brought up to date with ``df`` after rows changed or were appended.
+
+    ``columns`` are the columns of ``df`` with changed values in existing
+    rows and ``touched_sectors`` the sectors of the changed and appended
+    rows, before and after the change. A metric's global percentiles are
+    recomputed only if it changed or rows were appended; its within-sector
+    percentiles only within the touched sectors. The result equals
+    :func:`build_rank_table` on ``df``.
+    """
+    appended = len(df) > len(ranks)
+    has_sector = sector_col in df.columns
+    sector_moved = has_sector and sector_col in columns
+    if has_sector:
+        rows = df[sector_col].isin(list(touched_sectors)).to_numpy()
+        grouped = df[rows].groupby(sector_col, sort=False, dropna=False)
+    updated = {}
+    for key, col in metric_cols.items():
+        if col not in df.columns:
+            continue
+        changed = appended or col in columns
+        pct = df[col].rank(pct=True).to_numpy() * 100 if changed else ranks[f"{key}_pct"].to_numpy()
+        updated[f"{key}_pct"] = pct
+        if not has_sector:
+            updated[f"{key}_sector_pct"] = pct
+        elif changed or sector_moved:
+            sector_pct = np.full(len(df), np.nan)
+            sector_pct[:len(ranks)] = ranks[f"{key}_sector_pct"].to_numpy()
+            sector_pct[rows] = grouped[col].rank(pct=True).to_numpy() * 100
+            updated[f"{key}_sector_pct"] = sector_pct
+        else:
+            updated[f"{key}_sector_pct"] = ranks[f"{key}_sector_pct"].to_numpy()
+    return pd.DataFrame(updated)
@@ -0,0 +1,195 @@
+"""LLM access shared by the dashboard and batch jobs.
+
+The dashboard and the batch job talk to the model through a
+:class:`ChatProvider` (or its async twin), built by :func:`make_provider`
+for one of ``PROVIDERS``: ``"groq"``, or ``"mock"`` -- the same Groq client
+pointed at an in-process :mod:`~dde_dashboard.mock_llm` server, for load
+tests and development without an API key or quota.
+
+groq (and httpx) are imported lazily so that importing this package stays
+cheap for code that never talks to the LLM.
+"""
+
+import os
+import re
+
+MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.5
+MAX_TOKENS = 600
+
+# Provider -> model name used in requests and cache keys. The mock gets its own
+# name so its filler answers never land under the real model's cache keys.
+PROVIDERS = {"groq": MODEL, "mock": f"mock/{MODEL}"}
+
+
+# Pre-tokenizer pieces in the style of Llama 3 / tiktoken: words with their leading space, digits in
+# groups of up to three, punctuation runs and whitespace
+_PIECES = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+")
+
+# Characters per token of a word piece; common English words are one token, long or Danish words more
+_WORD_CHARS = 7
+
+
+def estimate_tokens(text):
+    """Local estimate of the model's token count for ``text``, without its tokenizer.
+
+    Splits ``text`` like the model's pre-tokenizer and counts one token per
+    piece, plus one per further ``_WORD_CHARS`` letters of a long word.
+    Long numbers cost a token per three digits, as they do for the model.
+    """
+    tokens = 0
+    for piece in _PIECES.findall(text):
+        word = piece.lstrip()
+        tokens += 1 + (len(word) - 1) // _WORD_CHARS if word.isalpha() else 1
+    return tokens
+
+
+def retry_after(exc, default=30.0):
+    """Seconds to wait according to the ``Retry-After`` header of a failed request's response."""
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after", default))
+    except (AttributeError, TypeError, ValueError):
+        return default
+
+
+def provider_from_env(environ=os.environ):
+    """The provider named by ``LLM_PROVIDER`` (default ``"groq"``)."""
+    provider = environ.get("LLM_PROVIDER", "groq").strip().lower()
+    if provider not in PROVIDERS:
+        raise ValueError(f"unknown LLM_PROVIDER {provider!r}; expected one of {sorted(PROVIDERS)}")
+    return provider
+
+
+def client_config_from_env(environ=os.environ):
+    """Read client settings from ``GROQ_*`` environment variables, with defaults."""
+    return {
+        "timeout": float(environ.get("GROQ_TIMEOUT", "60")),
+        "connect_timeout": float(environ.get("GROQ_CONNECT_TIMEOUT", "5")),
+        "max_retries": int(environ.get("GROQ_MAX_RETRIES", "4")),
+        "max_connections": int(environ.get("GROQ_MAX_CONNECTIONS", "20")),
+        "keepalive_expiry": float(environ.get("GROQ_KEEPALIVE_EXPIRY", "60")),
+        "base_url": environ.get("GROQ_BASE_URL") or None,
+    }
+
+
+def make_client(api_key, timeout=60.0, connect_timeout=5.0, max_retries=4,
+                max_connections=20, keepalive_expiry=60.0, base_url=None):
+    """Build a long-lived Groq client with a keep-alive connection pool.
+
+    Retries are delegated to the SDK, which retries timeouts, 408/409/429
+    and 5xx responses with exponential backoff and jitter (honouring any
+    ``Retry-After`` header) up to ``max_retries`` times. ``base_url``
+    points the client at another Groq-compatible server.
+    """
+    import groq
+    import httpx
+
+    http_client = groq.DefaultHttpxClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+    return groq.Groq(api_key=api_key, base_url=base_url, max_retries=max_retries, http_client=http_client)
+
+
+def make_async_client(api_key, timeout=60.0, connect_timeout=5.0, max_retries=4,
+                      max_connections=20, keepalive_expiry=60.0, base_url=None):
+    """Async counterpart of :func:`make_client`, for concurrent fan-out of prompts.
+
+    An async client's connection pool is bound to the event loop it was
+    first used on, so build one per ``asyncio.run`` and close it afterwards.
+    """
+    import groq
+    import httpx
+
+    http_client = groq.DefaultAsyncHttpxClient(
+        timeout=httpx.Timeout(timeout, connect=connect_timeout),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+    return groq.AsyncGroq(api_key=api_key, base_url=base_url, max_retries=max_retries, http_client=http_client)
+
+
+class ChatProvider:
+    """Single-prompt chat completions with one model and sampling setup.
+
+    Wraps an OpenAI-compatible client; errors are the client's own (for
+    Groq and the mock, ``groq.APIError`` and its subclasses).
+    """
+
+    def __init__(self, client, model=MODEL, temperature=TEMPERATURE, max_tokens=MAX_TOKENS):
+        self.client = client
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def _create(self, prompt, stream):
+        return self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            stream=stream,
+        )
+
+    def stream(self, prompt):
+        """Yield the answer to ``prompt`` as text deltas, as they arrive."""
+        for chunk in self._create(prompt, True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def complete(self, prompt):
+        """The whole answer to ``prompt``."""
+        return self._create(prompt, False).choices[0].message.content
+
+    def close(self):
+        self.client.close()
+
+
+class AsyncChatProvider(ChatProvider):
+    """Async counterpart of :class:`ChatProvider`; use it as an async context manager."""
+
+    async def stream(self, prompt):
+        async for chunk in await self._create(prompt, True):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def complete(self, prompt):
+        return (await self._create(prompt, False)).choices[0].message.content
+
+    async def __aenter__(self):
+        await self.client.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return await self.client.__aexit__(*exc_info)
+
+
+def _client_args(api_key, provider, client_config):
+    if provider not in PROVIDERS:
+        raise ValueError(f"unknown LLM provider {provider!r}; expected one of {sorted(PROVIDERS)}")
+    if provider == "mock":
+        from .mock_llm import shared_server
+
+        # The mock needs no key; the client only insists on having one
+        return api_key or "mock", {**client_config, "base_url": shared_server().url}
+    return api_key, client_config
+
+
+def make_provider(api_key, provider="groq", **client_config):
+    """A :class:`ChatProvider` for ``provider``; ``client_config`` goes to :func:`make_client`."""
+    api_key, client_config = _client_args(api_key, provider, client_config)
+    return ChatProvider(make_client(api_key, **client_config), model=PROVIDERS[provider])
+
+
+def make_async_provider(api_key, provider="groq", **client_config):
+    """An :class:`AsyncChatProvider` for ``provider``; build one per ``asyncio.run``."""
+    api_key, client_config = _client_args(api_key, provider, client_config)
+    return AsyncChatProvider(make_async_client(api_key, **client_config), model=PROVIDERS[provider])
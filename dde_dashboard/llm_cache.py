@@ -0,0 +1,133 @@
+"""Persistent cache for LLM responses.
+
+Responses are stored in a small SQLite file keyed by a hash of everything
+that determines the completion (model, prompt, temperature, max_tokens),
+so an identical insight request is answered from disk instead of paying
+the round trip and the rate limit again. Entries expire after ``ttl``
+seconds and the least recently used ones are evicted once the cache holds
+more than ``max_entries``.
+
+Answers written by the offline batch job (``dde_dashboard.batch``) live in
+a separate ``pregenerated`` table, one row per (section, subject), and are
+exempt from expiry and eviction. ``get`` falls back to them, so the
+dashboard reads pre-generated insights before calling the LLM.
+
+Every call opens its own short-lived connection, which keeps the cache
+safe to share between Streamlit's script threads and between processes.
+"""
+
+import hashlib
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+
+DEFAULT_CACHE_PATH = "llm_cache.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used_at);
+CREATE TABLE IF NOT EXISTS pregenerated (
+    section TEXT NOT NULL,
+    subject TEXT NOT NULL,
+    key TEXT NOT NULL,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (section, subject)
+);
+CREATE INDEX IF NOT EXISTS pregenerated_key ON pregenerated (key);
+"""
+
+
+def cache_key(model, prompt, temperature, max_tokens):
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "temperature": temperature, "max_tokens": max_tokens},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path, ttl=7 * 24 * 3600, max_entries=2000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached response for ``key``, or None if missing or expired.
+
+        Fresh on-demand answers win over pre-generated ones, so a
+        regenerated insight replaces the batch answer for its prompt.
+        """
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                response, created_at = row
+                if self.ttl is None or now - created_at <= self.ttl:
+                    conn.execute("UPDATE responses SET last_used_at = ? WHERE key = ?", (now, key))
+                    return response
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            row = conn.execute(
+                "SELECT response FROM pregenerated WHERE key = ? LIMIT 1", (key,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl is not None:
+            conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl,))
+        if self.max_entries is not None:
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "  SELECT key FROM responses ORDER BY last_used_at DESC LIMIT -1 OFFSET ?"
+                ")",
+                (self.max_entries,),
+            )
+
+    def pregenerated_key(self, section, subject):
+        """Cache key of the stored pre-generated answer for (section, subject), or None."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT key FROM pregenerated WHERE section = ? AND subject = ?", (section, subject)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put_pregenerated(self, section, subject, key, model, response):
+        """Store a batch answer, replacing any older one for the same (section, subject)."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO pregenerated (section, subject, key, model, response, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (section, subject, key, model, response, time.time()),
+            )
@@ -0,0 +1,35 @@
+"""Per-company metric summaries read from the precomputed structures."""
+
+import pandas as pd
+
+
+def company_stats(company_ranks, overall, cols):
+    """Dataset-wide average and median plus the company's within-sector percentile, per metric.
+
+    ``company_ranks`` is the company's row of the rank table and ``overall``
+    the ``(ALL, ALL)`` cell of the aggregate cube. Keys follow the
+    ``<metric>_avg`` / ``<metric>_med`` / ``<metric>_pct`` pattern.
+    """
+    stats = {}
+    for key in cols.metrics:
+        stats[f"{key}_avg"] = overall[f"{key}_mean"]
+        stats[f"{key}_med"] = overall[f"{key}_median"]
+        stats[f"{key}_pct"] = company_ranks[f"{key}_sector_pct"]
+    return stats
+
+
+def peer_stats(df, pos, peer_positions, cols):
+    """Like :func:`company_stats`, but against a peer group instead of the whole dataset.
+
+    The averages and medians are over the peers at ``peer_positions``; the
+    percentile ranks the company at ``pos`` within itself plus its peers.
+    """
+    group = df.iloc[[pos, *peer_positions]]
+    stats = {}
+    for key, col in cols.metrics.items():
+        values = pd.to_numeric(group[col], errors="coerce").astype("float64")
+        peers = values.iloc[1:]
+        stats[f"{key}_avg"] = peers.mean()
+        stats[f"{key}_med"] = peers.median()
+        stats[f"{key}_pct"] = values.rank(pct=True).iloc[0] * 100
+    return stats
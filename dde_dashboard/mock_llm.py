@@ -0,0 +1,200 @@
+"""A local stand-in for the Groq chat completions API.
+
+Serves ``POST /openai/v1/chat/completions`` (the path the Groq SDK calls)
+and ``/v1/chat/completions`` over plain HTTP, streaming or not, with a
+configurable time to first token, token rate, and rate of 429 and 500
+responses. Pointing the real client at it (``LLM_PROVIDER=mock``, or
+``GROQ_BASE_URL`` for a standalone server) exercises the same code path
+as production -- SDK retries, ``Retry-After`` handling, streaming -- without
+spending quota::
+
+    python -m dde_dashboard.mock_llm --port 8765 --latency 0.8 --tokens-per-second 250
+
+Answers are deterministic filler text derived from the prompt.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_WORDS = ("revenue growth sector region employees companies market trend median average percentile "
+          "strong moderate stable outlier peers denmark capital expansion performance").split()
+
+
+@dataclass(frozen=True)
+class MockConfig:
+    latency: float = 0.5            # seconds before the first token (or the whole answer)
+    jitter: float = 0.25            # latency varies uniformly by +/- this fraction
+    tokens_per_second: float = 200.0
+    response_tokens: int = 120
+    error_rate: float = 0.0         # share of requests answered with a 500
+    rate_limit_rate: float = 0.0    # share of requests answered with a 429
+    retry_after: float = 1.0        # Retry-After header of the 429s, in seconds
+    seed: int = None
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        """Read the settings from ``MOCK_LLM_*`` environment variables, with defaults."""
+        seed = environ.get("MOCK_LLM_SEED")
+        return cls(
+            latency=float(environ.get("MOCK_LLM_LATENCY", cls.latency)),
+            jitter=float(environ.get("MOCK_LLM_JITTER", cls.jitter)),
+            tokens_per_second=float(environ.get("MOCK_LLM_TOKENS_PER_SECOND", cls.tokens_per_second)),
+            response_tokens=int(environ.get("MOCK_LLM_RESPONSE_TOKENS", cls.response_tokens)),
+            error_rate=float(environ.get("MOCK_LLM_ERROR_RATE", cls.error_rate)),
+            rate_limit_rate=float(environ.get("MOCK_LLM_RATE_LIMIT_RATE", cls.rate_limit_rate)),
+            retry_after=float(environ.get("MOCK_LLM_RETRY_AFTER", cls.retry_after)),
+            seed=int(seed) if seed else None,
+        )
+
+
+def mock_answer(prompt, tokens):
+    """``tokens`` filler words, the same for the same prompt."""
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    return " ".join(rng.choice(_WORDS) for _ in range(tokens)).capitalize() + "."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "mock-llm"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": f"no route {self.path}", "type": "not_found"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        config = self.server.config
+        roll = self.server.roll()
+        if roll < config.rate_limit_rate:
+            self._json(429, {"error": {"message": "Rate limit reached (mock)", "type": "tokens",
+                                       "code": "rate_limit_exceeded"}},
+                       headers={"Retry-After": f"{config.retry_after:g}"})
+            return
+        if roll < config.rate_limit_rate + config.error_rate:
+            self._json(500, {"error": {"message": "Internal server error (mock)", "type": "internal_server_error"}})
+            return
+
+        prompt = request["messages"][-1]["content"]
+        tokens = min(config.response_tokens, request.get("max_tokens") or config.response_tokens)
+        words = mock_answer(prompt, tokens).split(" ")
+        time.sleep(max(0.0, config.latency * (1 + self.server.uniform(-config.jitter, config.jitter))))
+        delay = 1.0 / config.tokens_per_second if config.tokens_per_second else 0.0
+        model = request.get("model", "mock")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+
+        if not request.get("stream"):
+            time.sleep(delay * len(words))
+            self._json(200, {
+                "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(words),
+                          "total_tokens": len(prompt.split()) + len(words)},
+            })
+            return
+
+        # Server-sent events; the connection closes after [DONE] (HTTP/1.0)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+        for i, word in enumerate(words + [None]):
+            if word is not None and i:
+                time.sleep(delay)
+            delta = {"content": word if i == 0 else " " + word} if word is not None else {}
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                     "model": model, "choices": [{"index": 0, "delta": delta,
+                                                  "finish_reason": None if word is not None else "stop"}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, config=MockConfig(), host="127.0.0.1", port=0):
+        super().__init__((host, port), _Handler)
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def roll(self):
+        with self._lock:
+            return self._rng.random()
+
+    def uniform(self, low, high):
+        with self._lock:
+            return self._rng.uniform(low, high)
+
+    def start(self):
+        """Serve from a daemon thread; return self."""
+        threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True).start()
+        return self
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_server():
+    """The process-wide mock server (configured from ``MOCK_LLM_*``), started on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = MockServer(MockConfig.from_env()).start()
+        return _shared
+
+
+def main(argv=None):
+    defaults = MockConfig.from_env()
+    parser = argparse.ArgumentParser(description="Serve a mock OpenAI/Groq-compatible chat completions API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="seconds to the first token")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of 500 responses")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="share of 429 responses")
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    config = MockConfig(args.latency, args.jitter, args.tokens_per_second, args.response_tokens,
+                        args.error_rate, args.rate_limit_rate, args.retry_after, args.seed)
+    server = MockServer(config, args.host, args.port)
+    print(f"mock LLM listening on {server.url} (set GROQ_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
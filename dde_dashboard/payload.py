@@ -0,0 +1,110 @@
+"""Compact, token-budgeted payloads for the insight prompts.
+
+Prompt data is rendered as small pipe-separated tables with rounded
+numbers instead of Python reprs of dicts and numpy scalars, and per-sector
+listings keep only the ``TOP_K`` highest and lowest values. A prompt is an
+instruction plus named sections, each with renderings from richest to
+leanest; :func:`fit_prompt` picks the richest combination that fits the
+input-token budget (estimated locally with
+:func:`~dde_dashboard.llm.estimate_tokens`) and returns a :class:`Prompt`
+that records its token count per section.
+"""
+
+import pandas as pd
+
+from .llm import estimate_tokens
+
+# Input tokens a prompt may use; sections are shrunk until the prompt fits
+PROMPT_TOKEN_BUDGET = 500
+
+# Rows kept from each end of a ranked listing, then the fallbacks tried to fit the budget
+TOP_K = 5
+TOP_K_FALLBACKS = (3, 1)
+
+MISSING = "n/a"
+
+
+class Prompt(str):
+    """Prompt text, usable wherever a string is, with its estimated token counts.
+
+    ``sections`` maps each section name (and ``"instruction"``) to its
+    estimated tokens; ``tokens`` is the whole prompt's estimate and
+    ``budget`` the budget it was fitted to.
+    """
+
+    def __new__(cls, text, tokens=None, sections=None, budget=None):
+        prompt = super().__new__(cls, text)
+        prompt.tokens = tokens
+        prompt.sections = sections
+        prompt.budget = budget
+        return prompt
+
+
+def fmt_number(value, decimals=1):
+    """``value`` rounded for a prompt: whole numbers from 100 up, else ``decimals`` places; missing -> n/a."""
+    if value is None or pd.isna(value):
+        return MISSING
+    value = float(value)
+    if abs(value) >= 100 or value.is_integer():
+        return f"{value:.0f}"
+    return f"{value:.{decimals}f}"
+
+
+def fmt_percent(fraction, decimals=1):
+    """A fraction as a rounded percentage: 0.32922 -> "32.9%"."""
+    if fraction is None or pd.isna(fraction):
+        return MISSING
+    return f"{fmt_number(float(fraction) * 100, decimals)}%"
+
+
+def table(header, rows):
+    """Pipe-separated table: a header line, then one line per row."""
+    return "\n".join("|".join(str(cell) for cell in line) for line in [header, *rows])
+
+
+def top_bottom(series, k=TOP_K):
+    """``series`` sorted descending, keeping only its ``k`` highest and ``k`` lowest values."""
+    ranked = series.dropna().sort_values(ascending=False, kind="stable")
+    if len(ranked) <= 2 * k:
+        return ranked
+    return pd.concat([ranked.head(k), ranked.tail(k)])
+
+
+def top_section(title, series, header, fmt=fmt_number, ks=(TOP_K, *TOP_K_FALLBACKS)):
+    """Renderings of the ``k`` largest values of ``series`` for each ``k`` in ``ks``; ``title`` may use ``{k}``."""
+    ranked = series.dropna().sort_values(ascending=False, kind="stable")
+    return [f"{title.format(k=k)}:\n" + table(header, [(name, fmt(value)) for name, value in ranked.head(k).items()])
+            for k in ks]
+
+
+def ranked_section(title, series, header, fmt, ks=(TOP_K, *TOP_K_FALLBACKS)):
+    """Renderings of ``series`` as a top/bottom-k table for each ``k`` in ``ks``, for :func:`fit_prompt`."""
+    variants = []
+    for k in ks:
+        shown = top_bottom(series, k)
+        note = f" ({k} highest and {k} lowest of {series.count()})" if len(shown) < series.count() else ""
+        variants.append(f"{title}{note}:\n" + table(header, [(name, fmt(value)) for name, value in shown.items()]))
+    return variants
+
+
+def fit_prompt(instruction, sections, budget=PROMPT_TOKEN_BUDGET):
+    """Join ``instruction`` and the ``(name, renderings)`` ``sections`` into a :class:`Prompt` within ``budget``.
+
+    Every section starts at its first (richest) rendering; while the prompt
+    is over budget, the section costing the most tokens that has a leaner
+    rendering moves to its next one. An empty rendering drops the section.
+    If nothing is left to shrink, the prompt is returned over budget.
+    """
+    chosen = [0] * len(sections)
+    while True:
+        parts = [(name, renderings[i]) for (name, renderings), i in zip(sections, chosen)]
+        costs = {"instruction": estimate_tokens(instruction)}
+        costs.update((name, estimate_tokens(text)) for name, text in parts if text)
+        text = "\n".join([instruction, *(text for _, text in parts if text)])
+        tokens = estimate_tokens(text)
+        shrinkable = [j for j, ((_, renderings), i) in enumerate(zip(sections, chosen)) if i + 1 < len(renderings)]
+        if tokens <= budget or not shrinkable:
+            return Prompt(text, tokens, costs, budget)
+        largest = max(shrinkable, key=lambda j: costs.get(sections[j][0], 0))
+        chosen[largest] += 1
+
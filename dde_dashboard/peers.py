@@ -0,0 +1,82 @@
+"""Nearest-neighbour peers of a company on its metrics, sector and topic.
+
+Each metric is scaled robustly (distance from the median in units of the
+interquartile range, clipped, employees on a log scale) so that a handful
+of extreme AAGR values cannot dominate. Sector and topic act as one-hot
+features: their squared distance is ``weight`` when two companies differ
+and 0 otherwise. That term is computed from the category codes directly,
+so the one-hot matrix is never materialized and the index stays at
+``rows x metrics`` floats. A query is one vectorized pass over that
+matrix plus an ``argpartition``.
+"""
+
+import numpy as np
+import pandas as pd
+
+PEER_COUNT = 10
+
+# Squared distance added when two companies are in a different sector / topic
+SECTOR_WEIGHT = 2.0
+TOPIC_WEIGHT = 1.0
+
+# Scaled metrics are clipped to this many interquartile ranges from the median
+CLIP = 3.0
+
+
+def scaled_metric(values, log=False):
+    """Robustly scaled copy of ``values`` as float32; missing values land on the median (0)."""
+    values = pd.to_numeric(values, errors="coerce").astype("float64").to_numpy(na_value=np.nan)
+    if log:
+        values = np.log1p(np.clip(values, 0, None))
+    if np.isnan(values).all():
+        return np.zeros(len(values), dtype=np.float32)
+    q1, median, q3 = np.nanpercentile(values, [25, 50, 75])
+    scaled = np.clip((values - median) / ((q3 - q1) or 1.0), -CLIP, CLIP)
+    return np.nan_to_num(scaled, nan=0.0).astype(np.float32)
+
+
+def category_codes(values):
+    """Integer codes of a categorical or text column; -1 for missing values."""
+    codes = pd.Categorical(values).codes
+    return codes.astype(np.int16 if codes.max(initial=0) < np.iinfo(np.int16).max else np.int32)
+
+
+class PeerIndex:
+    """Exact k-nearest-neighbour search over the companies of one dataset."""
+
+    def __init__(self, numeric, categories):
+        self.numeric = numeric
+        self.categories = categories
+
+    @classmethod
+    def from_frame(cls, df, cols):
+        numeric = [scaled_metric(df[col], log=(key == "emp")) for key, col in cols.metrics.items()]
+        numeric = np.column_stack(numeric) if numeric else np.zeros((len(df), 0), dtype=np.float32)
+        categories = [
+            (category_codes(df[col]), weight)
+            for col, weight in ((cols.sector, SECTOR_WEIGHT), (cols.topic, TOPIC_WEIGHT))
+            if col and col in df.columns
+        ]
+        return cls(numeric, categories)
+
+    def __len__(self):
+        return len(self.numeric)
+
+    def distances(self, pos):
+        """Squared distance from the row at ``pos`` to every row."""
+        diff = self.numeric - self.numeric[pos]
+        dist = np.einsum("ij,ij->i", diff, diff)
+        for codes, weight in self.categories:
+            dist += weight * (codes != codes[pos])
+        return dist
+
+    def neighbours(self, pos, k=PEER_COUNT):
+        """Positions and distances of the ``k`` rows closest to ``pos`` (itself excluded), nearest first."""
+        dist = self.distances(pos)
+        dist[pos] = np.inf
+        k = min(k, len(dist) - 1)
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        nearest = np.argpartition(dist, k - 1)[:k]
+        nearest = nearest[np.lexsort((nearest, dist[nearest]))]
+        return nearest, np.sqrt(dist[nearest])
@@ -0,0 +1,147 @@
+"""Prompts for the AI insight sections.
+
+The dashboard and the offline batch job (``dde_dashboard.batch``) both
+build their prompts here, so a pre-generated answer is found under the
+same cache key the dashboard looks up. Each prompt is fitted to an
+input-token budget by :func:`~dde_dashboard.payload.fit_prompt` and comes
+back as a :class:`~dde_dashboard.payload.Prompt` with its token counts.
+"""
+
+from .cube import cube_cell, region_view, sector_view
+from .payload import (PROMPT_TOKEN_BUDGET, fit_prompt, fmt_number, fmt_percent, ranked_section, table,
+                      top_section)
+
+# (metric key, label, formatter) of the rows of the company and sector tables
+METRIC_ROWS = [
+    ("emp", "Employees", fmt_number),
+    ("growth", "Growth rate", fmt_percent),
+    ("aagr", "AAGR", fmt_percent),
+    ("age", "Company age (years)", fmt_number),
+]
+
+
+def _in(year):
+    """" in <year>" for a prompt sentence, or nothing when the year is unknown."""
+    return f" in {year}" if year else ""
+
+
+def _matching(description):
+    """" whose description matches '<query>'" for a prompt sentence, or nothing without a description search."""
+    return f" whose description matches '{description}'" if description else ""
+
+
+def company_prompt(company, row, stats, cols, budget=PROMPT_TOKEN_BUDGET, year=None):
+    """Prompt for one company's performance in ``year`` against the dataset; ``stats`` comes from ``company_stats``."""
+    rows = [
+        (label, fmt(row[getattr(cols, key)]), fmt(stats.get(f"{key}_avg")), fmt_number(stats.get(f"{key}_pct"), 0))
+        for key, label, fmt in METRIC_ROWS
+        if getattr(cols, key)
+    ]
+    return fit_prompt(
+        f"You are an expert business analyst. Provide a concise summary of {company}'s performance{_in(year)} compared to its sector peers. "
+        "Here are the metrics (percentile within its sector, 0-100):",
+        [("metrics", [table(("metric", "company", "all companies avg", "sector percentile"), rows)])],
+        budget,
+    )
+
+
+def sector_overview_prompt(cube, topic_counts, cols, budget=PROMPT_TOKEN_BUDGET, year=None, description=None):
+    """Prompt summarising the sector and topic distributions of the Sectors tab in ``year``.
+
+    ``description`` is the description search the cube and counts were filtered by, if any.
+    """
+    sectors = sector_view(cube)
+    sections = [
+        ("top_sectors", top_section("Top {k} sectors by company count", sectors["rows"], ("sector", "companies"))),
+    ]
+    if cols.growth and cols.sector:
+        sections.append(("growth_by_sector", ranked_section(
+            "Average growth rate by sector", sectors["growth_mean"], ("sector", "avg growth"), fmt_percent)))
+    sections.append(("top_topics", top_section("Top {k} topics by company count", topic_counts, ("topic", "companies"))))
+    if cols.emp and cols.sector:
+        sections.append(("employees_by_sector", ranked_section(
+            "Average employees by sector", sectors["emp_mean"], ("sector", "avg employees"), fmt_number)))
+    return fit_prompt(
+        "You are an expert data analyst. "
+        f"Given these summaries of Danish companies{_in(year)}{_matching(description)}, write a concise paragraph highlighting key trends and noteworthy observations.",
+        sections,
+        budget,
+    )
+
+
+def selected_sector_prompt(sector, cube, cols, budget=PROMPT_TOKEN_BUDGET, year=None):
+    """Prompt for one sector's employee, growth and AAGR distribution."""
+    sel_aggs = cube_cell(cube, sector=sector)
+    rows = [
+        (label, *(fmt(sel_aggs[f"{key}_{stat}"]) for stat in ("mean", "median", "p10", "p90")))
+        for key, label, fmt in METRIC_ROWS[:3]
+        if getattr(cols, key) and f"{key}_mean" in sel_aggs
+    ]
+    return fit_prompt(
+        f"You are an expert industry analyst. Provide a concise paragraph summarizing the performance of the '{sector}' sector in Denmark{_in(year)}. "
+        "Include key metrics such as average, median, 10th and 90th percentiles for Employees, Growth Rate, and AAGR as provided below:",
+        [("metrics", [table(("metric", "average", "median", "p10", "p90"), rows)])],
+        budget,
+    )
+
+
+def regions_prompt(cube, cols, budget=PROMPT_TOKEN_BUDGET, year=None, description=None):
+    """Prompt for the Regions overview tab in ``year``; ``description`` as in :func:`sector_overview_prompt`."""
+    region_count = region_view(cube)['rows'].sort_values(ascending=False).reset_index()
+    region_count.columns = [cols.region, 'count']
+    total_regions = region_count[cols.region].nunique()
+    top_region = region_count.iloc[0][cols.region] if not region_count.empty else None
+    top_count = region_count.iloc[0]['count'] if not region_count.empty else None
+    avg_growth_overall = cube_cell(cube)['growth_mean'] if cols.growth else None
+    return fit_prompt(
+        f"You are a data analyst. Provide a brief summary of the Danish regions overview{_in(year)}"
+        + (f", counting only companies{_matching(description)}." if description else "."),
+        [("facts", [
+            f"There are {total_regions} regions. The region with the most companies is {top_region} ({top_count} companies). "
+            f"The overall average growth across regions is {fmt_percent(avg_growth_overall)}."
+        ])],
+        budget,
+    )
+
+
+def _top(view, column):
+    """(sector, value) with the highest ``column`` in a per-sector view, or (None, None)."""
+    if view.empty or column not in view:
+        return None, None
+    ranked = view[column].sort_values(ascending=False)
+    return ranked.index[0], ranked.iloc[0]
+
+
+def region_deep_dive_prompt(region, cube, cols, budget=PROMPT_TOKEN_BUDGET, year=None):
+    """Prompt for the sector landscape within one region in ``year``."""
+    region_sectors = sector_view(cube, region=region)
+    top_sector, top_sector_count = _top(region_sectors, 'rows')
+    top_emp_sector, top_emp_count = _top(region_sectors, 'emp_sum')
+    top_growth_sector, top_growth_rate = _top(region_sectors, 'growth_mean')
+    top_aagr_sector, top_aagr_rate = _top(region_sectors, 'aagr_mean')
+    return fit_prompt(
+        f"You are an expert data analyst. Provide a concise summary of the business landscape in {region}{_in(year)} based on the deep-dive analysis.",
+        [("facts", [
+            f"The top sector by company count is {top_sector} ({fmt_number(top_sector_count)} companies). "
+            f"The sector employing the most employees is {top_emp_sector} ({fmt_number(top_emp_count)} employees). "
+            f"The sector with the highest average growth is {top_growth_sector} ({fmt_percent(top_growth_rate)}). "
+            f"The sector with the highest average AAGR is {top_aagr_sector} ({fmt_percent(top_aagr_rate)})."
+        ])],
+        budget,
+    )
+
+
+def age_prompt(cube, cols, budget=PROMPT_TOKEN_BUDGET, year=None):
+    """Prompt for the Company Age tab in ``year``."""
+    overall = cube_cell(cube)
+    overall_avg_age = overall['age_mean'] if cols.age else None
+    min_age = overall['age_min'] if cols.age else None
+    max_age = overall['age_max'] if cols.age else None
+    return fit_prompt(
+        "You are an experienced business analyst. Provide a brief summary of company age statistics in Denmark.",
+        [("facts", [
+            f"{f'In {year}, the' if year else 'The'} average company age is {fmt_number(overall_avg_age)} years, "
+            f"with the youngest company at {fmt_number(min_age, 0)} years and the oldest at {fmt_number(max_age, 0)} years."
+        ])],
+        budget,
+    )
@@ -0,0 +1,276 @@
+"""Process-wide scheduling of LLM calls across dashboard sessions.
+
+Every insight request goes through one :class:`LLMScheduler` per server
+process instead of straight to the provider:
+
+* token buckets keep the process under the account's requests-per-minute
+  and tokens-per-minute limits, so a burst of clicks queues up locally
+  instead of turning into a burst of 429s;
+* a priority queue lets interactive clicks overtake queued batch work
+  ("Generate all insights"), first come first served within a priority;
+* identical prompts that are queued or in flight share one upstream call,
+  so concurrent users asking about the same company cost one request.
+
+A request's :class:`Ticket` reports its queue position and estimated wait
+while it waits, and replays the streamed answer to every session that
+shares it.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from .llm import estimate_tokens, retry_after
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Seconds a call is assumed to take before any has finished, for wait estimates
+DEFAULT_SERVICE_S = 5.0
+
+
+class TokenBucket:
+    """Refills at ``per_minute`` units a minute up to ``capacity`` (one minute's worth by default).
+
+    Not thread-safe on its own; the scheduler only touches it under its lock.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.level = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+        self.blocked_until = 0.0
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        return now
+
+    def time_until(self, amount):
+        """Seconds until ``amount`` units are available at the current refill rate."""
+        now = self._refill()
+        missing = amount - self.level
+        return max(self.blocked_until - now, missing / self.rate if missing > 0 else 0.0, 0.0)
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+    def give(self, amount):
+        """Return unused units, e.g. the part of a reservation a call did not use."""
+        self._refill()
+        self.level = min(self.capacity, self.level + amount)
+
+    def pause(self, seconds):
+        """Hand out nothing for ``seconds``, e.g. after a 429 with a ``Retry-After``."""
+        self.blocked_until = max(self.blocked_until, self.clock() + seconds)
+
+
+class Ticket:
+    """One scheduled prompt; shared by every caller that submitted the same prompt while it was pending."""
+
+    def __init__(self, prompt, priority, order, tokens):
+        self.prompt = prompt
+        self.priority = priority
+        self.order = order
+        self.tokens = tokens
+        self.state = "queued"
+        self.subscribers = 1
+        self.deltas = []
+        self.error = None
+        self._changed = threading.Condition()
+        self._scheduler = None
+
+    @property
+    def sort_key(self):
+        return (self.priority, self.order)
+
+    @property
+    def queued(self):
+        return self.state == "queued"
+
+    @property
+    def done(self):
+        return self.state == "done"
+
+    @property
+    def text(self):
+        """The answer received so far."""
+        with self._changed:
+            return "".join(self.deltas)
+
+    def queue_status(self):
+        """``(position, estimated wait in seconds)`` while queued -- position 1 is next -- else None."""
+        return self._scheduler.queue_status(self)
+
+    def wait_started(self, timeout=None):
+        """Block until the call has started (or ``timeout`` passes); return whether it has."""
+        with self._changed:
+            self._changed.wait_for(lambda: not self.queued, timeout)
+            return not self.queued
+
+    def stream(self):
+        """Yield the answer as text deltas, from the first, as they arrive; raise the call's error."""
+        seen = 0
+        while True:
+            with self._changed:
+                self._changed.wait_for(lambda: len(self.deltas) > seen or self.done)
+                new, finished = self.deltas[seen:], self.done
+            seen += len(new)
+            yield from new
+            if finished:
+                if self.error is not None:
+                    raise self.error
+                return
+
+    def result(self):
+        """Block until the call is done; return the whole answer or raise its error."""
+        return "".join(self.stream())
+
+    def _set_state(self, state, error=None):
+        with self._changed:
+            self.state = state
+            self.error = error
+            self._changed.notify_all()
+
+    def _append(self, delta):
+        with self._changed:
+            self.deltas.append(delta)
+            self._changed.notify_all()
+
+
+class LLMScheduler:
+    """Rate-limited, prioritized, coalescing front of a :class:`~dde_dashboard.llm.ChatProvider`.
+
+    ``rpm`` and ``tpm`` are the requests and tokens per minute the process
+    may spend (0 or None: unlimited); a request reserves its prompt's
+    estimated tokens plus the provider's ``max_tokens``, and gets back what
+    the answer did not use. At most ``concurrency`` calls are in flight.
+    """
+
+    def __init__(self, provider, rpm=None, tpm=None, concurrency=4):
+        self.provider = provider
+        self.concurrency = concurrency
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.stats = Counter()
+        self._lock = threading.Condition()
+        self._queue = []
+        self._pending = {}
+        self._running = 0
+        self._order = itertools.count()
+        self._service_s = DEFAULT_SERVICE_S
+        self._pool = ThreadPoolExecutor(concurrency, thread_name_prefix="llm-call")
+        threading.Thread(target=self._dispatch, name="llm-scheduler", daemon=True).start()
+
+    def submit(self, prompt, priority=INTERACTIVE):
+        """Queue ``prompt``; return its :class:`Ticket`, shared with any identical pending prompt."""
+        with self._lock:
+            self.stats["submitted"] += 1
+            ticket = self._pending.get(prompt)
+            if ticket is not None:
+                self.stats["coalesced"] += 1
+                ticket.subscribers += 1
+                if ticket.queued and priority < ticket.priority:
+                    # Promote: the stale heap entry is skipped when it surfaces
+                    ticket.priority = priority
+                    heapq.heappush(self._queue, (ticket.sort_key, ticket))
+                    self._lock.notify_all()
+                return ticket
+            tokens = estimate_tokens(prompt) + self.provider.max_tokens
+            if self.tokens is not None:
+                # A prompt larger than a minute's budget waits for a full bucket rather than forever
+                tokens = min(tokens, self.tokens.capacity)
+            ticket = Ticket(prompt, priority, next(self._order), tokens)
+            ticket._scheduler = self
+            self._pending[prompt] = ticket
+            heapq.heappush(self._queue, (ticket.sort_key, ticket))
+            self._lock.notify_all()
+            return ticket
+
+    def queue_status(self, ticket):
+        with self._lock:
+            if not ticket.queued:
+                return None
+            ahead = [t for t in self._pending.values() if t.queued and t.sort_key < ticket.sort_key]
+            # Rate limits: everything ahead is paid for first
+            wait = self._rate_wait(len(ahead) + 1, sum(t.tokens for t in ahead) + ticket.tokens)
+            # Concurrency: the calls ahead start in waves as running ones finish
+            waves = math.ceil(max(0, len(ahead) + 1 - (self.concurrency - self._running)) / self.concurrency)
+            return len(ahead) + 1, max(wait, waves * self._service_s)
+
+    def _rate_wait(self, requests, tokens):
+        waits = [0.0]
+        if self.requests is not None:
+            waits.append(self.requests.time_until(requests))
+        if self.tokens is not None:
+            waits.append(self.tokens.time_until(tokens))
+        return max(waits)
+
+    def _next(self):
+        """Pop the next runnable ticket, waiting for a free slot and rate budget; call under the lock."""
+        while True:
+            # Drop entries left behind by promoted or started tickets
+            while self._queue and (self._queue[0][0] != self._queue[0][1].sort_key or not self._queue[0][1].queued):
+                heapq.heappop(self._queue)
+            if not self._queue or self._running >= self.concurrency:
+                self._lock.wait()
+                continue
+            ticket = self._queue[0][1]
+            wait = self._rate_wait(1, ticket.tokens)
+            if wait > 0:
+                # Re-check on wake-up: a higher-priority request may have arrived meanwhile
+                self._lock.wait(wait)
+                continue
+            heapq.heappop(self._queue)
+            if self.requests is not None:
+                self.requests.take(1)
+            if self.tokens is not None:
+                self.tokens.take(ticket.tokens)
+            self._running += 1
+            ticket._set_state("running")
+            return ticket
+
+    def _dispatch(self):
+        while True:
+            with self._lock:
+                ticket = self._next()
+                self.stats["started"] += 1
+            self._pool.submit(self._call, ticket)
+
+    def _call(self, ticket):
+        started = time.monotonic()
+        error = None
+        try:
+            for delta in self.provider.stream(ticket.prompt):
+                ticket._append(delta)
+        except Exception as exc:
+            error = exc
+        with self._lock:
+            self._running -= 1
+            del self._pending[ticket.prompt]
+            if error is None:
+                # Moving average of call durations, for the wait estimates
+                self._service_s = 0.8 * self._service_s + 0.2 * (time.monotonic() - started)
+                if self.tokens is not None:
+                    used = estimate_tokens(ticket.prompt) + estimate_tokens("".join(ticket.deltas))
+                    self.tokens.give(max(0, ticket.tokens - used))
+            else:
+                self.stats["failed"] += 1
+                if getattr(error, "status_code", None) == 429:
+                    # The client's own retries are spent; hold everyone back for the server's Retry-After
+                    for bucket in (self.requests, self.tokens):
+                        if bucket is not None:
+                            bucket.pause(retry_after(error))
+            self._lock.notify_all()
+        ticket._set_state("done", error)
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
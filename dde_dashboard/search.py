@@ -0,0 +1,159 @@
+"""Type-ahead search over company names.
+
+Names and queries are folded the same way (case, accents, and the Danish
+letters as their two-letter spellings: "Ærø" -> "aeroe", "Århus"/"Aarhus"
+-> "aarhus", "Sørensen"/"Soerensen" -> "soerensen"), so a query matches
+however the name was transliterated in the data. Names are also indexed
+under their plain spelling, with "aa" and "oe" written "a" and "o"
+("sorensen", "arhus"), so a query typed without the Danish letters finds
+them too. That spelling is an extra index entry only: names are folded,
+ordered and shown as written ("Shoe", "Bazaar").
+"""
+
+import re
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+SEARCH_RESULTS = 25
+
+# "ß" folds to "ss" as str.casefold does
+_DANISH = {"æ": "ae", "ø": "oe", "å": "aa", "ß": "ss"}
+_DANISH_TABLE = str.maketrans(_DANISH)
+# The plain spelling of a folded name: "aa" and "oe" as typed without the Danish letters
+_PLAIN = {"aa": "a", "oe": "o"}
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def fold(text, plain=False):
+    """Lower-case ``text``, transliterate Danish letters, strip accents and punctuation.
+
+    ``plain`` also writes "aa" and "oe" as "a" and "o" ("Sørensen" -> "sorensen").
+    """
+    text = unicodedata.normalize("NFC", text).lower().translate(_DANISH_TABLE)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _NON_WORD.sub(" ", text).strip()
+    if plain:
+        for pair, letter in _PLAIN.items():
+            text = text.replace(pair, letter)
+    return text
+
+
+def fold_array(texts):
+    """:func:`fold` of every string of the Arrow array ``texts``.
+
+    Latin-1 strings -- the workbook's names, Danish letters included --
+    are folded column-wise; the rest, which may hold combining marks that
+    Arrow does not compose like :func:`fold`, go through :func:`fold` one
+    by one, so both give the same result.
+    """
+    folded = pc.utf8_lower(texts)
+    for letter, spelling in _DANISH.items():
+        folded = pc.replace_substring(folded, letter, spelling)
+    folded = pc.replace_substring_regex(pc.utf8_normalize(folded, "NFKD"), r"\p{Mn}+", "")
+    folded = pc.utf8_trim(pc.replace_substring_regex(folded, "[^0-9a-z]+", " "), " ")
+    other = pc.invert(pc.match_substring_regex(texts, r"^[\x00-\xff]*$"))
+    if pc.any(other).as_py():
+        spelled = [fold(text) for text in texts.filter(other).to_pylist()]
+        folded = pc.replace_with_mask(folded, other, pa.array(spelled, pa.string()))
+    return folded
+
+
+def plain_array(folded):
+    """The plain spelling of the folded Arrow array ``folded``, as :func:`fold` gives with ``plain``."""
+    for pair, letter in _PLAIN.items():
+        folded = pc.replace_substring(folded, pair, letter)
+    return folded
+
+
+class CompanySearchIndex:
+    """Sorted folded and plain names plus a sorted (word, name) list, all searched by bisection.
+
+    :meth:`search` first returns names that start with the query, in
+    alphabetical order, then names whose plain spelling does, then names
+    with a word starting with each word of the query. Both walks stop as soon as ``k`` names are found, so a query
+    costs O(log n + k) in the common case.
+    """
+
+    def __init__(self, names, max_scan=50_000):
+        names = pa.array(list(names), pa.string())
+        folded = fold_array(names)
+        plain = plain_array(folded)
+        order = pc.sort_indices(pa.table({"folded": folded, "name": names}), [("folded", "ascending"),
+                                                                             ("name", "ascending")])
+        names, folded, plain = names.take(order), folded.take(order), plain.take(order)
+        self.names = names.to_pylist()
+        self._folded = folded.to_pylist()
+        # Names whose plain spelling differs, sorted by it
+        other = pc.not_equal(folded, plain).to_numpy(zero_copy_only=False)
+        plain_ids = np.flatnonzero(other)
+        by_plain = pc.sort_indices(pa.table({"plain": plain.filter(pa.array(other)), "id": plain_ids}),
+                                   [("plain", "ascending"), ("id", "ascending")])
+        self._plain = plain.filter(pa.array(other)).take(by_plain).to_pylist()
+        self._plain_ids = plain_ids[by_plain.to_numpy()].tolist()
+        # "<folded> <plain>" per name, for matching the remaining query words
+        self._text = pc.binary_join_element_wise(folded, pc.if_else(pa.array(other), plain, None), " ",
+                                                 null_handling="skip").to_pylist()
+
+        keys = pa.concat_arrays([folded, plain.filter(pa.array(other))])
+        ids = np.concatenate([np.arange(len(folded)), plain_ids])
+        words = pc.split_pattern(keys, " ")
+        word_ids = ids[pc.list_parent_indices(words).to_numpy()]
+        words = pc.list_flatten(words)
+        by_word = pc.sort_indices(pa.table({"word": words, "id": word_ids}), [("word", "ascending"),
+                                                                            ("id", "ascending")])
+        words, word_ids = words.take(by_word), word_ids[by_word.to_numpy()]
+        # A word both spellings of a name share is indexed once
+        first = np.ones(len(words), dtype=bool)
+        first[1:] = pc.not_equal(words[1:], words[:-1]).to_numpy(zero_copy_only=False)
+        first[1:] |= word_ids[1:] != word_ids[:-1]
+        self._words = words.filter(pa.array(first)).to_pylist()
+        self._word_ids = word_ids[first].tolist()
+        self.max_scan = max_scan
+
+    def __len__(self):
+        return len(self.names)
+
+    def _word_span(self, prefix):
+        """Positions ``[start, stop)`` of the indexed words starting with ``prefix``."""
+        # Folded text only holds [0-9a-z ], so "{" sorts after every continuation
+        return bisect_left(self._words, prefix), bisect_left(self._words, prefix + "{")
+
+    def search(self, query, k=SEARCH_RESULTS):
+        """Up to ``k`` company names matching ``query``; the first ``k`` names for an empty query."""
+        q = fold(query)
+        if not q:
+            return self.names[:k]
+        found = []
+        seen = set()
+
+        # Names starting with the query as folded, then as spelled plainly
+        for keys, ids in ((self._folded, range(len(self._folded))), (self._plain, self._plain_ids)):
+            for j in range(bisect_left(keys, q), len(keys)):
+                if len(found) >= k or not keys[j].startswith(q):
+                    break
+                if ids[j] not in seen:
+                    found.append(ids[j])
+                    seen.add(ids[j])
+
+        if len(found) < k:
+            # Walk the query word with the fewest matching words; check the others per candidate
+            spans = {term: self._word_span(term) for term in q.split()}
+            lead = min(spans, key=lambda term: spans[term][1] - spans[term][0])
+            others = [" " + term for term in spans if term != lead]
+            start, stop = spans[lead]
+            for j in range(start, min(stop, start + self.max_scan)):
+                i = self._word_ids[j]
+                if i in seen:
+                    continue
+                padded = " " + self._text[i]
+                if all(term in padded for term in others):
+                    found.append(i)
+                    seen.add(i)
+                    if len(found) >= k:
+                        break
+        return [self.names[i] for i in found]
@@ -0,0 +1,199 @@
+"""Optional DuckDB query backend over the company table.
+
+The loaded DataFrame is converted to Arrow once (its numeric, categorical
+and Arrow-backed string columns without copying) and registered in an
+in-process DuckDB database behind a ``companies`` view with short column
+names::
+
+    company, sector, region, topic, emp, growth, aagr, age, age_band
+
+so any slice -- sector within region, topic within age band, ... -- is a
+parameterized query run by DuckDB's vectorized, multi-threaded engine.
+Only the (small) result is materialized in Python; filtered copies of the
+table never are. :meth:`SqlBackend.cube` computes the aggregate cube with
+``GROUPING SETS``, so a dataset loaded with ``backend="duckdb"`` serves
+every tab from SQL.
+
+duckdb is not a dependency of the dashboard; it is imported when a
+backend is created (``pip install duckdb``).
+"""
+
+from itertools import product
+
+import pandas as pd
+import pyarrow as pa
+
+from .cube import ALL, QUANTILES, STATS, quantile_label
+
+VIEW = "companies"
+_SOURCE = "companies_source"
+
+# Upper bounds (exclusive) of the age bands; the last band is open-ended
+AGE_BANDS = (5, 10, 20, 50)
+
+_STAT_SQL = {
+    "count": "count({})",
+    "sum": "sum({})",
+    "mean": "avg({})",
+    "median": "quantile_cont({}, 0.5)",
+    "min": "min({})",
+    "max": "max({})",
+}
+
+
+def _ident(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def age_band_labels(bounds=AGE_BANDS):
+    """Labels of the age bands, youngest first: "0-4", "5-9", ..., "50+"."""
+    lows = (0, *bounds)
+    return [f"{low}-{high - 1}" for low, high in zip(lows, bounds)] + [f"{lows[-1]}+"]
+
+
+def age_band_sql(column, bounds=AGE_BANDS):
+    """SQL CASE expression labelling ``column`` with its age band (see :func:`age_band_labels`)."""
+    labels = age_band_labels(bounds)
+    cases = " ".join(f"WHEN {column} < {high} THEN '{label}'" for high, label in zip(bounds, labels))
+    return f"CASE WHEN {column} IS NULL THEN NULL {cases} ELSE '{labels[-1]}' END"
+
+
+class SqlBackend:
+    """A DuckDB connection with one dataset's table registered as the ``companies`` view.
+
+    Safe to share between threads: every query runs on its own cursor.
+    """
+
+    def __init__(self, df, cols, threads=None):
+        try:
+            import duckdb
+        except ImportError as exc:
+            raise ImportError("the duckdb query backend needs the duckdb package (pip install duckdb)") from exc
+
+        self.df = df
+        self.cols = cols
+        self.metrics = {key: col for key, col in cols.metrics.items() if col in df.columns}
+        dims = {"company": cols.company, "sector": cols.sector, "region": cols.region, "topic": cols.topic}
+        self.dimensions = {key: col for key, col in dims.items() if col and col in df.columns}
+
+        # DuckDB scans Arrow tables in place; registering the DataFrame itself costs a full
+        # conversion per cursor
+        self.table = pa.Table.from_pandas(df, preserve_index=False)
+        self._con = duckdb.connect(":memory:", config={"threads": threads} if threads else {})
+        self._con.register(_SOURCE, self.table)
+        columns = [f"{_ident(col)} AS {key}" for key, col in {**self.dimensions, **self.metrics}.items()]
+        if "age" in self.metrics:
+            # An ENUM sorts (and converts to a categorical) in age order rather than alphabetically
+            labels = ", ".join(f"'{label}'" for label in age_band_labels())
+            self._con.execute(f"CREATE TYPE age_band AS ENUM ({labels})")
+            columns.append(f"CAST({age_band_sql('age')} AS age_band) AS age_band")
+            self.dimensions["age_band"] = None
+        self._con.execute(f"CREATE VIEW {VIEW} AS SELECT {', '.join(columns)} FROM {_SOURCE}")
+
+    def _cursor(self):
+        # Registered tables are connection-local, so each cursor registers its own (zero-copy) scan
+        cursor = self._con.cursor()
+        cursor.register(_SOURCE, self.table)
+        return cursor
+
+    def query(self, sql, params=None):
+        """Run ``sql`` (with ``?`` placeholders bound to ``params``) and return the result as a DataFrame."""
+        with self._cursor() as cursor:
+            return cursor.execute(sql, params or []).df()
+
+    def arrow(self, sql, params=None):
+        """Like :meth:`query`, but return the result as an Arrow table."""
+        with self._cursor() as cursor:
+            return cursor.execute(sql, params or []).arrow()
+
+    def _check(self, names, kind, known):
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"unknown {kind} {unknown}; expected one of {sorted(known)}")
+
+    def aggregate(self, group_by=(), where=None, metrics=None, stats=("count", "mean", "median")):
+        """Companies and metric ``stats`` per group of ``group_by`` within the slice ``where``.
+
+        ``where`` maps a dimension to a value or a list of values, e.g.
+        ``aggregate(["topic"], where={"age_band": "0-4", "region": ["Hovedstaden", "Sjaelland"]})``.
+        Values are bound as parameters; dimension and metric names are
+        checked against the view's columns.
+        """
+        group_by = list(group_by)
+        where = where or {}
+        metrics = list(self.metrics if metrics is None else metrics)
+        self._check(group_by + list(where), "dimension", self.dimensions)
+        self._check(metrics, "metric", self.metrics)
+
+        select = [*group_by, "count(*) AS rows"]
+        for metric in metrics:
+            for stat in stats:
+                select.append(f"{_STAT_SQL[stat].format(metric)} AS {metric}_{stat}")
+        conditions, params = [], []
+        for dim, value in where.items():
+            values = list(value) if isinstance(value, (list, tuple, set)) else [value]
+            conditions.append(f"{dim} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+
+        sql = f"SELECT {', '.join(select)} FROM {VIEW}"
+        if conditions:
+            sql += f" WHERE {' AND '.join(conditions)}"
+        if group_by:
+            keys = ", ".join(group_by)
+            sql += f" GROUP BY {keys} ORDER BY {keys}"
+        result = self.query(sql, params)
+        return result.set_index(group_by) if group_by else result
+
+    def _reporting(self, reported):
+        """SQL condition keeping the companies with a value in at least one of the metrics ``reported``."""
+        reported = [key for key in reported or () if key in self.metrics]
+        return " OR ".join(f"{key} IS NOT NULL" for key in reported) or "TRUE"
+
+    def cube(self, quantiles=QUANTILES, reported=None):
+        """The aggregate cube of :func:`~dde_dashboard.cube.build_aggregate_cube`, in one GROUPING SETS query.
+
+        ``reported`` names metrics (view columns) of which a company needs one to be counted.
+        """
+        dims = [dim for dim in ("sector", "region") if dim in self.dimensions]
+        select = []
+        for dim in ("sector", "region"):
+            if dim in dims:
+                # Cast so the (all) marker fits a categorical (ENUM) column
+                select.append(f"CASE WHEN grouping({dim}) = 1 THEN '{ALL}' ELSE CAST({dim} AS VARCHAR) END AS {dim}_key")
+            else:
+                select.append(f"'{ALL}' AS {dim}_key")
+        select.append("count(*) AS rows")
+        for key, col in self.metrics.items():
+            integer = pd.api.types.is_integer_dtype(self.df[col])
+            for stat in STATS:
+                expr = _STAT_SQL[stat].format(key)
+                if stat == "sum" and integer:
+                    expr = f"CAST({expr} AS BIGINT)"
+                select.append(f"{expr} AS {key}_{stat}")
+            for q in quantiles:
+                select.append(f"quantile_cont({key}, {q}) AS {key}_{quantile_label(q)}")
+
+        # (sector, region), (sector), (region), () -- in build_aggregate_cube's order
+        sets = [[d for d, use in zip(dims, flags) if use] for flags in product((True, False), repeat=len(dims))]
+        grouping = ", ".join("(" + ", ".join(s) + ")" for s in sets)
+        # Like pandas' groupby, leave out companies whose grouped dimension is missing
+        missing = " OR ".join(f"(grouping({d}) = 0 AND {d} IS NULL)" for d in dims) or "FALSE"
+        order = ", ".join([f"grouping({d})" for d in dims] + [f"{d}_key" for d in dims]) or "rows"
+        sql = (f"SELECT {', '.join(select)} FROM {VIEW} WHERE {self._reporting(reported)} "
+               f"GROUP BY GROUPING SETS ({grouping}) "
+               f"HAVING NOT ({missing}) ORDER BY {order}")
+        cube = self.query(sql).set_index(["sector_key", "region_key"])
+        cube.index = cube.index.set_names(["sector", "region"])
+        return cube
+
+    def value_counts(self, dimension, reported=None):
+        """Companies per value of ``dimension``, most frequent first (like ``cube.value_counts_desc``).
+
+        ``reported`` is as in :meth:`cube`.
+        """
+        self._check([dimension], "dimension", self.dimensions)
+        counts = self.query(f"SELECT {dimension}, count(*) AS count FROM {VIEW} WHERE {dimension} IS NOT NULL "
+                            f"AND ({self._reporting(reported)}) "
+                            f"GROUP BY {dimension} ORDER BY count DESC, {dimension}")
+        # Named after the dataset's column, like the pandas counts
+        return counts.set_index(dimension)["count"].rename_axis(self.dimensions[dimension] or dimension)
@@ -0,0 +1,264 @@
+"""On-disk columnar cache for the company workbook.
+
+Parsing the Excel workbook with openpyxl is slow and ``st.cache_data`` only
+lives as long as one server process. The first load writes an uncompressed
+Arrow IPC file next to the workbook; every later load (in any process)
+memory-maps that file instead, so cold starts skip the Excel parse and
+worker processes on the same host share the page cache.
+
+The cache is stamped with the workbook's mtime, size and SHA-256 and is
+rebuilt automatically when the workbook changes.
+
+Changed or appended company rows arrive as deltas (see :mod:`.delta`):
+:func:`ingest_delta` keeps each one in a log directory next to the
+workbook and merges it into the cache, whose metadata lists the deltas it
+contains. A rebuilt cache replays the log, so ingested rows survive a
+workbook touch, and :func:`data_version` changes with every ingest.
+"""
+
+import hashlib
+import os
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+
+from .delta import delta_key, diff_tables, merge_delta, normalize_delta
+
+CACHE_SUFFIX = ".arrow"
+DELTA_LOG_SUFFIX = ".deltas"
+YEARS_SUFFIX = ".years"
+# File in the years directory listing the years added from outside the workbook (see .years)
+ADDED_YEARS_FILE = "_added.json"
+
+_META_MTIME = b"dde.source_mtime_ns"
+_META_SIZE = b"dde.source_size"
+_META_SHA256 = b"dde.source_sha256"
+# Names of the logged deltas merged into the cached table, comma-separated
+_META_DELTAS = b"dde.deltas"
+# Key column a logged delta is matched on
+_META_DELTA_KEY = b"dde.delta_key"
+
+
+def cache_path_for(xlsx_path):
+    """Return the path of the Arrow cache that belongs to ``xlsx_path``."""
+    return os.fspath(xlsx_path) + CACHE_SUFFIX
+
+
+def delta_log_for(xlsx_path):
+    """Return the directory of the delta log that belongs to ``xlsx_path``."""
+    return os.fspath(xlsx_path) + DELTA_LOG_SUFFIX
+
+
+def years_path_for(xlsx_path):
+    """Return the directory of the year-partitioned metrics that belong to ``xlsx_path`` (see :mod:`.years`)."""
+    return os.fspath(xlsx_path) + YEARS_SUFFIX
+
+
+def logged_deltas(xlsx_path):
+    """Names of the deltas ingested for ``xlsx_path``, oldest first."""
+    try:
+        return sorted(name for name in os.listdir(delta_log_for(xlsx_path)) if name.endswith(CACHE_SUFFIX))
+    except FileNotFoundError:
+        return []
+
+
+def applied_deltas(table):
+    """Names of the logged deltas merged into a cached table."""
+    names = (table.schema.metadata or {}).get(_META_DELTAS, b"").decode()
+    return names.split(",") if names else []
+
+
+def data_version(xlsx_path):
+    """Cheap token that changes whenever the stored dataset does.
+
+    Made of the workbook's mtime and size, the last delta and when a year
+    was last added from outside the workbook.
+    """
+    stat = os.stat(xlsx_path)
+    deltas = logged_deltas(xlsx_path)
+    try:
+        added = os.stat(os.path.join(years_path_for(xlsx_path), ADDED_YEARS_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        added = ""
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{deltas[-1] if deltas else ''}:{added}"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_sha256(table):
+    """SHA-256 of the workbook a cached table was read from (None for other tables)."""
+    sha256 = (table.schema.metadata or {}).get(_META_SHA256)
+    return sha256.decode() if sha256 else None
+
+
+def column_sha256(table, column):
+    """SHA-256 of one column's values, for stamping what is derived from that column alone."""
+    single = pa.table({column: table.column(column).combine_chunks()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, single.schema) as writer:
+        writer.write_table(single)
+    return hashlib.sha256(sink.getvalue()).hexdigest()
+
+
+def read_arrow(path):
+    """Read an Arrow IPC file memory-mapped: the table's buffers point straight into the page cache."""
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Read once at import: os.umask can only be read by setting it, which other threads would see
+_UMASK = _current_umask()
+
+
+def set_default_mode(path, directory=False):
+    """Give ``path`` the permissions ``open``/``mkdir`` would have under the process umask.
+
+    ``tempfile.mkstemp``/``mkdtemp`` create their files 0600 and directories
+    0700, and a rename keeps that mode, so without this a cache written by
+    one account could not be read by another (a second service user, or a
+    batch job run as someone else).
+    """
+    os.chmod(path, (0o777 if directory else 0o666) & ~_UMASK)
+
+
+def _write_arrow(table, path):
+    # Write to a temp file and rename so concurrent readers never see a partial file.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        set_default_mode(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_cache(table, cache_path, stat, sha256, deltas=()):
+    metadata = dict(table.schema.metadata or {})
+    metadata.update({
+        _META_MTIME: str(stat.st_mtime_ns).encode(),
+        _META_SIZE: str(stat.st_size).encode(),
+        _META_SHA256: sha256.encode(),
+        _META_DELTAS: ",".join(deltas).encode(),
+    })
+    table = table.replace_schema_metadata(metadata)
+    _write_arrow(table, cache_path)
+    return table
+
+
+def _read_logged_delta(xlsx_path, name):
+    """A logged delta and the key it is matched on."""
+    delta = read_arrow(os.path.join(delta_log_for(xlsx_path), name))
+    return delta, delta.schema.metadata[_META_DELTA_KEY].decode()
+
+
+def load_table(xlsx_path):
+    """Load the workbook plus its logged deltas as an Arrow table, going through the on-disk cache."""
+    cache_path = cache_path_for(xlsx_path)
+    stat = os.stat(xlsx_path)
+    logged = logged_deltas(xlsx_path)
+
+    cached = None
+    if os.path.exists(cache_path):
+        try:
+            cached = read_arrow(cache_path)
+        except (OSError, pa.ArrowInvalid):
+            cached = None
+
+    stale = True
+    if cached is not None:
+        meta = cached.schema.metadata or {}
+        sha256 = meta.get(_META_SHA256, b"").decode()
+        # Fast path: mtime and size unchanged, no need to hash the workbook.
+        if (meta.get(_META_MTIME) == str(stat.st_mtime_ns).encode()
+                and meta.get(_META_SIZE) == str(stat.st_size).encode()):
+            stale = False
+        else:
+            # The workbook was touched (e.g. a fresh checkout); only rebuild if its content changed.
+            current = file_sha256(xlsx_path)
+            if current != sha256:
+                cached, sha256 = None, current
+        applied = applied_deltas(cached) if cached is not None else []
+        if applied != logged[:len(applied)]:
+            # The log no longer starts with what the cache contains (it was reset): start over
+            cached, stale = None, True
+    else:
+        sha256 = file_sha256(xlsx_path)
+
+    if cached is None:
+        cached = pa.Table.from_pandas(pd.read_excel(xlsx_path), preserve_index=False)
+        applied = []
+    pending = logged[len(applied):]
+    for name in pending:
+        cached = merge_delta(cached, *_read_logged_delta(xlsx_path, name))
+    if stale or pending:
+        return _write_cache(cached, cache_path, stat, sha256, logged)
+    return cached
+
+
+def ingest_delta(xlsx_path, delta, key=None):
+    """Merge the Arrow table ``delta`` into the stored dataset; return ``(table, change)``.
+
+    ``key`` defaults to :func:`~dde_dashboard.delta.delta_key`. The delta
+    is validated and merged first, then written to the log and the cache,
+    so a bad delta leaves both untouched; one that changes nothing is not
+    logged. Run one ingest at a time per workbook.
+    """
+    table = load_table(xlsx_path)
+    key = key or delta_key(table, delta)
+    delta = normalize_delta(table, delta, key)
+    merged = merge_delta(table, delta, key)
+    change = diff_tables(table, merged)
+    if not change:
+        return table, change
+
+    log_dir = delta_log_for(xlsx_path)
+    os.makedirs(log_dir, exist_ok=True)
+    logged = logged_deltas(xlsx_path)
+    delta = delta.replace_schema_metadata({_META_DELTA_KEY: key.encode()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, delta.schema) as writer:
+        writer.write_table(delta)
+    name = f"{len(logged) + 1:06d}-{hashlib.sha256(sink.getvalue()).hexdigest()[:12]}{CACHE_SUFFIX}"
+    _write_arrow(delta, os.path.join(log_dir, name))
+    merged = _write_cache(merged, cache_path_for(xlsx_path), os.stat(xlsx_path), source_sha256(table), [*logged, name])
+    return merged, change
+
+
+def load_dataset(xlsx_path):
+    """Load the workbook as a DataFrame, going through the on-disk cache."""
+    # split_blocks lets numeric columns stay zero-copy views over the mapped file.
+    return load_table(xlsx_path).to_pandas(split_blocks=True)
+
+
+class LazyTextColumn:
+    """A text column left in the memory-mapped Arrow cache.
+
+    Values are materialized one row at a time, so long free text (company
+    descriptions) never has to live in the pandas frame or the Python heap.
+    """
+
+    def __init__(self, table, column):
+        self._column = table.column(column)
+
+    def __len__(self):
+        return len(self._column)
+
+    def __getitem__(self, pos):
+        return self._column[pos].as_py()
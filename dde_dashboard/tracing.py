@@ -0,0 +1,135 @@
+"""Opt-in timing spans for the dashboard's hot paths.
+
+A :class:`Tracer` collects spans for one rerun of the script::
+
+    with tracer.span("sectors.charts") as span:
+        charts = sector_charts(...)
+        span.set(rows=len(charts))
+
+A disabled tracer hands out one shared no-op span, so instrumented code
+costs a method call per span when tracing is off. Spans nest through a
+context variable, which also parents the spans of concurrent asyncio
+tasks correctly. :meth:`Tracer.flush` appends finished spans to a JSON
+lines file whose records use OpenTelemetry's span field names.
+"""
+
+import contextvars
+import json
+import os
+import time
+import uuid
+
+_current_span = contextvars.ContextVar("dde_current_span", default=None)
+
+
+class _NoopSpan:
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = None
+        self.start_ns = self.end_ns = None
+        self._token = None
+
+    def set(self, **attributes):
+        """Add attributes (row counts, payload sizes, ...); allowed until the tracer is flushed."""
+        self.attributes.update(attributes)
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = self.start_ns + (time.perf_counter_ns() - self._start)
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.spans.append(self)
+        return False
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+    @property
+    def depth(self):
+        depth, parent = 0, self.parent
+        while parent is not None:
+            depth, parent = depth + 1, parent.parent
+        return depth
+
+    def to_record(self, trace_id):
+        return {
+            "trace_id": trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent.span_id if self.parent is not None else None,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Collects the spans of one trace (one rerun); ``enabled=False`` makes it a no-op."""
+
+    def __init__(self, enabled=False, export_path=None):
+        self.enabled = enabled
+        self.export_path = export_path
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self._flushed = 0
+
+    def span(self, name, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def flush(self):
+        """Append the spans finished since the last flush to ``export_path``, if set."""
+        pending = self.spans[self._flushed:]
+        self._flushed = len(self.spans)
+        if not (self.enabled and self.export_path and pending):
+            return
+        with open(self.export_path, "a", encoding="utf-8") as fh:
+            for span in pending:
+                fh.write(json.dumps(span.to_record(self.trace_id), default=str) + "\n")
+
+    def rows(self):
+        """Finished spans in start order, for display: name (indented by depth), ms and attributes."""
+        return [
+            {
+                "span": "  " * span.depth + span.name,
+                "ms": round(span.duration_ms, 2),
+                "attributes": ", ".join(f"{k}={v}" for k, v in span.attributes.items()),
+            }
+            for span in sorted(self.spans, key=lambda span: span.start_ns)
+        ]
+
+
+def tracer_from_env(environ=os.environ):
+    """Tracer configured by ``DDE_TRACE`` (``1`` to enable) and ``DDE_TRACE_FILE`` (JSON lines export)."""
+    enabled = environ.get("DDE_TRACE", "").strip().lower() in ("1", "true", "yes", "on")
+    return Tracer(enabled, environ.get("DDE_TRACE_FILE", "dde_trace.jsonl") or None)
@@ -0,0 +1,275 @@
+"""Per-year company metrics in long format, stored as year-partitioned Parquet.
+
+The workbook is wide: each year's figures are columns of their own
+("Number of employees 2023", "Growth 2023", ...), which stops scaling once
+several years are loaded. :func:`to_long` reshapes them into one row per
+company and year with one column per metric ("Number of employees",
+"Growth", ...), so every metric keeps its type, and :func:`sync_years`
+keeps that table next to the workbook as a Hive-partitioned Parquet
+dataset::
+
+    <workbook>.years/year=2023/part-0.parquet
+
+:func:`read_year` filters on the partition column, so reading one year
+opens only that year's files. The year-independent columns (name, sector,
+region, description, ...) stay in the Arrow cache; :func:`year_table`
+puts one year's metrics next to them. Years the workbook does not have
+are added from a file of their own::
+
+    python -m dde_dashboard.years add 2022 metrics-2022.csv
+    python -m dde_dashboard.years                       # years and their companies
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset
+import pyarrow.parquet
+
+from .columns import detect_columns, split_year
+from .delta import normalize_delta, read_delta
+from .store import ADDED_YEARS_FILE, applied_deltas, load_table, set_default_mode, source_sha256, years_path_for
+
+YEAR_COL = "year"
+PARTITIONING = pyarrow.dataset.partitioning(pa.schema([(YEAR_COL, pa.int16())]), flavor="hive")
+
+# Workbook version and years the workbook's partitions were last written from
+_WORKBOOK_FILE = "_workbook.json"
+
+
+def year_columns(columns):
+    """Per-year column -> ``(metric, year)``, for every column named like ``"Growth 2023"``."""
+    return {column: parsed for column in columns if (parsed := split_year(column))}
+
+
+def table_years(table):
+    """Years the wide ``table`` has metric columns for, oldest first."""
+    return sorted({year for _, year in year_columns(table.column_names).values()})
+
+
+def metric_fields(table):
+    """Metric name -> Arrow field of that name, for the per-year columns of the wide ``table``."""
+    fields = {}
+    for column, (metric, _) in year_columns(table.column_names).items():
+        fields.setdefault(metric, pa.field(metric, table.schema.field(column).type))
+    return fields
+
+
+def row_key(table):
+    """The column a company is identified by across years: the BvD ID if there is one, else the name."""
+    cols = detect_columns(table.column_names)
+    return cols.bvd_id or cols.company
+
+
+def long_schema(table):
+    """Columns of :func:`to_long` for the wide ``table``, without the partition column."""
+    return pa.schema([table.schema.field(row_key(table)), *metric_fields(table).values()])
+
+
+def to_long(table, years=None):
+    """The per-year columns of the wide ``table`` as one row per company and year.
+
+    Columns are the key (:func:`row_key`), ``year`` and one column per
+    metric, null where a year lacks the metric; rows are in table order
+    within each year. ``years`` defaults to all of ``table``'s years.
+    """
+    key = row_key(table)
+    wide = year_columns(table.column_names)
+    parts = []
+    for year in years or table_years(table):
+        by_metric = {metric: column for column, (metric, y) in wide.items() if y == year}
+        columns = {key: table.column(key), YEAR_COL: pa.array(np.full(table.num_rows, year, dtype=np.int16))}
+        for metric, field in metric_fields(table).items():
+            column = by_metric.get(metric)
+            columns[metric] = table.column(column) if column else pa.nulls(table.num_rows, field.type)
+        parts.append(pa.table(columns))
+    return pa.concat_tables(parts)
+
+
+def _read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def _write_json(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as fh:
+        json.dump(data, fh)
+    set_default_mode(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_year(path, year, part):
+    """Replace ``year``'s partition under ``path`` with the rows of ``part`` (in the shape of :func:`to_long`).
+
+    The new partition is swapped in whole, so readers see either the old
+    rows or the new ones.
+    """
+    os.makedirs(path, exist_ok=True)
+    # Staged under a dot name, which dataset discovery skips, then swapped in
+    staging = tempfile.mkdtemp(dir=path, prefix=".")
+    if YEAR_COL in part.column_names:
+        part = part.drop_columns([YEAR_COL])
+    pyarrow.parquet.write_table(part, os.path.join(staging, "part-0.parquet"))
+    set_default_mode(staging, directory=True)
+    target = os.path.join(path, f"{YEAR_COL}={year}")
+    _remove_partition(path, year)
+    os.rename(staging, target)
+
+
+def _remove_partition(path, year):
+    target = os.path.join(path, f"{YEAR_COL}={year}")
+    if os.path.exists(target):
+        # Renamed away first so readers never see a half-deleted partition
+        retired = tempfile.mkdtemp(dir=path, prefix=".")
+        os.rename(target, os.path.join(retired, "old"))
+        shutil.rmtree(retired)
+
+
+def partition_years(path):
+    """Years with a partition under ``path``, oldest first."""
+    try:
+        names = os.listdir(path)
+    except FileNotFoundError:
+        return []
+    return sorted(int(name.split("=", 1)[1]) for name in names if name.startswith(f"{YEAR_COL}="))
+
+
+def sync_years(xlsx_path, table=None):
+    """Bring the partitions of the workbook's years up to date; return every year with data.
+
+    ``table`` is the workbook's current table (default: :func:`load_table`).
+    The workbook's partitions are rewritten when it or its deltas changed
+    since they were written, and dropped when their year left the
+    workbook; years added with :func:`add_year` are left alone.
+    """
+    table = load_table(xlsx_path) if table is None else table
+    path = years_path_for(xlsx_path)
+    years = table_years(table)
+    stamp = {"source": f"{source_sha256(table)}:{','.join(applied_deltas(table))}", "years": years}
+    written = _read_json(os.path.join(path, _WORKBOOK_FILE))
+    if written != stamp and (years or written):
+        added = {int(year) for year in _read_json(os.path.join(path, ADDED_YEARS_FILE)) or {}}
+        for year in years:
+            write_year(path, year, to_long(table, [year]))
+        for year in (written or {}).get("years", []):
+            if year not in years and year not in added:
+                _remove_partition(path, year)
+        _write_json(os.path.join(path, _WORKBOOK_FILE), stamp)
+    return partition_years(path)
+
+
+def read_year(path, table, year):
+    """``year``'s metric columns under ``path``, lined up with the rows of the wide ``table``.
+
+    Only the files of ``year``'s partition are opened. Companies without
+    figures for ``year`` get nulls.
+    """
+    schema = long_schema(table)
+    key = schema.names[0]
+    dataset = pyarrow.dataset.dataset(path, schema=schema.append(PARTITIONING.schema.field(YEAR_COL)),
+                                      format="parquet", partitioning=PARTITIONING)
+    part = dataset.to_table(columns=schema.names, filter=pc.field(YEAR_COL) == year)
+    keys = table.column(key)
+    if not (part.num_rows == table.num_rows and pc.all(pc.equal(part.column(key), keys)).as_py() is not False):
+        # Not written from this table (an added year, or rows appended since): match on the key
+        part = part.take(pc.index_in(keys, value_set=part.column(key).combine_chunks()))
+    return part.drop_columns([key])
+
+
+def year_table(table, year=None, metrics=None):
+    """The wide ``table`` as the snapshot of one year, named as in the workbook.
+
+    Keeps the year-independent columns and puts ``year``'s metrics -- from
+    :func:`read_year`, by default ``table``'s own columns of that year --
+    where the per-year columns were, named ``"<metric> <year>"``. ``year``
+    defaults to the latest one ``table`` has.
+    """
+    wide = year_columns(table.column_names)
+    if year is None:
+        years = table_years(table)
+        year = years[-1] if years else None
+    if metrics is None:
+        metrics = pa.table({metric: table.column(column) for column, (metric, y) in wide.items() if y == year})
+    names, columns = [], []
+    for name, column in zip(table.column_names, table.columns):
+        if name not in wide:
+            names.append(name)
+            columns.append(column)
+            continue
+        metric = wide[name][0]
+        if metric in metrics.column_names and f"{metric} {year}" not in names:
+            names.append(f"{metric} {year}")
+            columns.append(metrics.column(metric))
+    return pa.Table.from_arrays(columns, names=names, metadata=table.schema.metadata)
+
+
+def add_year(xlsx_path, year, metrics):
+    """Store the Arrow table ``metrics`` as the figures of a ``year`` the workbook does not have.
+
+    ``metrics`` has the key column (:func:`row_key`) and any of the
+    metrics, named without the year ("Number of employees", "Growth",
+    ...). The workbook's own years change through deltas instead (see
+    :mod:`.delta`). Returns ``(matched, unmatched)`` company counts.
+    """
+    table = load_table(xlsx_path)
+    if year in table_years(table):
+        raise ValueError(f"{year} comes from the workbook; change it with a delta (python -m dde_dashboard.delta)")
+    schema = long_schema(table)
+    if len(schema) == 1:
+        raise ValueError("the workbook has no per-year metric columns")
+    key = schema.names[0]
+    metrics = normalize_delta(schema.empty_table(), metrics, key)
+    metrics = pa.table({field.name: metrics.column(field.name) if field.name in metrics.column_names
+                        else pa.nulls(metrics.num_rows, field.type) for field in schema})
+
+    sync_years(xlsx_path, table)
+    path = years_path_for(xlsx_path)
+    write_year(path, year, metrics)
+    added = _read_json(os.path.join(path, ADDED_YEARS_FILE)) or {}
+    added[str(year)] = {"rows": metrics.num_rows}
+    # Also what data_version watches, so running dashboards pick the year up
+    _write_json(os.path.join(path, ADDED_YEARS_FILE), added)
+    matched = pc.sum(pc.is_in(metrics.column(key), value_set=table.column(key).combine_chunks())).as_py() or 0
+    return matched, metrics.num_rows - matched
+
+
+def main(argv=None):
+    from .dataset import DEFAULT_WORKBOOK
+
+    parser = argparse.ArgumentParser(description="List the years with company metrics, or add a year from a file.")
+    parser.add_argument("--workbook", default=DEFAULT_WORKBOOK)
+    commands = parser.add_subparsers(dest="command")
+    add = commands.add_parser("add", help="store a year's metrics from a CSV, Excel, Parquet or Arrow file")
+    add.add_argument("year", type=int)
+    add.add_argument("file", help="company key column plus metric columns named without the year")
+    args = parser.parse_args(argv)
+
+    if args.command == "add":
+        try:
+            matched, unmatched = add_year(args.workbook, args.year, read_delta(args.file))
+        except ValueError as exc:
+            parser.error(str(exc))
+        print(f"{args.year}: {matched} companies matched, {unmatched} not in the dataset")
+    table = load_table(args.workbook)
+    for year in sync_years(args.workbook, table):
+        metrics = read_year(years_path_for(args.workbook), table, year)
+        present = np.zeros(table.num_rows, dtype=bool)
+        for column in metrics.columns:
+            present |= column.is_valid().to_numpy(zero_copy_only=False)
+        print(f"{year}: {int(present.sum())} companies with figures")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
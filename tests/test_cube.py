@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dde_dashboard.cube import ALL, build_aggregate_cube, update_aggregate_cube
+
+METRICS = {"emp": "employees", "growth": "growth", "age": "age"}
+
+
+def companies(n, seed=0, sectors=("Retail", "Energy", "Software", None)):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        # Sorted categories, as compact_frame's astype("category") gives
+        "sector": pd.Categorical(rng.choice(list(sectors), n), categories=["Energy", "Mining", "Retail", "Software"]),
+        "region": pd.Categorical(rng.choice(["North", "South", "Capital"], n)),
+        "employees": rng.integers(1, 500, n),
+        "growth": np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+        "age": pd.array(rng.integers(0, 120, n), dtype="Int16"),
+    })
+
+
+# Each change returns the new frame and the positions of the existing rows it changed
+
+
+def updated_metrics(df):
+    new = df.copy()
+    new.loc[[3, 17, 40], "growth"] = [0.5, -2.0, np.nan]
+    new.loc[[3, 8], "employees"] = [10_000, 0]
+    new.loc[[9], "age"] = pd.NA
+    return new, [3, 8, 9, 17, 40]
+
+
+def moved_sector(df):
+    new = df.copy()
+    new.loc[[5, 6, 7], "sector"] = ["Energy", None, "Retail"]
+    new.loc[[7], "region"] = "Capital"
+    return new, [5, 6, 7]
+
+
+def appended_rows(df):
+    return pd.concat([df, companies(6, seed=1)], ignore_index=True), []
+
+
+def new_sector(df):
+    # A sector (and so cells and a marginal) the cube has not seen yet
+    return pd.concat([df, companies(3, seed=2, sectors=["Mining"])], ignore_index=True), []
+
+
+def check_update(df, new, rows, reported=None):
+    after = np.concatenate([rows, np.arange(len(df), len(new))]).astype(int)
+    # Merge even on these small frames, where the defaults would rebuild
+    cube = update_aggregate_cube(build_aggregate_cube(df, "sector", "region", METRICS, reported=reported), new,
+                                 df.iloc[rows], new.iloc[after], "sector", "region", METRICS, reported=reported,
+                                 min_rows=0, max_changed=1)
+    expected = build_aggregate_cube(new, "sector", "region", METRICS, reported=reported)
+    assert list(cube.index) == list(expected.index)
+    assert list(cube.columns) == list(expected.columns)
+    for column in expected.columns:
+        # Merged sums may differ from a fresh aggregation in the last bits
+        pd.testing.assert_series_equal(cube[column].astype("float64"), expected[column].astype("float64"),
+                                       check_names=False, rtol=1e-9)
+    return cube, expected
+
+
+@pytest.mark.parametrize("change", [updated_metrics, moved_sector, appended_rows, new_sector])
+def test_update_aggregate_cube_equals_rebuild(change):
+    df = companies(300)
+    check_update(df, *change(df))
+
+
+@pytest.mark.parametrize("thresholds", [{}, {"min_rows": 0, "max_changed": 0.01}])
+def test_update_aggregate_cube_rebuilds_small_tables_and_large_changes(thresholds):
+    df = companies(300)
+    new, rows = updated_metrics(df)
+    # Rows that do not describe the change: only a rebuild from ``new`` gets the cube right
+    cube = update_aggregate_cube(build_aggregate_cube(df, "sector", "region", METRICS), new, df.iloc[rows],
+                                 df.iloc[rows], "sector", "region", METRICS, **thresholds)
+
+    pd.testing.assert_frame_equal(cube, build_aggregate_cube(new, "sector", "region", METRICS))
+
+
+def without_figures(df, rows):
+    """``df`` with no employees or growth for the companies at ``rows`` (they keep their age)."""
+    df = df.copy()
+    df["employees"] = df["employees"].astype("Int64")
+    df.loc[rows, ["employees", "growth"]] = pd.NA
+    return df
+
+
+def test_build_aggregate_cube_counts_only_reporting_companies():
+    df = without_figures(companies(300), [0, 1, 2])
+    cube = build_aggregate_cube(df, "sector", "region", METRICS, reported=["employees", "growth"])
+
+    assert cube.loc[(ALL, ALL), "rows"] == 297
+    assert cube.loc[(ALL, ALL), "age_count"] == 297
+    assert build_aggregate_cube(df, "sector", "region", METRICS).loc[(ALL, ALL), "rows"] == 300
+
+
+def test_update_aggregate_cube_follows_companies_in_and_out_of_reporting():
+    df = without_figures(companies(300), [0, 1, 2])
+    new = pd.concat([without_figures(df, [10, 11]), without_figures(companies(4, seed=1), [0, 1])],
+                    ignore_index=True)
+    new.loc[[0, 1], "growth"] = [0.3, -0.1]
+
+    cube, _ = check_update(df, new, [0, 1, 10, 11], reported=["employees", "growth"])
+
+    assert cube.loc[(ALL, ALL), "rows"] == 297 - 2 + 2 + 2
+
+
+def test_update_aggregate_cube_drops_emptied_cells():
+    df = companies(300)
+    lone = (df["sector"] == "Retail") & (df["region"] == "North")
+    df = pd.concat([df[~lone], df[lone].head(1)], ignore_index=True)
+    new = df.copy()
+    new.loc[len(df) - 1, "sector"] = "Energy"
+
+    cube, _ = check_update(df, new, [len(df) - 1])
+
+    assert ("Retail", "North") not in cube.index
+    assert ("Retail", ALL) in cube.index
+
+
+def test_update_aggregate_cube_widens_overflowing_sums():
+    df = companies(10, sectors=["Retail"])
+    # Compact dtypes, as frame_from_table loads them
+    df["employees"] = df["employees"].astype("int16")
+    df["age"] = pd.array(np.full(10, 3000), dtype="Int16")
+    new = df.copy()
+    new["employees"] = new["employees"].astype("int32")
+    new.loc[0, ["employees", "age"]] = [70_000, 6000]
+
+    cube, expected = check_update(df, new, [0])
+
+    assert cube["age_sum"].dtype == expected["age_sum"].dtype == "Int64"
+    assert cube["emp_max"].dtype.kind == cube["emp_sum"].dtype.kind == "i"
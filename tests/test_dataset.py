@@ -0,0 +1,36 @@
+import pandas as pd
+import pyarrow as pa
+
+from dde_dashboard.columns import COMPANY_COL
+from dde_dashboard.dataset import Dataset
+from dde_dashboard.store import ingest_delta
+
+DESCRIPTION = "Final Description"
+
+
+def workbook(tmp_path):
+    path = tmp_path / "companies.xlsx"
+    pd.DataFrame({
+        COMPANY_COL: ["Alpha", "Beta", "Gamma"],
+        DESCRIPTION: ["offshore wind farms", "bakery and cafe", "software for wind turbines"],
+        "BvD sectors": ["Energy", "Retail", "Computer Software"],
+        "Region in country": ["North", "South", "North"],
+        "Number of employees 2023": [10, 20, 30],
+        "Growth 2023": [0.1, 0.2, 0.3],
+    }).to_excel(path, index=False)
+    return str(path)
+
+
+def test_description_index_lines_up_with_the_handle_after_a_delta(tmp_path):
+    path = workbook(tmp_path)
+    ds = Dataset.load(path)
+    ingest_delta(path, pa.table({COMPANY_COL: ["Delta"], DESCRIPTION: ["wind wind wind"]}))
+
+    # Built only now, but from the table this handle was loaded from
+    positions, _ = ds.fulltext.search("wind")
+    assert sorted(ds.df[COMPANY_COL].iloc[positions]) == ["Alpha", "Gamma"]
+
+    refreshed = ds.refresh()
+    positions, _ = refreshed.fulltext.search("wind")
+    assert refreshed.df[COMPANY_COL].iat[positions[0]] == "Delta"
+    assert refreshed.descriptions[3] == "wind wind wind"
@@ -0,0 +1,84 @@
+import pyarrow as pa
+import pytest
+
+from dde_dashboard.columns import COMPANY_COL
+from dde_dashboard.delta import delta_key, diff_tables, merge_delta
+
+BVD_ID = "BvD ID number"
+
+
+def workbook():
+    return pa.table({
+        BVD_ID: ["DK1", "DK2", "DK3"],
+        COMPANY_COL: ["Alpha", "Beta", "Gamma"],
+        "Growth 2023": [0.1, None, float("nan")],
+        "Number of employees 2023": pa.array([10, 20, 30], pa.int64()),
+    })
+
+
+def test_merge_by_bvd_id_updates_and_appends():
+    table = workbook()
+    delta = pa.table({BVD_ID: ["DK2", "DK9"], "Growth 2023": [0.5, 0.7]})
+    assert delta_key(table, delta) == BVD_ID
+
+    merged = merge_delta(table, delta, BVD_ID)
+
+    assert merged.schema == table.schema
+    assert merged.column("Growth 2023").to_pylist()[:2] == [0.1, 0.5]
+    assert merged.column(BVD_ID).to_pylist() == ["DK1", "DK2", "DK3", "DK9"]
+    # Columns the delta lacks are left empty on appended rows
+    assert merged.column(COMPANY_COL).to_pylist()[3] is None
+    change = diff_tables(table, merged)
+    assert change.updated.tolist() == [1]
+    assert change.appended.tolist() == [3]
+    assert change.columns == {"Growth 2023"}
+
+
+def test_merge_by_name_without_bvd_id():
+    table = workbook()
+    delta = pa.table({COMPANY_COL: ["Gamma", "Delta"], "Number of employees 2023": [31, 5]})
+    assert delta_key(table, delta) == COMPANY_COL
+
+    merged = merge_delta(table, delta, COMPANY_COL)
+
+    assert merged.column("Number of employees 2023").to_pylist() == [10, 20, 31, 5]
+    change = diff_tables(table, merged)
+    assert change.updated.tolist() == [2]
+    assert change.appended.tolist() == [3]
+    assert change.columns == {"Number of employees 2023"}
+
+
+def test_last_delta_row_per_key_wins():
+    merged = merge_delta(workbook(), pa.table({BVD_ID: ["DK1", "DK1"], "Growth 2023": [0.2, 0.3]}), BVD_ID)
+
+    assert merged.column("Growth 2023").to_pylist()[0] == 0.3
+    assert merged.num_rows == 3
+
+
+def test_unchanged_values_and_missing_values_are_no_change():
+    table = workbook()
+    # Same value, null over null and NaN over NaN
+    delta = pa.table({BVD_ID: ["DK1", "DK2", "DK3"], "Growth 2023": [0.1, None, float("nan")]})
+
+    change = diff_tables(table, merge_delta(table, delta, BVD_ID))
+
+    assert not change
+    assert change.columns == frozenset()
+
+
+def test_diff_tables_rejects_tables_that_are_not_a_delta_apart():
+    table = workbook()
+    assert diff_tables(table, table.slice(0, 2)) is None
+    assert diff_tables(table, table.drop_columns(["Growth 2023"])) is None
+
+
+@pytest.mark.parametrize("delta, message", [
+    (pa.table({BVD_ID: ["DK1"], "Turnover": [1.0]}), "not in the dataset"),
+    (pa.table({"Growth 2023": [0.5]}), "no key column"),
+    (pa.table({BVD_ID: ["DK1", None], "Growth 2023": [0.5, 0.6]}), "have no"),
+    (pa.table({BVD_ID: ["DK1"], "Number of employees 2023": ["many"]}), "do not fit"),
+])
+def test_invalid_deltas_are_rejected(delta, message):
+    with pytest.raises(ValueError, match=message):
+        merge_delta(workbook(), delta, BVD_ID)
+
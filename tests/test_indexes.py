@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dde_dashboard.indexes import build_rank_table, update_rank_table
+
+METRICS = {"emp": "employees", "growth": "growth"}
+
+
+def companies(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "sector": rng.choice(["Retail", "Energy", "Software", None], n),
+        "employees": rng.integers(1, 500, n),
+        "growth": np.where(rng.random(n) < 0.1, np.nan, rng.normal(size=n)),
+    })
+
+
+# Each change returns the new frame, the columns it changed and the positions of its rows
+
+
+def updated_growth(df):
+    new = df.copy()
+    new.loc[[3, 17, 40], "growth"] = [0.5, -2.0, np.nan]
+    return new, {"growth"}, [3, 17, 40]
+
+
+def moved_sector(df):
+    new = df.copy()
+    new.loc[[5, 6], "sector"] = ["Energy", None]
+    return new, {"sector"}, [5, 6]
+
+
+def appended_rows(df):
+    return pd.concat([df, companies(4, seed=1)], ignore_index=True), set(), range(len(df), len(df) + 4)
+
+
+@pytest.mark.parametrize("change", [updated_growth, moved_sector, appended_rows])
+def test_update_rank_table_equals_rebuild(change):
+    df = companies(200)
+    new, columns, rows = change(df)
+    touched = set(df["sector"].reindex(rows)) | set(new["sector"].iloc[list(rows)])
+
+    ranks = update_rank_table(build_rank_table(df, METRICS, "sector"), new, METRICS, "sector", columns, touched)
+
+    pd.testing.assert_frame_equal(ranks, build_rank_table(new, METRICS, "sector"))
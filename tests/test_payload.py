@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dde_dashboard.columns import DatasetColumns
+from dde_dashboard.cube import build_aggregate_cube, value_counts_desc
+from dde_dashboard.llm import estimate_tokens
+from dde_dashboard.payload import fit_prompt, fmt_number, fmt_percent, ranked_section, top_bottom
+from dde_dashboard.prompts import sector_overview_prompt
+
+
+def long_listing(n):
+    return pd.Series(np.linspace(-1, 1, n), index=[f"Sector number {i} with a long name" for i in range(n)])
+
+
+@pytest.mark.parametrize("budget", [120, 250, 500])
+def test_fit_prompt_stays_within_budget(budget):
+    sections = [
+        ("growth", ranked_section("Growth by sector", long_listing(60), ("sector", "growth"), fmt_percent)),
+        ("size", ranked_section("Employees by sector", long_listing(60) * 1000, ("sector", "employees"), fmt_number)),
+    ]
+
+    prompt = fit_prompt("Summarise the sectors.", sections, budget)
+
+    assert prompt.tokens == estimate_tokens(prompt) <= budget
+    assert prompt.budget == budget
+    assert set(prompt.sections) == {"instruction", "growth", "size"}
+
+
+def test_fit_prompt_keeps_the_richest_rendering_that_fits():
+    sections = [("facts", ["rich " * 50, "lean"])]
+
+    assert fit_prompt("Summarise.", sections, budget=1000) == "Summarise.\n" + "rich " * 50
+    assert fit_prompt("Summarise.", sections, budget=20) == "Summarise.\nlean"
+
+
+def test_fit_prompt_shrinks_the_costliest_section_first():
+    sections = [("small", ["a b c", "a"]), ("large", ["word " * 100, "word"])]
+
+    prompt = fit_prompt("Go.", sections, budget=20)
+
+    assert prompt == "Go.\na b c\nword"
+
+
+def test_fit_prompt_drops_empty_renderings_and_returns_over_budget_when_it_cannot_shrink():
+    prompt = fit_prompt("Go.", [("gone", ["text " * 20, ""]), ("fixed", ["word " * 50])], budget=10)
+
+    assert "text" not in prompt
+    assert "gone" not in prompt.sections
+    assert prompt.tokens > prompt.budget
+
+
+def test_top_bottom_keeps_both_ends():
+    shown = top_bottom(long_listing(30), k=3)
+
+    assert len(shown) == 6
+    assert shown.is_monotonic_decreasing
+    assert shown.iloc[0] == 1 and shown.iloc[-1] == -1
+
+
+def test_sector_overview_prompt_fits_with_many_sectors():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame({
+        "sector": pd.Categorical([f"Sector {i:02d} of the economy" for i in rng.integers(0, 80, n)]),
+        "region": pd.Categorical(rng.choice(["North", "South"], n)),
+        "topic": [f"Topic {i}" for i in rng.integers(0, 200, n)],
+        "employees": rng.integers(1, 500, n),
+        "growth": rng.normal(size=n),
+    })
+    cols = DatasetColumns(company="name", topic="topic", sector="sector", region="region",
+                          emp="employees", growth="growth")
+    cube = build_aggregate_cube(df, "sector", "region", cols.metrics)
+
+    topics = value_counts_desc(df, "topic")
+
+    prompt = sector_overview_prompt(cube, topics, cols, budget=200, year=2023)
+
+    assert sector_overview_prompt(cube, topics, cols, budget=10_000).tokens > 200
+    assert prompt.tokens <= 200
+    assert "in 2023" in prompt
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from dde_dashboard.columns import DatasetColumns
+from dde_dashboard.cube import build_aggregate_cube, value_counts_desc
+from dde_dashboard.prompts import regions_prompt, sector_overview_prompt
+
+COLS = DatasetColumns(company="name", topic="topic", sector="sector", region="region", emp="employees",
+                      growth="growth")
+
+
+def cube_and_topics():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "sector": pd.Categorical(rng.choice(["Energy", "Retail"], 50)),
+        "region": pd.Categorical(rng.choice(["North", "South"], 50)),
+        "topic": rng.choice(["Wind", "Food"], 50),
+        "employees": rng.integers(1, 500, 50),
+        "growth": rng.normal(size=50),
+    })
+    return build_aggregate_cube(df, "sector", "region", COLS.metrics), value_counts_desc(df, "topic")
+
+
+def test_overview_prompts_name_the_description_search():
+    cube, topics = cube_and_topics()
+
+    assert "in 2023 whose description matches 'offshore wind'," in sector_overview_prompt(
+        cube, topics, COLS, year=2023, description="offshore wind")
+    assert "counting only companies whose description matches 'offshore wind'." in regions_prompt(
+        cube, COLS, year=2023, description="offshore wind")
+
+
+def test_overview_prompts_without_a_search_are_unchanged():
+    cube, topics = cube_and_topics()
+
+    assert sector_overview_prompt(cube, topics, COLS, year=2023, description="") == sector_overview_prompt(
+        cube, topics, COLS, year=2023)
+    assert regions_prompt(cube, COLS, year=2023).startswith(
+        "You are a data analyst. Provide a brief summary of the Danish regions overview in 2023.\n")
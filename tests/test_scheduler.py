@@ -0,0 +1,86 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from dde_dashboard.scheduler import BATCH, INTERACTIVE, LLMScheduler
+
+
+class Provider:
+    """Answers each prompt once ``release`` is set, recording the order of the calls."""
+
+    max_tokens = 10
+
+    def __init__(self, errors=None):
+        self.calls = []
+        self.release = threading.Event()
+        self.errors = errors or {}
+
+    def stream(self, prompt):
+        self.calls.append(prompt)
+        self.release.wait(5)
+        if prompt in self.errors:
+            raise self.errors[prompt]
+        yield f"answer to {prompt}"
+
+
+class RateLimited(Exception):
+    status_code = 429
+    response = SimpleNamespace(headers={"retry-after": "30"})
+
+
+@pytest.fixture
+def provider():
+    return Provider()
+
+
+@pytest.fixture
+def scheduler(provider):
+    scheduler = LLMScheduler(provider, concurrency=1)
+    yield scheduler
+    provider.release.set()
+    scheduler.close()
+
+
+def test_identical_prompts_share_one_call(provider, scheduler):
+    first = scheduler.submit("sector overview")
+    second = scheduler.submit("sector overview", BATCH)
+    provider.release.set()
+
+    assert second is first
+    assert first.result() == second.result() == "answer to sector overview"
+    assert provider.calls == ["sector overview"]
+    assert scheduler.stats["coalesced"] == 1
+
+
+def test_interactive_prompts_overtake_batch_work(provider, scheduler):
+    busy = scheduler.submit("busy")
+    assert busy.wait_started(5)
+    queued = scheduler.submit("batch a", BATCH)
+    scheduler.submit("batch b", BATCH)
+    # Asked for interactively while queued as batch work: promoted ahead of "batch a"
+    promoted = scheduler.submit("batch b", INTERACTIVE)
+    clicked = scheduler.submit("click", INTERACTIVE)
+    assert promoted.queue_status()[0] == 1
+    assert clicked.queue_status()[0] == 2
+    provider.release.set()
+
+    queued.result()
+    assert provider.calls == ["busy", "batch b", "click", "batch a"]
+
+
+def test_rate_limit_error_pauses_every_request():
+    provider = Provider(errors={"limited": RateLimited()})
+    scheduler = LLMScheduler(provider, rpm=60, concurrency=1)
+    try:
+        provider.release.set()
+        with pytest.raises(RateLimited):
+            scheduler.submit("limited").result()
+
+        waiting = scheduler.submit("next")
+        assert not waiting.wait_started(0.2)
+        # The server's Retry-After, not the rpm budget, sets the wait
+        assert waiting.queue_status()[1] > 25
+        assert provider.calls == ["limited"]
+    finally:
+        scheduler.close()
@@ -0,0 +1,57 @@
+import pyarrow as pa
+import pytest
+
+from dde_dashboard.search import CompanySearchIndex, fold, fold_array, plain_array
+
+NAMES = ["Sørensen & Søn A/S", "Soerensen Byg ApS", "Århus Vand", "AARHUS HAVN", "Ærø Café", "Shoe Bazaar ApS",
+         "Sho Trading", "École Nordique"]
+
+
+@pytest.mark.parametrize("text, folded", [
+    ("Sørensen & Søn A/S", "soerensen soen a s"),
+    ("ÅRHUS", "aarhus"),
+    ("Ærø Café", "aeroe cafe"),
+    ("Straße", "strasse"),
+    ("Århus", "aarhus"),  # "å" written as "a" plus a combining ring
+    # Only the Danish letters are respelled; words that merely contain "aa" or "oe" are left alone
+    ("Shoe Bazaar", "shoe bazaar"),
+])
+def test_fold(text, folded):
+    assert fold(text) == folded
+
+
+def test_fold_plain_writes_aa_and_oe_as_one_letter():
+    assert fold("Sørensen i Århus", plain=True) == fold("SOERENSEN I AARHUS", plain=True) == "sorensen i arhus"
+
+
+def test_fold_array_matches_fold():
+    texts = [*NAMES, "", "Ǻlborg", "o̸", "Ą̊", "½ · µ"]
+    folded = fold_array(pa.array(texts))
+
+    assert folded.to_pylist() == [fold(text) for text in texts]
+    assert plain_array(folded).to_pylist() == [fold(text, plain=True) for text in texts]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("sorensen", {"Sørensen & Søn A/S", "Soerensen Byg ApS"}),
+    ("Sørensen", {"Sørensen & Søn A/S", "Soerensen Byg ApS"}),
+    ("soerensen", {"Sørensen & Søn A/S", "Soerensen Byg ApS"}),
+    ("arhus", {"Århus Vand", "AARHUS HAVN"}),
+    ("aarhus", {"Århus Vand", "AARHUS HAVN"}),
+    ("shoe", {"Shoe Bazaar ApS"}),
+    ("sho", {"Shoe Bazaar ApS", "Sho Trading"}),
+    ("bazaar", {"Shoe Bazaar ApS"}),
+    ("son sor", {"Sørensen & Søn A/S"}),
+    ("vand aar", {"Århus Vand"}),
+    ("ecole", {"École Nordique"}),
+])
+def test_search_matches_every_spelling(query, expected):
+    assert set(CompanySearchIndex(NAMES).search(query)) == expected
+
+
+def test_search_lists_prefix_matches_first_and_each_name_once():
+    index = CompanySearchIndex(NAMES)
+
+    assert index.search("s") == ["Sho Trading", "Shoe Bazaar ApS", "Soerensen Byg ApS", "Sørensen & Søn A/S"]
+    assert index.search("", k=3) == index.names[:3]
+    assert len(index.search("a", k=100)) == len(set(index.search("a", k=100)))